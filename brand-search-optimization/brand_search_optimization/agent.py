@@ -16,6 +16,8 @@
 
 from google.adk.agents.llm_agent import Agent
 
+from common.instrumentation import instrument
+
 from .shared_libraries import constants
 
 from .sub_agents.comparison.agent import comparison_root_agent
@@ -25,7 +27,7 @@ from .sub_agents.keyword_finding.agent import keyword_finding_agent
 from . import prompt
 
 
-root_agent = Agent(
+root_agent = instrument(Agent(
     model=constants.MODEL,
     name=constants.AGENT_NAME,
     description=constants.DESCRIPTION,
@@ -35,4 +37,4 @@ root_agent = Agent(
         search_results_agent,
         comparison_root_agent,
     ],
-)
+))
@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs brand search optimization for many brands at once.
+
+The products of all brands are fetched with one BigQuery query, then keyword
+finding, search results and comparison run concurrently for the brands, each
+in its own session, and one markdown report is written per brand. Browser
+steps of different brands take turns on the shared browser.
+
+    python -m brand_search_optimization.batch Nike Adidas Puma
+    python -m brand_search_optimization.batch --file brands.txt --out reports/
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional
+
+import click
+from google.adk import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from .agent import root_agent
+from .shared_libraries import constants
+from .tools import bq_connector
+
+USER_ID = "batch_user"
+
+
+def _report_filename(brand: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", brand.lower()).strip("_") + ".md"
+
+
+async def run_brand(runner: Runner, brand: str, products: List[Dict], out_dir: str) -> str:
+    """
+    Runs the full pipeline for one brand and writes its report.
+
+    Args:
+        runner (Runner): Runner for the brand search optimization agent.
+        brand (str): The brand name.
+        products (List[Dict]): The brand's products, prefetched by the batch query.
+        out_dir (str): Directory to write the report to.
+
+    Returns:
+        str: Path of the written report.
+    """
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id=USER_ID,
+        state={bq_connector.PRODUCTS_STATE_KEY: products},
+    )
+    sections: Dict[str, str] = {}
+    async for event in runner.run_async(
+        user_id=USER_ID,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=brand)]),
+    ):
+        if event.is_final_response() and event.content and event.content.parts:
+            text = "".join(part.text or "" for part in event.content.parts).strip()
+            if text:
+                # Later answers of an agent (e.g. after a critique) replace earlier ones.
+                sections[event.author] = text
+
+    path = os.path.join(out_dir, _report_filename(brand))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# {brand}\n\n")
+        for author, text in sections.items():
+            f.write(f"## {author}\n\n{text}\n\n")
+    return path
+
+
+async def run_batch(
+    brands: List[str],
+    out_dir: str = constants.BATCH_REPORT_DIR,
+    concurrency: int = constants.BATCH_CONCURRENCY,
+    limit_per_brand: int = constants.BATCH_PRODUCTS_PER_BRAND,
+) -> Dict[str, Optional[str]]:
+    """
+    Runs brand search optimization for a list of brands.
+
+    Returns:
+        Dict[str, Optional[str]]: Report path per brand, None for brands that failed.
+    """
+    brands = list(dict.fromkeys(brand.strip() for brand in brands if brand.strip()))
+    os.makedirs(out_dir, exist_ok=True)
+    products = await asyncio.to_thread(bq_connector.fetch_products_for_brands, brands, limit_per_brand)
+
+    runner = Runner(
+        app_name=constants.AGENT_NAME,
+        agent=root_agent,
+        session_service=InMemorySessionService(),
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(brand: str) -> Optional[str]:
+        async with semaphore:
+            try:
+                path = await run_brand(runner, brand, products[brand], out_dir)
+                print(f"✅ {brand}: {path}")
+                return path
+            except Exception as e:
+                print(f"❌ {brand}: {e}")
+                return None
+
+    paths = await asyncio.gather(*(run_one(brand) for brand in brands))
+    return dict(zip(brands, paths))
+
+
+@click.command()
+@click.argument("brands", nargs=-1)
+@click.option("--file", "brands_file", type=click.Path(exists=True), help="File with one brand per line.")
+@click.option("--out", "out_dir", default=constants.BATCH_REPORT_DIR, help="Directory for the reports.")
+@click.option("--concurrency", default=constants.BATCH_CONCURRENCY, help="Brands processed at the same time.")
+def main(brands, brands_file, out_dir, concurrency):
+    """Runs brand search optimization for several brands and writes one report per brand."""
+    brands = list(brands)
+    if brands_file:
+        with open(brands_file, encoding="utf-8") as f:
+            brands.extend(line.strip() for line in f if line.strip())
+    if not brands:
+        raise click.UsageError("No brands given")
+    results = asyncio.run(run_batch(brands, out_dir=out_dir, concurrency=concurrency))
+    failed = [brand for brand, path in results.items() if path is None]
+    print(f"{len(results) - len(failed)} of {len(results)} reports written to {out_dir}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
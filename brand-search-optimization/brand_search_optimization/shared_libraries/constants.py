@@ -30,3 +30,11 @@ TABLE_ID = os.getenv("TABLE_ID", "shoe_items")
 DISABLE_WEB_DRIVER = int(os.getenv("DISABLE_WEB_DRIVER", "0"))
 WHL_FILE_NAME = os.getenv("ADK_WHL_FILE", "")
 STAGING_BUCKET = os.getenv("STAGING_BUCKET", "")
+BQ_TIMEOUT_SECONDS = float(os.getenv("BQ_TIMEOUT_SECONDS", "60"))
+PAGE_LOAD_TIMEOUT_SECONDS = float(os.getenv("PAGE_LOAD_TIMEOUT_SECONDS", "30"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_PRODUCTS_PER_BRAND = int(os.getenv("BATCH_PRODUCTS_PER_BRAND", "3"))
+BATCH_REPORT_DIR = os.getenv("BATCH_REPORT_DIR", "brand_reports")
+PRODUCT_LIMIT = int(os.getenv("PRODUCT_LIMIT", "3"))
+PRODUCT_TABLE_MAX_CHARS = int(os.getenv("PRODUCT_TABLE_MAX_CHARS", "200000"))
+ARROW_PAGE_SIZE = int(os.getenv("ARROW_PAGE_SIZE", "10000"))
@@ -15,6 +15,7 @@
 """Defines keyword finding agent."""
 
 from google.adk.agents.llm_agent import Agent
+from google.genai import types
 
 from ...shared_libraries import constants
 from ...tools import bq_connector
@@ -25,6 +26,8 @@ keyword_finding_agent = Agent(
     name="keyword_finding_agent",
     description="A helpful agent to find keywords",
     instruction=prompt.KEYWORD_FINDING_AGENT_PROMPT,
+    # Deterministic, so the same brand always yields the same keywords (and can be cached)
+    generate_content_config=types.GenerateContentConfig(temperature=0),
     tools=[
         bq_connector.get_product_details_for_brand,
     ],
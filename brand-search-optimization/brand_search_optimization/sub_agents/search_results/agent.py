@@ -12,18 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import time
 import warnings
+from typing import AsyncGenerator, Optional
 
 import selenium
+from google.adk.agents.invocation_context import InvocationContext
 from google.adk.agents.llm_agent import Agent
+from google.adk.events import Event
 from google.adk.tools.load_artifacts_tool import load_artifacts_tool
 from google.adk.tools.tool_context import ToolContext
+from google.adk.utils.context_utils import Aclosing
 from google.genai import types
 from PIL import Image
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
+from common import cassette, deadline
+
 from ...shared_libraries import constants
 from . import prompt
 
@@ -38,11 +45,50 @@ if not constants.DISABLE_WEB_DRIVER:
     driver = selenium.webdriver.Chrome(options=options)
 
 
+# URL of the current page, which identifies recorded page sources.
+current_url = ""
+
+# The browser is shared by all sessions: a session holds it for a whole
+# search_results_agent run, so concurrent brands never interleave page loads.
+_browser_lock = asyncio.Lock()
+_browser_holder: Optional[str] = None
+
+
+async def acquire_browser(session_id: str) -> bool:
+    """
+    Waits until the browser is free and reserves it for the session.
+
+    Returns:
+        bool: True if the browser was reserved now, False if the session already held it.
+    """
+    global _browser_holder
+    if _browser_holder == session_id:
+        return False
+    await _browser_lock.acquire()
+    _browser_holder = session_id
+    return True
+
+
+def release_browser_for(session_id: str) -> None:
+    """Frees the browser if the session holds it, e.g. after a run failed mid-search."""
+    global _browser_holder
+    if _browser_holder == session_id:
+        _browser_holder = None
+        _browser_lock.release()
+
+
 def go_to_url(url: str) -> str:
     """Navigates the browser to the given URL."""
+    global current_url
     print(f"🌐 Navigating to URL: {url}")  # Added print statement
-    driver.get(url.strip())
-    return f"Navigated to URL: {url}"
+
+    def navigate():
+        driver.set_page_load_timeout(deadline.timeout(constants.PAGE_LOAD_TIMEOUT_SECONDS))
+        driver.get(url.strip())
+        return f"Navigated to URL: {url}"
+
+    current_url = url.strip()
+    return cassette.call_sync("navigation", {"url": current_url}, navigate)
 
 
 async def take_screenshot(tool_context: ToolContext) -> dict:
@@ -129,7 +175,7 @@ def get_page_source() -> str:
     LIMIT = 1000000
     """Returns the current page source."""
     print("📄 Getting page source...")  # Added print statement
-    return driver.page_source[0:LIMIT]
+    return cassette.call_sync("page_source", {"url": current_url}, lambda: driver.page_source[0:LIMIT])
 
 
 def analyze_webpage_and_determine_action(
@@ -184,7 +230,27 @@ def analyze_webpage_and_determine_action(
     return analysis_prompt
 
 
-search_results_agent = Agent(
+class BrowserAgent(Agent):
+    """
+    Agent that holds the shared browser for its whole run.
+
+    The browser is released in a finally block rather than an after-agent
+    callback, which ADK skips when the run raises or is closed early; a failed
+    run would otherwise keep every later session waiting for the browser.
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        acquired = await acquire_browser(ctx.session.id)
+        try:
+            async with Aclosing(super()._run_async_impl(ctx)) as events:
+                async for event in events:
+                    yield event
+        finally:
+            if acquired:
+                release_browser_for(ctx.session.id)
+
+
+search_results_agent = BrowserAgent(
     model=constants.MODEL,
     name="search_results_agent",
     description="Get top 3 search results info for a keyword using web browsing",
@@ -14,11 +14,30 @@
 
 """Defines tools for brand search optimization agent"""
 
+import asyncio
+import io
+from typing import Any, Dict, Iterator, List
+
 from google.cloud import bigquery
 from google.adk.tools import ToolContext
 
+from common import cassette, deadline, resilience, single_flight
+
 from ..shared_libraries import constants
 
+# Optional: stream large result sets as Arrow record batches.
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Optional: download result sets through the BigQuery Storage Read API.
+try:
+    from google.cloud import bigquery_storage
+except ImportError:
+    bigquery_storage = None
+
 # Initialize the BigQuery client outside the function
 try:
     client = bigquery.Client()  # Initialize client once
@@ -26,8 +45,168 @@ except Exception as e:
     print(f"Error initializing BigQuery client: {e}")
     client = None  # Set client to None if initialization fails
 
+# Session state key of products fetched ahead of time by batch mode.
+PRODUCTS_STATE_KEY = "brand_products"
+
+PRODUCTS_TABLE = f"`{constants.PROJECT}.{constants.DATASET_ID}.{constants.TABLE_ID}`"
+
+
+def run_query(query: str, parameters: List[Any]) -> List[Dict[str, Any]]:
+    """Runs a parameterized query and returns its rows as dicts."""
+    job_config = bigquery.QueryJobConfig(query_parameters=parameters)
+
+    def execute():
+        query_job = client.query(query, job_config=job_config)
+        rows = query_job.result(timeout=deadline.timeout(constants.BQ_TIMEOUT_SECONDS))
+        return [dict(row.items()) for row in rows]
+
+    request = {"query": query, "parameters": [parameter.to_api_repr() for parameter in parameters]}
+    return cassette.call_sync(
+        "bigquery", request, lambda: resilience.dependency("bigquery").call_sync(execute)
+    )
+
+
+def products_table(rows: List[Dict[str, Any]], brand: str) -> str:
+    """Renders product rows as the markdown table returned to the keyword finding agent."""
+    markdown_table = "| Title | Description | Attributes | Brand |\n"
+    markdown_table += "|---|---|---|---|\n"
+
+    for row in rows:
+        title = row["Title"]
+        description = row["Description"] if row["Description"] else "N/A"
+        attributes = row["Attributes"] if row["Attributes"] else "N/A"
+
+        markdown_table += (
+            f"| {title} | {description} | {attributes} | {brand}\n"
+        )
+
+    return markdown_table
+
+
+_bqstorage_client = None
+
+
+def iter_record_batches(query: str, parameters: List[Any]) -> Iterator["pa.RecordBatch"]:
+    """
+    Runs a parameterized query and yields its result as Arrow record batches.
+
+    Only a few batches are held in memory at a time, so result sets of any size
+    can be processed; stopping the iteration stops the download.
+    """
+    global _bqstorage_client
+    job_config = bigquery.QueryJobConfig(query_parameters=parameters)
+
+    def execute():
+        query_job = client.query(query, job_config=job_config)
+        return query_job.result(
+            page_size=constants.ARROW_PAGE_SIZE,
+            timeout=deadline.timeout(constants.BQ_TIMEOUT_SECONDS),
+        )
+
+    rows = resilience.dependency("bigquery").call_sync(execute)
+    if bigquery_storage is not None and _bqstorage_client is None:
+        _bqstorage_client = bigquery_storage.BigQueryReadClient()
+    yield from rows.to_arrow_iterable(bqstorage_client=_bqstorage_client, max_queue_size=2)
+
+
+def _text_column(batch: "pa.RecordBatch", name: str, default: str = None) -> "pa.Array":
+    column = pc.cast(batch.column(name), pa.string())
+    # Line breaks inside a cell would end the markdown row.
+    column = pc.replace_substring(column, "\n", " ")
+    if default is not None:
+        column = pc.fill_null(pc.if_else(pc.equal(column, ""), pa.scalar(None, pa.string()), column), default)
+    return column
+
+
+def _render_batch(batch: "pa.RecordBatch", brand: str) -> "pa.Array":
+    """Renders a record batch into markdown table rows, one column operation at a time."""
+    return pc.binary_join_element_wise(
+        "| ", pc.fill_null(_text_column(batch, "Title"), ""),
+        " | ", _text_column(batch, "Description", "N/A"),
+        " | ", _text_column(batch, "Attributes", "N/A"),
+        f" | {brand}\n",
+        "",
+    )
+
+
+def stream_products_table(query: str, parameters: List[Any], brand: str, max_chars: int) -> str:
+    """
+    Renders the markdown product table from a streamed result, up to ``max_chars`` characters.
+
+    Rows are rendered per record batch and the download stops as soon as the
+    table is full, so memory use is bounded by the cap, not the result size.
+    """
+    out = io.StringIO()
+    out.write("| Title | Description | Attributes | Brand |\n")
+    out.write("|---|---|---|---|\n")
+    remaining = max_chars - out.tell()
+    rendered = 0
+
+    batches = iter_record_batches(query, parameters)
+    try:
+        for batch in batches:
+            lines = _render_batch(batch, brand)
+            fits = pc.sum(pc.less_equal(pc.cumulative_sum(pc.utf8_length(lines)), remaining)).as_py() or 0
+            chunk = "".join(lines.slice(0, fits).to_pylist())
+            out.write(chunk)
+            remaining -= len(chunk)
+            rendered += fits
+            if fits < len(lines):
+                out.write(f"\n_Output truncated after {rendered} products._\n")
+                break
+    finally:
+        batches.close()
+    return out.getvalue()
+
+
+def fetch_products_for_brands(brands: List[str], limit_per_brand: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Retrieves the products of many brands with a single query.
+
+    Brands are matched like the single-brand tool does (``Brand LIKE '%brand%'``),
+    so a session gets the same products whether or not they were prefetched;
+    at most ``limit_per_brand`` products are returned per brand.
+
+    Args:
+        brands (List[str]): The brand names.
+        limit_per_brand (int): Maximum number of products per brand.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Product rows (Title, Description, Attributes, Brand) by requested brand.
+    """
+    if client is None:
+        raise RuntimeError("BigQuery client initialization failed. Cannot execute query.")
+
+    query = f"""
+        SELECT
+            requested_brand,
+            Title,
+            Description,
+            Attributes,
+            Brand
+        FROM
+            {PRODUCTS_TABLE},
+            UNNEST(@brands) AS requested_brand
+        WHERE Brand LIKE CONCAT('%', requested_brand, '%')
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY requested_brand ORDER BY Title) <= @limit_per_brand
+    """
+    rows = run_query(
+        query,
+        [
+            bigquery.ArrayQueryParameter("brands", "STRING", sorted(set(brands))),
+            bigquery.ScalarQueryParameter("limit_per_brand", "INT64", limit_per_brand),
+        ],
+    )
+
+    products: Dict[str, List[Dict[str, Any]]] = {brand: [] for brand in brands}
+    for row in rows:
+        brand = row.pop("requested_brand")
+        if brand in products:
+            products[brand].append(row)
+    return products
+
 
-def get_product_details_for_brand(tool_context: ToolContext):
+async def get_product_details_for_brand(tool_context: ToolContext):
     """
     Retrieves product details (title, description, attributes, and brand) from a BigQuery table for a tool_context.
 
@@ -37,13 +216,17 @@ def get_product_details_for_brand(tool_context: ToolContext):
     Returns:
         str: A markdown table containing the product details, or an error message if BigQuery client initialization failed.
              The table includes columns for 'Title', 'Description', 'Attributes', and 'Brand'.
-             Returns a maximum of 3 results.
+             Returns a maximum of PRODUCT_LIMIT results (3 by default), truncated at PRODUCT_TABLE_MAX_CHARS.
 
     Example:
-        >>> get_product_details_for_brand(tool_context)
+        >>> await get_product_details_for_brand(tool_context)
         '| Title | Description | Attributes | Brand |\\n|---|---|---|---|\\n| Nike Air Max | Comfortable running shoes | Size: 10, Color: Blue | Nike\\n| Nike Sportswear T-Shirt | Cotton blend, short sleeve | Size: L, Color: Black | Nike\\n| Nike Pro Training Shorts | Moisture-wicking fabric | Size: M, Color: Gray | Nike\\n'
     """
     brand = tool_context.user_content.parts[0].text
+    prefetched = tool_context.state.get(PRODUCTS_STATE_KEY)
+    if prefetched is not None:
+        return products_table(prefetched, brand)
+
     if client is None:  # Check if client initialization failed
         return "BigQuery client initialization failed. Cannot execute query."
 
@@ -54,30 +237,25 @@ def get_product_details_for_brand(tool_context: ToolContext):
             Attributes,
             Brand
         FROM
-            {constants.PROJECT}.{constants.DATASET_ID}.{constants.TABLE_ID}
-        WHERE brand LIKE '%{brand}%'
-        LIMIT 3
+            {PRODUCTS_TABLE}
+        WHERE Brand LIKE CONCAT('%', @brand, '%')
+        LIMIT @limit
     """
-    query_job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("parameter1", "STRING", brand)
-        ]
-    )
+    parameters = [
+        bigquery.ScalarQueryParameter("brand", "STRING", brand),
+        bigquery.ScalarQueryParameter("limit", "INT64", constants.PRODUCT_LIMIT),
+    ]
 
-    query_job = client.query(query, job_config=query_job_config)
-    query_job = client.query(query)
-    results = query_job.result()
+    def render() -> str:
+        # Recorded runs keep whole results, so cassettes use the row path.
+        if pa is not None and cassette.active() is None:
+            return stream_products_table(query, parameters, brand, constants.PRODUCT_TABLE_MAX_CHARS)
+        return products_table(run_query(query, parameters), brand)
 
-    markdown_table = "| Title | Description | Attributes | Brand |\n"
-    markdown_table += "|---|---|---|---|\n"
-
-    for row in results:
-        title = row.Title
-        description = row.Description if row.Description else "N/A"
-        attributes = row.Attributes if row.Attributes else "N/A"
-
-        markdown_table += (
-            f"| {title} | {description} | {attributes} | {brand}\n"
-        )
-
-    return markdown_table
+    # Sessions looking up the same brand at the same time share one query,
+    # which runs in a thread so other sessions are not blocked meanwhile.
+    request = {"brand": brand, "limit": constants.PRODUCT_LIMIT, "max_chars": constants.PRODUCT_TABLE_MAX_CHARS}
+    try:
+        return await single_flight.call("bigquery", request, lambda: asyncio.to_thread(render))
+    except resilience.CircuitOpenError as e:
+        return f"BigQuery is temporarily unavailable: {e}"
@@ -0,0 +1,126 @@
+"""
+Helpers for reading the JSON that agents emit as their final text output.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def loads_agent_json(value: Any) -> Optional[Any]:
+    """
+    Parses JSON produced by an LLM agent.
+
+    Accepts already-parsed values, plain JSON strings and JSON wrapped in markdown
+    code fences.
+
+    Args:
+        value (Any): The agent output, usually the value stored under an agent's output_key.
+
+    Returns:
+        Optional[Any]: The parsed value, or None if no JSON could be parsed.
+    """
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    text = str(value).strip()
+    fenced = _FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def extract_json_values(text: str) -> List[Any]:
+    """
+    Extracts every top-level JSON object or array embedded in free text.
+
+    Agents often wrap their JSON in prose or return several blocks (e.g. the
+    search agent's Phase 1 and Phase 2 arrays) in one response.
+
+    Args:
+        text (str): The agent's text output.
+
+    Returns:
+        List[Any]: The parsed values, in the order they appear.
+    """
+    decoder = json.JSONDecoder()
+    values: List[Any] = []
+    position = 0
+    while True:
+        starts = [index for index in (text.find("{", position), text.find("[", position)) if index != -1]
+        if not starts:
+            return values
+        start = min(starts)
+        try:
+            value, end = decoder.raw_decode(text, start)
+        except ValueError:
+            position = start + 1
+            continue
+        values.append(value)
+        position = end
+
+
+class IncrementalJSONParser:
+    """
+    Yields JSON objects from agent text that arrives in chunks, as soon as each is complete.
+
+    Objects are reported when they close at the top level of the text or as
+    elements of a top-level array, so the companies of a streamed
+    ``[{...}, {...}]`` are available one by one while the array is still being
+    written. Prose and markdown fences around the JSON are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        # Open containers: (bracket, start offset in the buffer).
+        self._stack: List[Tuple[str, int]] = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Adds a chunk of text.
+
+        Returns:
+            List[Dict[str, Any]]: The objects completed by this chunk, in order.
+        """
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        for index in range(self._position, len(buffer)):
+            char = buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Quotes only start strings inside JSON; prose quotes are ignored.
+                self._in_string = bool(self._stack)
+            elif char in "{[":
+                self._stack.append((char, index))
+            elif char in "}]" and self._stack:
+                opener, start = self._stack.pop()
+                if (opener == "{") != (char == "}"):
+                    # Mismatched bracket: whatever was open was not JSON.
+                    self._stack.clear()
+                    continue
+                if char == "}" and all(bracket == "[" for bracket, _ in self._stack) and len(self._stack) <= 1:
+                    try:
+                        value = json.loads(buffer[start:index + 1])
+                    except ValueError:
+                        continue
+                    completed.append(value)
+        self._position = len(buffer)
+        if not self._stack and not self._in_string:
+            # Nothing open: the text read so far is not needed any more.
+            self._buffer = ""
+            self._position = 0
+        return completed
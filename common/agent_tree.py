@@ -0,0 +1,49 @@
+"""
+Helpers for walking agent trees and attaching callbacks to them.
+"""
+
+from typing import Any, Callable, Iterator
+
+from google.adk.agents import BaseAgent, LlmAgent
+
+
+def iter_agents(root_agent: BaseAgent) -> Iterator[BaseAgent]:
+    """Yields every agent in the tree rooted at ``root_agent``, each once."""
+    seen = set()
+    stack = [root_agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        yield agent
+        stack.extend(reversed(agent.sub_agents))
+
+
+def iter_llm_agents(root_agent: BaseAgent) -> Iterator[LlmAgent]:
+    """Yields every LLM agent in the tree rooted at ``root_agent``."""
+    for agent in iter_agents(root_agent):
+        if isinstance(agent, LlmAgent):
+            yield agent
+
+
+def add_callback(agent: BaseAgent, field: str, callback: Callable[..., Any]) -> None:
+    """
+    Appends a callback to one of an agent's callback fields, keeping the
+    callbacks that are already configured.
+
+    Args:
+        agent (BaseAgent): The agent to modify.
+        field (str): The callback field, e.g. "before_model_callback".
+        callback (Callable[..., Any]): The callback to add.
+    """
+    existing = getattr(agent, field)
+    if existing is None:
+        callbacks = []
+    elif isinstance(existing, list):
+        callbacks = list(existing)
+    else:
+        callbacks = [existing]
+    if callback not in callbacks:
+        callbacks.append(callback)
+    setattr(agent, field, callbacks)
@@ -0,0 +1,237 @@
+"""
+Record/replay of model and tool interactions ("cassettes").
+
+With CASSETTE_MODE=record, every model response and every recorded tool call
+(Tavily searches, BigQuery rows, browser page sources) is appended to the
+cassette file at CASSETTE_PATH together with how long it took. With
+CASSETTE_MODE=replay, the same requests are answered from the cassette without
+touching the network, after the recorded latency multiplied by
+CASSETTE_TIME_SCALE (1 replays the original timing, 0 replays as fast as
+possible). Google Search results arrive as part of Gemini responses and are
+covered by the model recording.
+
+Interactions are keyed by a fingerprint of their kind and request. Repeated
+identical requests are replayed in recorded order; a request that is not on
+the cassette raises ``CassetteMiss``. Cassettes are gzip-compressed JSON lines,
+one interaction per line, so a recording can be appended to while it runs.
+
+Model calls are recorded through before/after model callbacks installed by
+``instrument``; tools go through ``call_async`` / ``call_sync``.
+"""
+
+import asyncio
+import contextvars
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .agent_tree import add_callback, iter_llm_agents
+from .config import CASSETTE_MODE, CASSETTE_PATH, CASSETTE_TIME_SCALE, MODEL_CACHE_AGENTS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Config fields that do not influence the model output.
+_IGNORED_CONFIG_FIELDS = {"http_options", "labels", "cached_content"}
+
+# Fingerprint and start time of the model call currently being recorded in this task.
+_pending: contextvars.ContextVar[Optional[Tuple[str, float]]] = contextvars.ContextVar(
+    "cassette_pending", default=None
+)
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode for a request that is not on the cassette."""
+
+
+def fingerprint(kind: str, request: Any) -> str:
+    """Returns the cassette key of a request."""
+    encoded = json.dumps({"kind": kind, "request": request}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def model_request(llm_request: LlmRequest) -> Dict[str, Any]:
+    """Returns the parts of a model request that determine its response."""
+    config = llm_request.config
+    return {
+        "model": llm_request.model,
+        "config": config.model_dump(mode="json", exclude_none=True, exclude=_IGNORED_CONFIG_FIELDS)
+        if config is not None else None,
+        "contents": [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents],
+    }
+
+
+class Cassette:
+    """An append-only recording of interactions, replayed per fingerprint in recorded order."""
+
+    def __init__(self, path: str, mode: str, time_scale: float = 1.0):
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._counters = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == REPLAY:
+            self._load()
+        elif mode == RECORD:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self._recorded[entry["key"]].append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in self._recorded.values())} interactions from cassette {self.path}")
+
+    def record(self, kind: str, key: str, elapsed: float, response: Any) -> None:
+        entry = {"kind": kind, "key": key, "elapsed": round(elapsed, 4), "response": response}
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            # Each write is a complete gzip member, so a cassette stays readable if the run is killed.
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+            self._counters["recorded"] += 1
+
+    def replay(self, kind: str, key: str) -> Tuple[Any, float]:
+        """
+        Returns the next recorded response for a request and its scaled delay.
+
+        Raises:
+            CassetteMiss: If the request was not recorded, or all its recordings were used.
+        """
+        with self._lock:
+            entries = self._recorded.get(key)
+            if not entries:
+                self._counters["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} interaction for request {key[:12]} in {self.path}")
+            # The last recording answers any further repeats of the request.
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+            self._counters["replayed"] += 1
+        return entry["response"], entry["elapsed"] * self.time_scale
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def active() -> Optional[Cassette]:
+    """Returns the cassette of this process, or None when neither recording nor replaying."""
+    global _cassette
+    if CASSETTE_MODE not in (RECORD, REPLAY):
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_TIME_SCALE)
+        return _cassette
+
+
+async def call_async(kind: str, request: Any, fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    Awaits ``fn()``, recording its JSON-serializable result, or replays it.
+
+    Args:
+        kind (str): Interaction kind, e.g. "tavily".
+        request (Any): JSON-serializable description of the request, used as its key.
+        fn (Callable[[], Awaitable[T]]): Performs the real call.
+    """
+    cassette = active()
+    if cassette is None:
+        return await fn()
+    key = fingerprint(kind, request)
+    if cassette.mode == REPLAY:
+        response, delay = cassette.replay(kind, key)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+    started = time.monotonic()
+    response = await fn()
+    cassette.record(kind, key, time.monotonic() - started, response)
+    return response
+
+
+def call_sync(kind: str, request: Any, fn: Callable[[], T]) -> T:
+    """Blocking counterpart of ``call_async`` for synchronous tools."""
+    cassette = active()
+    if cassette is None:
+        return fn()
+    key = fingerprint(kind, request)
+    if cassette.mode == REPLAY:
+        response, delay = cassette.replay(kind, key)
+        if delay:
+            time.sleep(delay)
+        return response
+    started = time.monotonic()
+    response = fn()
+    cassette.record(kind, key, time.monotonic() - started, response)
+    return response
+
+
+async def replay_model_response(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """before_model_callback: answers from the cassette when replaying, remembers the request when recording."""
+    _pending.set(None)
+    cassette = active()
+    if cassette is None:
+        return None
+    key = fingerprint("model", model_request(llm_request))
+    if cassette.mode == RECORD:
+        _pending.set((key, time.monotonic()))
+        return None
+    response, delay = cassette.replay("model", key)
+    if delay:
+        await asyncio.sleep(delay)
+    return LlmResponse.model_validate(response)
+
+
+def record_model_response(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """after_model_callback: appends the final response of a recorded model call to the cassette."""
+    pending = _pending.get()
+    if pending is None or llm_response.partial:
+        return None
+    _pending.set(None)
+    key, started = pending
+    active().record("model", key, time.monotonic() - started, llm_response.model_dump(mode="json", exclude_none=True))
+    return None
+
+
+def stats() -> Dict[str, int]:
+    """Returns the recorded/replayed/miss counters of the active cassette."""
+    cassette = active()
+    return cassette.stats() if cassette else {}
+
+
+def install(root_agent: BaseAgent) -> None:
+    """Adds the cassette callbacks to every LLM agent when recording or replaying."""
+    if CASSETTE_MODE not in (RECORD, REPLAY):
+        return
+    for agent in iter_llm_agents(root_agent):
+        add_callback(agent, "before_model_callback", replay_model_response)
+        add_callback(agent, "after_model_callback", record_model_response)
+    logger.info(f"Cassette {CASSETTE_MODE} mode: {CASSETTE_PATH}")
+    if CASSETTE_MODE == RECORD and MODEL_CACHE_AGENTS:
+        # Responses served by the model cache skip the after-model callbacks and are not recorded.
+        logger.warning("Recording a cassette with MODEL_CACHE_AGENTS set; cached model responses will be missing")
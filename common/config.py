@@ -0,0 +1,63 @@
+"""
+Configuration for the shared agent infrastructure.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+CACHE_ROOT = os.getenv(
+    "LEADCONVERT_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
+)
+
+# Model response cache (opt-in per agent: comma-separated agent names, or "*" for all)
+MODEL_CACHE_AGENTS = [name.strip() for name in os.getenv("MODEL_CACHE_AGENTS", "").split(",") if name.strip()]
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(CACHE_ROOT, "model_cache"))
+MODEL_CACHE_MEMORY_BYTES = int(os.getenv("MODEL_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+MODEL_CACHE_DISK_BYTES = int(os.getenv("MODEL_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+# Provider-side context caching of static prompts (opt-in per agent: comma-separated agent names, or "*" for all)
+CONTEXT_CACHE_AGENTS = [name.strip() for name in os.getenv("CONTEXT_CACHE_AGENTS", "").split(",") if name.strip()]
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+CONTEXT_CACHE_REFRESH_SECONDS = int(os.getenv("CONTEXT_CACHE_REFRESH_SECONDS", "300"))
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_MIN_REQUESTS = int(os.getenv("CONTEXT_CACHE_MIN_REQUESTS", "2"))
+CONTEXT_CACHE_MAX_PREFIXES = int(os.getenv("CONTEXT_CACHE_MAX_PREFIXES", "4"))
+
+# Request deadlines (budget for a request that arrives without one)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+
+# Retries and circuit breaking for external dependencies
+RESILIENCE_MAX_ATTEMPTS = int(os.getenv("RESILIENCE_MAX_ATTEMPTS", "3"))
+RESILIENCE_BASE_DELAY_SECONDS = float(os.getenv("RESILIENCE_BASE_DELAY_SECONDS", "0.5"))
+RESILIENCE_MAX_DELAY_SECONDS = float(os.getenv("RESILIENCE_MAX_DELAY_SECONDS", "8"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# Hedged requests (comma-separated dependency names, e.g. "tavily,gemini", or "*" for all)
+HEDGE_DEPENDENCIES = [name.strip() for name in os.getenv("HEDGE_DEPENDENCIES", "").split(",") if name.strip()]
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+# Coalescing of identical concurrent requests (comma-separated dependency names, or "*" for all)
+SINGLE_FLIGHT_DEPENDENCIES = [
+    name.strip() for name in os.getenv("SINGLE_FLIGHT_DEPENDENCIES", "*").split(",") if name.strip()
+]
+
+# Provider rate limits ("name:requests_per_minute,...", e.g. "gemini:600,tavily:100")
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+RATE_LIMIT_INTERACTIVE_RESERVE = float(os.getenv("RATE_LIMIT_INTERACTIVE_RESERVE", "0.2"))
+RATE_LIMIT_COOLDOWN_SECONDS = float(os.getenv("RATE_LIMIT_COOLDOWN_SECONDS", "5"))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "")
+
+# Record/replay of model and tool interactions ("record", "replay", or empty to disable)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "").strip().lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", os.path.join(CACHE_ROOT, "cassettes", "default.jsonl.gz"))
+CASSETTE_TIME_SCALE = float(os.getenv("CASSETTE_TIME_SCALE", "1.0"))
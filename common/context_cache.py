@@ -0,0 +1,271 @@
+"""
+Provider-side context caching for static agent prompts.
+
+The system instruction and tool declarations of an agent are resent on every
+model call. For Gemini models this layer stores them once as cached content
+and makes later requests reference the cache instead, so the static prefix is
+not processed again on every turn. Cached content is billed for its storage
+time, so the layer is opt-in per agent through CONTEXT_CACHE_AGENTS.
+
+A cache is keyed by a hash of model, system instruction, tools and tool config.
+Agents whose instructions embed per-request state (the research and persona
+of the email and persona creators, discovery's excluded companies) have many
+prefixes, several of which are in use by concurrent sessions at once, so each
+agent keeps up to CONTEXT_CACHE_MAX_PREFIXES live caches in LRU order; the
+least recently used one is deleted when another is created, and unused ones
+simply expire. Caches are only created for prefixes that are long enough to be
+accepted by the API and that have been seen CONTEXT_CACHE_MIN_REQUESTS times,
+which keeps one-off prefixes from creating caches. Lifetimes are extended
+before they expire while a prefix is in use.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from google import genai
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from .agent_tree import add_callback, iter_llm_agents
+from .config import (
+    CONTEXT_CACHE_AGENTS,
+    CONTEXT_CACHE_MAX_PREFIXES,
+    CONTEXT_CACHE_MIN_REQUESTS,
+    CONTEXT_CACHE_MIN_TOKENS,
+    CONTEXT_CACHE_REFRESH_SECONDS,
+    CONTEXT_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Keys whose cache creation failed are not retried for this long.
+_FAILURE_BACKOFF_SECONDS = 600
+# Prefixes not yet cached (or not cacheable) whose request counts and failures are remembered.
+_MAX_TRACKED_PREFIXES = 1024
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    expires_at: float
+    agent_key: Tuple[str, str]
+
+
+def _remember(lru: "OrderedDict[str, Any]", key: str, value: Any) -> None:
+    lru[key] = value
+    lru.move_to_end(key)
+    if len(lru) > _MAX_TRACKED_PREFIXES:
+        lru.popitem(last=False)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+def prefix_key(llm_request: LlmRequest) -> Optional[str]:
+    """Returns the hash of the static prefix of a request, or None if it has no system instruction."""
+    config = llm_request.config
+    if config is None or not config.system_instruction:
+        return None
+    payload = {
+        "model": llm_request.model,
+        "system_instruction": _jsonable(config.system_instruction),
+        "tools": _jsonable(config.tools),
+        "tool_config": _jsonable(config.tool_config),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _estimated_prefix_tokens(llm_request: LlmRequest) -> int:
+    config = llm_request.config
+    size = len(json.dumps(_jsonable([config.system_instruction, config.tools]), default=str))
+    return size // 4
+
+
+class ContextCacheManager:
+    """Creates, reuses, extends and evicts cached content for agent prompt prefixes."""
+
+    def __init__(self, max_prefixes: int = CONTEXT_CACHE_MAX_PREFIXES):
+        self.max_prefixes = max(1, max_prefixes)
+        self._client: Optional[genai.Client] = None
+        self._entries: Dict[str, _CacheEntry] = {}
+        # Live cache keys of each (agent, model), least recently used first.
+        self._agent_keys: Dict[Tuple[str, str], "OrderedDict[str, None]"] = {}
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self._failed_until: "OrderedDict[str, float]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._client = genai.Client()
+        return self._client
+
+    @asynccontextmanager
+    async def _key_lock(self, key: str) -> AsyncIterator[None]:
+        """Serializes creation and extension per key; the lock is dropped once nobody holds or awaits it."""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                self._locks.pop(key, None)
+
+    async def cache_name(self, agent_name: str, llm_request: LlmRequest) -> Optional[str]:
+        """Returns the cached content to use for a request, creating or extending it if needed."""
+        key = prefix_key(llm_request)
+        if key is None:
+            return None
+        if key in self._failed_until:
+            if self._failed_until[key] > time.time():
+                return None
+            del self._failed_until[key]
+
+        agent_key = (agent_name, llm_request.model or "")
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            # Expired on the provider side already; nothing to delete.
+            self._forget(key)
+            entry = None
+        if entry is None:
+            seen = self._seen.get(key, 0) + 1
+            _remember(self._seen, key, seen)
+            if seen < CONTEXT_CACHE_MIN_REQUESTS:
+                return None
+            if _estimated_prefix_tokens(llm_request) < CONTEXT_CACHE_MIN_TOKENS:
+                _remember(self._failed_until, key, float("inf"))
+                return None
+
+        async with self._key_lock(key):
+            entry = self._entries.get(key)
+            try:
+                if entry is None:
+                    entry = await self._create(agent_name, agent_key, key, llm_request)
+                elif entry.expires_at - time.time() < CONTEXT_CACHE_REFRESH_SECONDS:
+                    entry = await self._extend(entry)
+            except Exception as e:
+                logger.warning(f"Context cache unavailable for agent '{agent_name}': {e}")
+                self._forget(key)
+                _remember(self._failed_until, key, time.time() + _FAILURE_BACKOFF_SECONDS)
+                return None
+
+        await self._evict_least_recent(agent_key, key)
+        return entry.name
+
+    async def _create(
+        self, agent_name: str, agent_key: Tuple[str, str], key: str, llm_request: LlmRequest
+    ) -> _CacheEntry:
+        config = llm_request.config
+        cached = await self.client.aio.caches.create(
+            model=llm_request.model,
+            config=genai_types.CreateCachedContentConfig(
+                display_name=f"{agent_name}-{key[:12]}",
+                system_instruction=config.system_instruction,
+                tools=config.tools,
+                tool_config=config.tool_config,
+                ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+            ),
+        )
+        entry = _CacheEntry(name=cached.name, expires_at=time.time() + CONTEXT_CACHE_TTL_SECONDS, agent_key=agent_key)
+        self._entries[key] = entry
+        self._seen.pop(key, None)
+        logger.info(f"Created context cache {cached.name} for agent '{agent_name}'")
+        return entry
+
+    async def _extend(self, entry: _CacheEntry) -> _CacheEntry:
+        await self.client.aio.caches.update(
+            name=entry.name,
+            config=genai_types.UpdateCachedContentConfig(ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s"),
+        )
+        entry.expires_at = time.time() + CONTEXT_CACHE_TTL_SECONDS
+        return entry
+
+    def _forget(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._agent_keys.get(entry.agent_key)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._agent_keys[entry.agent_key]
+        return entry
+
+    async def _evict_least_recent(self, agent_key: Tuple[str, str], key: str) -> None:
+        """Marks a key as most recently used and deletes the agent's caches beyond its limit."""
+        keys = self._agent_keys.setdefault(agent_key, OrderedDict())
+        keys[key] = None
+        keys.move_to_end(key)
+        now = time.time()
+        for other in [k for k in keys if k != key]:
+            entry = self._entries.get(other)
+            if entry is None or entry.expires_at <= now:
+                # Expired, or dropped by another agent with the same prompt.
+                keys.pop(other, None)
+                if entry is not None:
+                    self._forget(other)
+        while len(keys) > self.max_prefixes:
+            oldest = next(iter(keys))
+            keys.pop(oldest)
+            evicted = self._forget(oldest)
+            if evicted is None:
+                continue
+            try:
+                await self.client.aio.caches.delete(name=evicted.name)
+                logger.info(f"Deleted least recently used context cache {evicted.name} for agent '{agent_key[0]}'")
+            except Exception as e:
+                logger.warning(f"Could not delete context cache {evicted.name}: {e}")
+
+
+_manager = ContextCacheManager()
+
+
+async def use_cached_context(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """before_model_callback: moves the static prompt prefix into provider-side cached content."""
+    if not (llm_request.model or "").startswith("gemini") or llm_request.config is None:
+        return None
+    if llm_request.config.cached_content:
+        return None
+    name = await _manager.cache_name(callback_context.agent_name, llm_request)
+    if name is None:
+        return None
+    # A request that references cached content must not repeat its parts.
+    llm_request.config.cached_content = name
+    llm_request.config.system_instruction = None
+    llm_request.config.tools = None
+    llm_request.config.tool_config = None
+    return None
+
+
+def is_enabled_for(agent_name: str) -> bool:
+    return "*" in CONTEXT_CACHE_AGENTS or agent_name in CONTEXT_CACHE_AGENTS
+
+
+def install(root_agent: BaseAgent) -> None:
+    """Adds the context cache callback to every LLM agent enabled in CONTEXT_CACHE_AGENTS."""
+    for agent in iter_llm_agents(root_agent):
+        if not is_enabled_for(agent.name):
+            continue
+        add_callback(agent, "before_model_callback", use_cached_context)
+        logger.info(f"Context caching enabled for agent '{agent.name}'")
@@ -0,0 +1,149 @@
+"""
+Per-request deadlines carried through agents, tools and remote calls.
+
+A deadline is set once at the entry point of a request (``deadline_scope``)
+and lives in a context variable, so every model call, tool and sub-agent run
+in the same asyncio task (or a thread started with ``asyncio.to_thread``) sees
+it. Blocking clients take their timeouts from ``timeout(default)``, which
+never exceeds the time left, and remote agents receive the remaining budget
+in the ``X-LeadConvert-Deadline-Ms`` header, or as an absolute time in session
+state for agents served by the ADK API server.
+
+Installed by ``instrument``: model calls get an HTTP timeout matching the time
+left and fail fast once the deadline has passed.
+"""
+
+import contextvars
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from .agent_tree import add_callback, iter_agents, iter_llm_agents
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-LeadConvert-Deadline-Ms"
+DEADLINE_STATE_KEY = "request_deadline"
+
+# Absolute deadline (time.time()) of the current request, if any.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started after the request deadline has passed."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Sets the deadline for the enclosed work. A scope can only shorten an
+    enclosing deadline, never extend it.
+
+    Args:
+        seconds (Optional[float]): Time budget from now; None keeps the current deadline.
+
+    Yields:
+        Optional[float]: The seconds left in the effective deadline.
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds is not None:
+        deadline = time.time() + seconds if current is None else min(current, time.time() + seconds)
+    token = _deadline.set(deadline)
+    try:
+        yield remaining()
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Returns the absolute deadline (epoch seconds) of the current request, if any."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Returns the seconds left until the deadline, or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check() -> None:
+    """Raises DeadlineExceeded if the deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def timeout(default: float) -> float:
+    """
+    Returns the timeout for a blocking call: ``default``, capped at the time left.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    check()
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def propagation_headers() -> Dict[str, str]:
+    """Returns the headers that hand the remaining budget to a remote agent."""
+    left = remaining()
+    return {} if left is None else {DEADLINE_HEADER: str(max(int(left * 1000), 0))}
+
+
+def parse_budget_ms(value: Any) -> Optional[float]:
+    """Returns a caller-sent budget in milliseconds as seconds, or None unless it is a positive finite number."""
+    if isinstance(value, bool):
+        return None
+    try:
+        milliseconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(milliseconds) or milliseconds <= 0:
+        return None
+    return milliseconds / 1000
+
+
+def from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Returns the budget in seconds sent by a caller, or None if it sent none (or an invalid one)."""
+    value = headers.get(DEADLINE_HEADER) or headers.get(DEADLINE_HEADER.lower())
+    return parse_budget_ms(value) if value else None
+
+
+def adopt_state_deadline(callback_context: CallbackContext) -> None:
+    """before_agent_callback: adopts a deadline a remote caller stored in session state."""
+    deadline = callback_context.state.get(DEADLINE_STATE_KEY)
+    if deadline and _deadline.get() is None:
+        _deadline.set(float(deadline))
+    return None
+
+
+def apply_model_deadline(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback: bounds the model call's HTTP timeout by the time left."""
+    left = remaining()
+    if left is None:
+        return None
+    if left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before calling the model for '{callback_context.agent_name}'")
+    http_options = llm_request.config.http_options or genai_types.HttpOptions()
+    timeout_ms = int(left * 1000)
+    if http_options.timeout is None or http_options.timeout > timeout_ms:
+        llm_request.config.http_options = http_options.model_copy(update={"timeout": timeout_ms})
+    return None
+
+
+def install(root_agent: BaseAgent) -> None:
+    """Adds deadline adoption to every agent and model-call timeouts to every LLM agent."""
+    for agent in iter_agents(root_agent):
+        add_callback(agent, "before_agent_callback", adopt_state_deadline)
+    for agent in iter_llm_agents(root_agent):
+        add_callback(agent, "before_model_callback", apply_model_deadline)
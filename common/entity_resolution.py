@@ -0,0 +1,141 @@
+"""
+Company entity resolution.
+
+The same company shows up as "Acme, Inc.", "ACME Inc" or "acme.com" depending
+on which agent or search produced it. These helpers reduce names and websites to
+comparable keys and score how likely two names refer to the same company.
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Optional, Set
+from urllib.parse import urlsplit
+
+LEGAL_SUFFIXES = {
+    "ab", "ag", "as", "bv", "co", "company", "corp", "corporation", "gmbh", "inc",
+    "incorporated", "kg", "limited", "llc", "llp", "lp", "ltd", "nv", "oy", "plc",
+    "pty", "sa", "sarl", "sas", "spa", "srl",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    Normalizes a company name for comparison.
+
+    Lowercases, strips accents and punctuation, and drops a leading "the" and
+    trailing legal suffixes ("Inc", "GmbH", "Ltd", ...).
+
+    Args:
+        name (Optional[str]): The company name as written anywhere.
+
+    Returns:
+        str: The normalized name, e.g. "acme widgets" for "The ACME Widgets, Inc.".
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    text = text.lower().replace("&", " and ")
+    tokens = [token for token in _NON_ALNUM.split(text) if token]
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def normalize_domain(website: Optional[str]) -> Optional[str]:
+    """
+    Reduces a website URL (or bare domain) to its host name without "www.".
+
+    Args:
+        website (Optional[str]): e.g. "https://www.Acme.com/about".
+
+    Returns:
+        Optional[str]: e.g. "acme.com", or None if no host could be found.
+    """
+    if not website or not website.strip():
+        return None
+    value = website.strip().lower()
+    if "://" not in value:
+        value = "//" + value
+    host = urlsplit(value).hostname
+    if not host or "." not in host:
+        return None
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def blocking_keys(normalized_name: str) -> Set[str]:
+    """
+    Returns the keys used to find fuzzy-match candidates for a normalized name.
+
+    Two names are only compared if they share at least one key: a significant
+    token or the name's leading four characters.
+    """
+    keys = {token for token in normalized_name.split() if len(token) >= 3}
+    compact = normalized_name.replace(" ", "")
+    if compact:
+        keys.add("prefix:" + compact[:4])
+    return keys
+
+
+def name_similarity(first: str, second: str) -> float:
+    """
+    Scores how similar two normalized company names are, from 0.0 to 1.0.
+
+    Takes the better of a character-level ratio (typos, spacing) and token overlap
+    (word order, extra descriptors).
+    """
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    char_ratio = _char_ratio(first.replace(" ", ""), second.replace(" ", ""))
+    first_tokens, second_tokens = set(first.split()), set(second.split())
+    token_ratio = len(first_tokens & second_tokens) / len(first_tokens | second_tokens)
+    return max(char_ratio, token_ratio)
+
+
+def _char_ratio(first: str, second: str) -> float:
+    return SequenceMatcher(None, first, second).ratio()
+
+
+def is_fuzzy_match(first: str, second: str, threshold: float) -> bool:
+    """
+    Decides whether two different normalized names are spellings of one company.
+
+    The names must share at least one token exactly, every other token must be a
+    close spelling (character ratio of at least ``threshold``) of a token on the
+    other side, and the names as a whole (in any word order) must reach
+    ``threshold``. A high
+    character ratio alone is not enough: "acme health" and "acme wealth" differ
+    in a whole word and do not match, while "acme helth" matches "acme health".
+
+    Args:
+        first (str): A normalized name.
+        second (str): Another normalized name.
+        threshold (float): Minimum character ratio, from 0.0 to 1.0.
+
+    Returns:
+        bool: True if the names can be treated as the same company.
+    """
+    if not first or not second:
+        return False
+    if first == second:
+        return True
+    first_tokens, second_tokens = first.split(), second.split()
+    shared = set(first_tokens) & set(second_tokens)
+    if not shared or len(first_tokens) != len(second_tokens):
+        return False
+    first_rest = [token for token in first_tokens if token not in shared]
+    second_rest = [token for token in second_tokens if token not in shared]
+    for token in first_rest:
+        match = max(second_rest, key=lambda other: _char_ratio(token, other), default=None)
+        if match is None or _char_ratio(token, match) < threshold:
+            return False
+        second_rest.remove(match)
+    return _char_ratio("".join(sorted(first_tokens)), "".join(sorted(second_tokens))) >= threshold
@@ -0,0 +1,182 @@
+"""
+Hedged requests for latency-sensitive, idempotent calls.
+
+A hedged call starts the request once and, if it has not answered within the
+HEDGE_PERCENTILE of the dependency's own recent latencies, starts a duplicate.
+Whichever attempt answers first wins and the other is cancelled. Hedges are
+limited per dependency to HEDGE_BUDGET_RATIO of its calls, so a slow
+dependency sees at most that much extra load.
+
+Hedging is opt-in per dependency through HEDGE_DEPENDENCIES. It is used for
+Tavily searches and non-streaming Gemini calls (see ``ManagedGemini``); calls
+with side effects (sending email, starting a search run) are never hedged.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from .config import (
+    HEDGE_BUDGET_RATIO,
+    HEDGE_DEPENDENCIES,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Hedges allowed before the budget ratio applies, so low-traffic dependencies can hedge at all.
+_HEDGE_BURST = 2
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Returns the p-th percentile (nearest rank) of the window, or None if it is empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(math.ceil(p / 100 * len(samples)) - 1, 0)
+        return samples[min(rank, len(samples) - 1)]
+
+
+class Hedger:
+    """Hedges the calls of one dependency based on its own latency distribution."""
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = HEDGE_PERCENTILE,
+        budget_ratio: float = HEDGE_BUDGET_RATIO,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker()
+        self._counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_denied": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Returns how long to wait before hedging, or None while there are too few samples."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def _try_spend(self) -> bool:
+        with self._lock:
+            allowed = self._counters["hedged"] < self.budget_ratio * self._counters["calls"] + _HEDGE_BURST
+            self._counters["hedged" if allowed else "hedges_denied"] += 1
+            return allowed
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await fn()
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Awaits ``fn()``, starting a second ``fn()`` if the first is slower than usual.
+
+        Args:
+            fn (Callable[[], Awaitable[T]]): Makes one request; must be safe to run twice concurrently.
+
+        Returns:
+            T: The result of the attempt that succeeded first.
+        """
+        self._count("calls")
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(fn)
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        hedge: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._try_spend():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._timed(fn))
+            logger.debug(f"Hedging call to '{self.name}' after {delay:.2f}s")
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is hedge:
+                            self._count("hedge_wins")
+                        return attempt.result()
+                    if error is None or attempt is primary:
+                        error = attempt.exception()
+            raise error
+        finally:
+            for attempt in (primary, hedge):
+                if attempt is not None and not attempt.done():
+                    attempt.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        threshold = self.hedge_delay()
+        return dict(
+            counters,
+            hedge_win_rate=round(counters["hedge_wins"] / counters["hedged"], 3) if counters["hedged"] else None,
+            threshold_seconds=round(threshold, 3) if threshold is not None else None,
+        )
+
+
+_hedgers: Dict[str, Hedger] = {}
+_registry_lock = threading.Lock()
+
+
+def is_enabled_for(name: str) -> bool:
+    return "*" in HEDGE_DEPENDENCIES or name in HEDGE_DEPENDENCIES
+
+
+def hedger(name: str) -> Hedger:
+    """Returns the shared Hedger for a dependency, creating it with the default settings."""
+    with _registry_lock:
+        if name not in _hedgers:
+            _hedgers[name] = Hedger(name)
+        return _hedgers[name]
+
+
+async def hedged(name: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Awaits ``fn()``, hedged if hedging is enabled for the dependency."""
+    if not is_enabled_for(name):
+        return await fn()
+    return await hedger(name).call(fn)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Returns hedge counters, win rate and current threshold of every hedged dependency."""
+    with _registry_lock:
+        hedgers = list(_hedgers.values())
+    return {h.name: h.stats() for h in hedgers}
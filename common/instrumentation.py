@@ -0,0 +1,31 @@
+"""
+Attaches the shared model-call and tool-call layers to an agent tree.
+
+Every agent package passes its root agent through ``instrument`` once, after the
+tree is built. Each layer decides per agent whether it applies, and the order in
+which layers are installed here is the order their callbacks run in.
+"""
+
+from google.adk.agents import BaseAgent
+
+from . import cassette, context_cache, deadline, model_cache, resilience
+
+
+def instrument(root_agent: BaseAgent) -> BaseAgent:
+    """
+    Installs the shared layers on every agent of a tree.
+
+    Args:
+        root_agent (BaseAgent): The root of the agent tree.
+
+    Returns:
+        BaseAgent: The same root agent, for use as ``root_agent = instrument(agent)``.
+    """
+    deadline.install(root_agent)
+    resilience.install(root_agent)
+    # Before the response cache, so that replayed runs never depend on cache contents.
+    cassette.install(root_agent)
+    model_cache.install(root_agent)
+    # After the response cache, which keys on the full prompt this layer moves into the provider cache.
+    context_cache.install(root_agent)
+    return root_agent
@@ -0,0 +1,267 @@
+"""
+Content-addressed cache for model responses.
+
+Identical requests to a deterministic model produce the same answer, so a
+response can be reused when the model, generation config, system instruction and
+rendered contents all match. Only requests whose generation config sets
+temperature to exactly 0 are cached: with no temperature the provider default
+(about 1.0) applies and the answer is sampled. Responses are kept in a size-bounded in-memory LRU
+tier over a size-bounded on-disk tier; disk reads, writes and eviction scans run
+in worker threads, off the event loop. The cache is opt-in per agent through
+MODEL_CACHE_AGENTS and is installed as before/after model callbacks.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .agent_tree import add_callback, iter_llm_agents
+from .config import (
+    MODEL_CACHE_AGENTS,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_DISK_BYTES,
+    MODEL_CACHE_MEMORY_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Config fields that do not influence the model output.
+_IGNORED_CONFIG_FIELDS = {"http_options", "labels", "cached_content"}
+
+# Key of the request currently waiting for a model response in this task.
+_pending_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "model_cache_pending_key", default=None
+)
+
+
+def is_deterministic(llm_request: LlmRequest) -> bool:
+    """
+    Returns whether a model request sets temperature to exactly 0. Without a
+    temperature the provider default (about 1.0) applies and the answer is sampled,
+    so its response must not be handed to another request.
+    """
+    config = llm_request.config
+    return config is not None and config.temperature is not None and config.temperature == 0
+
+
+def request_key(llm_request: LlmRequest) -> Optional[str]:
+    """
+    Computes the cache key of a model request.
+
+    Returns None for requests that should not be cached because they are
+    sampled (see ``is_deterministic``).
+    """
+    if not is_deterministic(llm_request):
+        return None
+    config = llm_request.config
+    payload = {
+        "model": llm_request.model,
+        "config": config.model_dump(mode="json", exclude_none=True, exclude=_IGNORED_CONFIG_FIELDS),
+        "contents": [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """A memory LRU tier in front of a directory of files, each tier bounded in bytes."""
+
+    def __init__(self, directory: str, memory_bytes: int, disk_bytes: int):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Returns (value, tier) for a cached key, or None on a miss. Blocks on disk I/O."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value, "memory"
+        return self._get_disk(key)
+
+    async def aget(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Like ``get``, reading the disk tier in a worker thread."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value, "memory"
+        return await asyncio.to_thread(self._get_disk, key)
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            return value
+
+    def _get_disk(self, key: str) -> Optional[Tuple[bytes, str]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._remember(key, value)
+        return value, "disk"
+
+    def put(self, key: str, value: bytes) -> None:
+        """Stores a value in both tiers. Blocks on disk I/O."""
+        with self._lock:
+            self._remember(key, value)
+        self._put_disk(key, value)
+
+    async def aput(self, key: str, value: bytes) -> None:
+        """Like ``put``, writing the disk tier (and evicting from it) in a worker thread."""
+        with self._lock:
+            self._remember(key, value)
+        await asyncio.to_thread(self._put_disk, key, value)
+
+    def _put_disk(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write model cache entry {key}: {e}")
+            return
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_disk_size()
+            else:
+                self._disk_size += len(value)
+            if self._disk_size > self.disk_bytes:
+                self._evict_disk()
+
+    def _remember(self, key: str, value: bytes) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        if len(value) > self.memory_bytes:
+            return
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_disk_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict_disk(self) -> None:
+        """Removes least recently used files until the disk tier is at 90% of its bound."""
+        target = int(self.disk_bytes * 0.9)
+        for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self._disk_size <= target:
+                break
+            try:
+                os.remove(path)
+                self._disk_size -= size
+            except OSError:
+                continue
+
+
+_cache = TieredCache(MODEL_CACHE_DIR, MODEL_CACHE_MEMORY_BYTES, MODEL_CACHE_DISK_BYTES)
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(agent_name: str, metric: str) -> None:
+    counters = _stats.setdefault(agent_name, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0})
+    counters[metric] += 1
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns hit/miss counters and the hit rate for every agent using the cache."""
+    stats = {}
+    for agent_name, counters in _stats.items():
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        stats[agent_name] = dict(counters, hit_rate=hits / lookups if lookups else 0.0)
+    return stats
+
+
+async def lookup_cached_response(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """before_model_callback: returns the cached response for an identical request."""
+    _pending_key.set(None)
+    key = request_key(llm_request)
+    if key is None:
+        return None
+
+    cached = await _cache.aget(key)
+    if cached is None:
+        _count(callback_context.agent_name, "misses")
+        _pending_key.set(key)
+        return None
+
+    value, tier = cached
+    _count(callback_context.agent_name, f"{tier}_hits")
+    return LlmResponse.model_validate_json(value)
+
+
+async def store_response(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """after_model_callback: stores complete, successful responses under the pending request key."""
+    key = _pending_key.get()
+    if key is None or llm_response.partial:
+        return None
+    _pending_key.set(None)
+    if llm_response.error_code or not llm_response.content or not llm_response.content.parts:
+        return None
+
+    await _cache.aput(key, llm_response.model_dump_json(exclude_none=True).encode("utf-8"))
+    _count(callback_context.agent_name, "stores")
+    return None
+
+
+def is_enabled_for(agent_name: str) -> bool:
+    return "*" in MODEL_CACHE_AGENTS or agent_name in MODEL_CACHE_AGENTS
+
+
+def install(root_agent: BaseAgent) -> None:
+    """Adds the cache callbacks to every LLM agent enabled in MODEL_CACHE_AGENTS."""
+    for agent in iter_llm_agents(root_agent):
+        if not is_enabled_for(agent.name):
+            continue
+        config = agent.generate_content_config
+        if config is None or config.temperature != 0:
+            logger.warning(
+                f"Agent '{agent.name}' does not set temperature 0; its sampled responses will not be cached"
+            )
+        add_callback(agent, "before_model_callback", lookup_cached_response)
+        add_callback(agent, "after_model_callback", store_response)
+        logger.info(f"Model response cache enabled for agent '{agent.name}'")
@@ -0,0 +1,307 @@
+"""
+Shared token-bucket rate limiting for model and search providers.
+
+Each provider configured in RATE_LIMITS ("gemini:600,tavily:100", requests per
+minute) gets a token bucket holding RATE_LIMIT_BURST_SECONDS worth of requests.
+Every request to the provider, including retries and hedges, takes a token
+first and waits in the provider's queue when there is none.
+
+The queue is ordered by priority class, then arrival. Interactive requests
+(conversation turns, the default) are always served before queued batch
+requests (background jobs, entered with ``priority_scope(BATCH)``). Batch
+requests also leave RATE_LIMIT_INTERACTIVE_RESERVE of the bucket untouched (as
+far as the bucket can hold more than the request itself), so a conversation
+arriving during a bulk run does not wait for a refill. A 429
+from a provider empties its bucket for the advertised or a default cool-down
+instead of letting queued requests run into the same quota error.
+
+With RATE_LIMIT_DB_PATH set, bucket levels are kept in a SQLite file shared by
+all processes on the host, updated in a worker thread so that a busy database
+never blocks the event loop; queuing and priorities stay per process.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import deadline
+from .config import (
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_COOLDOWN_SECONDS,
+    RATE_LIMIT_DB_PATH,
+    RATE_LIMIT_INTERACTIVE_RESERVE,
+    RATE_LIMITS,
+)
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BATCH = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("rate_limit_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: int) -> Iterator[None]:
+    """Sets the priority class of the provider requests made by the enclosed work."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_limits(value: str) -> Dict[str, float]:
+    """Parses "name:requests_per_minute,..." into requests per second by provider."""
+    limits = {}
+    for item in value.split(","):
+        name, _, rpm = item.strip().partition(":")
+        if name and rpm:
+            limits[name.strip()] = float(rpm) / 60
+    return limits
+
+
+class TokenBucket:
+    """Token bucket kept in memory, or in a SQLite file shared between processes."""
+
+    def __init__(self, name: str, rate: float, capacity: float, db: Optional[sqlite3.Connection] = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._db = db
+        self._tokens = capacity
+        self._updated = time.time()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        if db is not None:
+            with self._lock, db:
+                db.execute(
+                    "INSERT OR IGNORE INTO rate_buckets VALUES (?, ?, ?, 0)", (name, capacity, self._updated)
+                )
+
+    def _load(self) -> Tuple[float, float, float]:
+        if self._db is None:
+            return self._tokens, self._updated, self._blocked_until
+        return self._db.execute(
+            "SELECT tokens, updated_at, blocked_until FROM rate_buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+
+    def _store(self, tokens: float, updated: float, blocked_until: float) -> None:
+        if self._db is None:
+            self._tokens, self._updated, self._blocked_until = tokens, updated, blocked_until
+        else:
+            self._db.execute(
+                "UPDATE rate_buckets SET tokens = ?, updated_at = ?, blocked_until = ? WHERE name = ?",
+                (tokens, updated, blocked_until, self.name),
+            )
+
+    def try_take(self, cost: float = 1, keep: float = 0) -> float:
+        """
+        Takes ``cost`` tokens if at least ``cost + keep`` are available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they could be.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated, blocked_until = self._load()
+                now = time.time()
+                if now < blocked_until:
+                    return blocked_until - now
+                tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+                if tokens >= cost + keep:
+                    self._store(tokens - cost, now, blocked_until)
+                    return 0
+                self._store(tokens, now, blocked_until)
+                return (cost + keep - tokens) / self.rate
+            finally:
+                if self._db is not None:
+                    self._db.execute("COMMIT")
+
+    def block(self, seconds: float) -> None:
+        """Empties the bucket and stops refilling it for ``seconds``."""
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("BEGIN IMMEDIATE")
+            try:
+                _, _, blocked_until = self._load()
+                until = max(blocked_until, time.time() + seconds)
+                self._store(0, until, until)
+            finally:
+                if self._db is not None:
+                    self._db.execute("COMMIT")
+
+    @property
+    def shared(self) -> bool:
+        """Whether the bucket level is kept in the SQLite file shared between processes."""
+        return self._db is not None
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            tokens, updated, blocked_until = self._load()
+        now = time.time()
+        return 0 if now < blocked_until else min(self.capacity, tokens + (now - updated) * self.rate)
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.turn = asyncio.Event()
+
+
+class RateLimiter:
+    """Priority queue of requests in front of one provider's token bucket."""
+
+    def __init__(self, bucket: TokenBucket, interactive_reserve: float = RATE_LIMIT_INTERACTIVE_RESERVE):
+        self.bucket = bucket
+        self.reserve = bucket.capacity * interactive_reserve
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "queued": 0, "throttled": 0, "wait_seconds": 0.0}
+
+    def _head(self) -> Optional[_Waiter]:
+        return self._queue[0][2] if self._queue else None
+
+    def _wake_head(self) -> None:
+        head = self._head()
+        if head is not None:
+            head.loop.call_soon_threadsafe(head.turn.set)
+
+    async def _try_take(self, cost: float, keep: float) -> float:
+        if self.bucket.shared:
+            # A shared bucket may wait up to the SQLite busy timeout for other processes.
+            return await asyncio.to_thread(self.bucket.try_take, cost, keep)
+        return self.bucket.try_take(cost, keep)
+
+    async def acquire(self, cost: float = 1) -> None:
+        """Waits for the caller's turn and takes ``cost`` tokens."""
+        priority = _priority.get()
+        # The reserve never exceeds what the bucket can hold beside the request itself.
+        keep = min(self.reserve, max(self.bucket.capacity - cost, 0)) if priority != INTERACTIVE else 0
+        waiter = _Waiter(asyncio.get_running_loop())
+        entry = (priority, next(self._sequence), waiter)
+        with self._lock:
+            self._counters["requests"] += 1
+            heapq.heappush(self._queue, entry)
+            # Requests that cannot be served at once count as queued.
+            queued = self._head() is not waiter
+            if queued:
+                self._counters["queued"] += 1
+            else:
+                waiter.turn.set()
+
+        started = time.monotonic()
+        try:
+            while True:
+                await waiter.turn.wait()
+                with self._lock:
+                    if self._head() is not waiter:
+                        # An interactive request arrived and is served first.
+                        waiter.turn.clear()
+                        continue
+                wait = await self._try_take(cost, keep)
+                if wait == 0:
+                    return
+                if not queued:
+                    queued = True
+                    with self._lock:
+                        self._counters["queued"] += 1
+                left = deadline.remaining()
+                if left is not None and wait > left:
+                    raise deadline.DeadlineExceeded(f"Rate limit for '{self.bucket.name}' would exceed the request deadline")
+                waiter.turn.clear()
+                try:
+                    await asyncio.wait_for(waiter.turn.wait(), wait)
+                except asyncio.TimeoutError:
+                    waiter.turn.set()
+        finally:
+            with self._lock:
+                if queued:
+                    self._counters["wait_seconds"] += time.monotonic() - started
+                was_head = self._head() is waiter
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                if was_head:
+                    self._wake_head()
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Backs off after the provider answered 429."""
+        seconds = retry_after or RATE_LIMIT_COOLDOWN_SECONDS
+        self.bucket.block(seconds)
+        with self._lock:
+            self._counters["throttled"] += 1
+        logger.warning(f"Provider '{self.bucket.name}' is throttling; pausing requests for {seconds:.1f}s")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters, waiting=len(self._queue))
+        counters["wait_seconds"] = round(counters["wait_seconds"], 3)
+        return dict(counters, tokens=round(self.bucket.tokens, 2), capacity=self.bucket.capacity)
+
+
+_LIMITS = parse_limits(RATE_LIMITS)
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+
+
+def _shared_db() -> Optional[sqlite3.Connection]:
+    global _db
+    if RATE_LIMIT_DB_PATH and _db is None:
+        _db = sqlite3.connect(RATE_LIMIT_DB_PATH, check_same_thread=False, isolation_level=None, timeout=30)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL
+            )
+            """
+        )
+    return _db
+
+
+def limiter(name: str) -> Optional[RateLimiter]:
+    """Returns the rate limiter of a provider, or None if no limit is configured for it."""
+    rate = _LIMITS.get(name)
+    if rate is None:
+        return None
+    with _registry_lock:
+        if name not in _limiters:
+            capacity = max(1.0, rate * RATE_LIMIT_BURST_SECONDS)
+            _limiters[name] = RateLimiter(TokenBucket(name, rate, capacity, _shared_db()))
+        return _limiters[name]
+
+
+async def acquire(name: str, cost: float = 1) -> None:
+    """Waits until a request to the provider is allowed; returns at once without a configured limit."""
+    provider = limiter(name)
+    if provider is not None:
+        await provider.acquire(cost)
+
+
+def throttled(name: str, retry_after: Optional[float] = None) -> None:
+    """Reports a 429 from a provider so that its queued requests back off."""
+    provider = limiter(name)
+    if provider is not None:
+        provider.throttled(retry_after)
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Returns queue and bucket counters of every rate-limited provider used so far."""
+    with _registry_lock:
+        limiters = dict(_limiters)
+    return {name: provider.stats() for name, provider in limiters.items()}
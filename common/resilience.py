@@ -0,0 +1,435 @@
+"""
+Retries, backoff and circuit breaking for calls to external dependencies.
+
+Every external call (Gemini, Tavily, BigQuery, SMTP, the search agent) goes
+through a named ``Dependency``:
+
+- retryable errors (timeouts, connection errors, 429 and 5xx responses) are
+  retried with exponential backoff and full jitter, never past the request
+  deadline
+- a per-dependency retry budget lets retries add at most RETRY_BUDGET_RATIO of
+  the dependency's traffic, so a struggling dependency is not hit with a
+  multiple of its normal load
+- a per-dependency circuit breaker opens after BREAKER_FAILURE_THRESHOLD
+  consecutive failures, fails calls fast with ``CircuitOpenError`` while open,
+  and lets a single probe call through after BREAKER_RESET_SECONDS
+
+Counters per dependency, including the state of every breaker, are available
+from ``stats()``. Installed by ``instrument``: Gemini models of an agent tree
+are replaced by ``ManagedGemini``, which applies the same policy to model calls
+(and therefore to the built-in Google Search tool).
+"""
+
+import asyncio
+import logging
+import random
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+from google.adk.agents import BaseAgent
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+
+from . import cassette, deadline, hedging, model_cache, rate_limit, single_flight
+from .agent_tree import iter_llm_agents
+from .config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    RESILIENCE_BASE_DELAY_SECONDS,
+    RESILIENCE_MAX_ATTEMPTS,
+    RESILIENCE_MAX_DELAY_SECONDS,
+    RETRY_BUDGET_MAX_TOKENS,
+    RETRY_BUDGET_RATIO,
+)
+
+try:
+    from google.api_core import exceptions as api_core_exceptions
+except ImportError:
+    api_core_exceptions = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_RETRYABLE_SMTP_CODES = {421, 450, 451, 452}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+def status_code_of(exc: BaseException) -> Optional[int]:
+    """Returns the HTTP status code carried by an exception, if any."""
+    response = getattr(exc, "response", None)
+    for value in (getattr(exc, "status_code", None), getattr(response, "status_code", None), getattr(exc, "code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Returns True for transient errors: timeouts, connection errors, 429 and 5xx responses."""
+    if isinstance(exc, (deadline.DeadlineExceeded, CircuitOpenError)):
+        return False
+    if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    if isinstance(exc, (httpx.HTTPStatusError, genai_errors.APIError)):
+        code = status_code_of(exc)
+        return code is not None and (code == 429 or code >= 500)
+    if isinstance(exc, (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code in _RETRYABLE_SMTP_CODES
+    if api_core_exceptions is not None and isinstance(
+        exc,
+        (
+            api_core_exceptions.TooManyRequests,
+            api_core_exceptions.InternalServerError,
+            api_core_exceptions.BadGateway,
+            api_core_exceptions.ServiceUnavailable,
+            api_core_exceptions.GatewayTimeout,
+        ),
+    ):
+        return True
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Returns the Retry-After seconds sent with an error response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = RESILIENCE_MAX_ATTEMPTS
+    base_delay: float = RESILIENCE_BASE_DELAY_SECONDS
+    max_delay: float = RESILIENCE_MAX_DELAY_SECONDS
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def acquire(self) -> None:
+        """
+        Admits a call.
+
+        Raises:
+            CircuitOpenError: While the breaker is open, or while another call probes it.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_seconds and not self._probing:
+                self._state = HALF_OPEN
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(self.reset_seconds - waited, 0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit for '{self.name}' closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                if self._state == CLOSED:
+                    self.times_opened += 1
+                logger.warning(f"Circuit for '{self.name}' opened after {self._failures} consecutive failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """Ends a call that neither succeeded nor failed because of the dependency."""
+        with self._lock:
+            self._probing = False
+
+
+class RetryBudget:
+    """Every call deposits ``ratio`` tokens and every retry spends one, up to ``max_tokens`` saved."""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = RETRY_BUDGET_MAX_TOKENS):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class Dependency:
+    """An external dependency with its own retry policy, retry budget and circuit breaker."""
+
+    def __init__(self, name: str, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None, budget: Optional[RetryBudget] = None):
+        self.name = name
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.budget = budget or RetryBudget()
+        self._counters = {"calls": 0, "failures": 0, "retries": 0, "retries_denied": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _admit(self) -> None:
+        deadline.check()
+        try:
+            self.breaker.acquire()
+        except CircuitOpenError:
+            self._count("rejected")
+            raise
+        self._count("calls")
+        self.budget.deposit()
+
+    def _retry_delay(self, exc: BaseException, attempt: int, retryable: Callable[[BaseException], bool]) -> Optional[float]:
+        """Records a failed attempt and returns the delay before retrying, or None to give up."""
+        if not retryable(exc):
+            self.breaker.release()
+            return None
+        self._count("failures")
+        self.breaker.record_failure()
+        if status_code_of(exc) == 429:
+            rate_limit.throttled(self.name, retry_after_of(exc))
+        if attempt >= self.policy.max_attempts or self.breaker.state != CLOSED:
+            return None
+        delay = self.policy.delay(attempt)
+        left = deadline.remaining()
+        if left is not None and delay >= left:
+            return None
+        if not self.budget.try_spend():
+            self._count("retries_denied")
+            logger.warning(f"Retry budget for '{self.name}' exhausted, not retrying: {exc}")
+            return None
+        self._count("retries")
+        logger.warning(f"Call to '{self.name}' failed ({type(exc).__name__}: {exc}), retry {attempt} in {delay:.2f}s")
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[T]], retryable: Callable[[BaseException], bool] = is_retryable) -> T:
+        """
+        Awaits ``fn()`` with retries and circuit breaking.
+
+        Args:
+            fn (Callable[[], Awaitable[T]]): Makes one attempt; called again for every retry.
+            retryable (Callable[[BaseException], bool]): Decides which errors are transient.
+
+        Raises:
+            CircuitOpenError: If the dependency's breaker is open.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self._admit()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, retryable)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def call_sync(self, fn: Callable[[], T], retryable: Callable[[BaseException], bool] = is_retryable) -> T:
+        """Blocking counterpart of ``call`` for synchronous clients (BigQuery, SMTP)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            self._admit()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, retryable)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return dict(
+            counters,
+            breaker=self.breaker.state,
+            breaker_opened=self.breaker.times_opened,
+            retry_tokens=round(self.budget.tokens, 2),
+        )
+
+
+_dependencies: Dict[str, Dependency] = {}
+_registry_lock = threading.Lock()
+
+
+def dependency(name: str) -> Dependency:
+    """Returns the shared Dependency for a name, creating it with the default settings."""
+    with _registry_lock:
+        if name not in _dependencies:
+            _dependencies[name] = Dependency(name)
+        return _dependencies[name]
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the counters and breaker state of every dependency used so far."""
+    with _registry_lock:
+        dependencies = list(_dependencies.values())
+    return {dep.name: dep.stats() for dep in dependencies}
+
+
+def open_breakers() -> List[str]:
+    """Returns the names of dependencies whose circuit is currently not closed."""
+    return [name for name, dep_stats in stats().items() if dep_stats["breaker"] != CLOSED]
+
+
+class ManagedGemini(Gemini):
+    """
+    Gemini model whose calls go through the "gemini" dependency.
+
+    A failed call is only retried if it failed before the first response was
+    yielded, so partial streamed output is never repeated. Non-streaming calls
+    are hedged when hedging is enabled for "gemini", and coalesced with
+    identical concurrent requests when single-flight is enabled for it.
+    """
+
+    async def _attempt(self, llm_request: LlmRequest, stream: bool) -> AsyncGenerator[LlmResponse, None]:
+        if stream or not hedging.is_enabled_for("gemini"):
+            await rate_limit.acquire("gemini")
+            async for response in super().generate_content_async(llm_request, stream):
+                yield response
+            return
+        for response in await hedging.hedger("gemini").call(lambda: self._generate_copy(llm_request)):
+            yield response
+
+    async def _generate_copy(self, llm_request: LlmRequest) -> List[LlmResponse]:
+        await rate_limit.acquire("gemini")
+        # Concurrent attempts each get their own request, which Gemini modifies while sending it.
+        request = llm_request.model_copy(
+            update={
+                "contents": list(llm_request.contents),
+                "config": llm_request.config.model_copy(deep=True) if llm_request.config else None,
+            }
+        )
+        return [response async for response in super().generate_content_async(request, False)]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        # Sampled requests are never coalesced: each caller gets its own sample.
+        if stream or not single_flight.is_enabled_for("gemini") or not model_cache.is_deterministic(llm_request):
+            async for response in self._generate(llm_request, stream):
+                yield response
+            return
+        # Identical requests in flight at the same time (e.g. the same grounded search) share one call.
+        responses = await single_flight.call(
+            "gemini",
+            cassette.model_request(llm_request),
+            lambda: self._collect(llm_request),
+        )
+        for response in responses:
+            yield response
+
+    async def _collect(self, llm_request: LlmRequest) -> List[LlmResponse]:
+        return [response async for response in self._generate(llm_request, False)]
+
+    async def _generate(self, llm_request: LlmRequest, stream: bool) -> AsyncGenerator[LlmResponse, None]:
+        dep = dependency("gemini")
+        attempt = 0
+        while True:
+            attempt += 1
+            dep._admit()
+            yielded = False
+            try:
+                async for response in self._attempt(llm_request, stream):
+                    yielded = True
+                    yield response
+            except (asyncio.CancelledError, GeneratorExit):
+                dep.breaker.release()
+                raise
+            except Exception as e:
+                if yielded:
+                    if is_retryable(e):
+                        dep.breaker.record_failure()
+                    else:
+                        dep.breaker.release()
+                    raise
+                delay = dep._retry_delay(e, attempt, is_retryable)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            dep.breaker.record_success()
+            return
+
+
+def install(root_agent: BaseAgent) -> None:
+    """Replaces the Gemini models of an agent tree with ``ManagedGemini``."""
+    for agent in iter_llm_agents(root_agent):
+        if isinstance(agent.model, str) and agent.model.startswith("gemini"):
+            agent.model = ManagedGemini(model=agent.model)
+        elif type(agent.model) is Gemini:
+            agent.model = ManagedGemini(model=agent.model.model)
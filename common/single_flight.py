@@ -0,0 +1,172 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+When several sessions make the same external request at the same moment (the
+same Tavily query, the same BigQuery product lookup, the same Gemini request
+with Google Search grounding), only the first caller performs it; the others
+wait for that call and receive a copy of its result. Nothing is kept once the
+call finishes, so this only removes duplicates that are in flight together and
+is independent of the model and research caches.
+
+The shared call runs as its own task in the context of the caller that started
+it (its deadline and rate-limit priority apply). A caller that is cancelled
+stops waiting without affecting the others; the call itself is cancelled only
+when every caller has gone.
+
+Coalescing is enabled per dependency through SINGLE_FLIGHT_DEPENDENCIES. Gemini
+requests are only coalesced when they set temperature 0; sampled answers are
+never shared between callers.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from .config import SINGLE_FLIGHT_DEPENDENCIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def request_key(request: Any) -> str:
+    """Returns the coalescing key of a JSON-serializable request description."""
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes free-text request parts (search queries) for coalescing."""
+    return " ".join(text.lower().split())
+
+
+class _AsyncFlight:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 1
+
+
+class _SyncFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls to one dependency."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._async: Dict[Tuple[int, str], _AsyncFlight] = {}
+        self._sync: Dict[str, _SyncFlight] = {}
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    async def call(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Awaits ``fn()``, or the in-flight call with the same key."""
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self._counters["calls"] += 1
+            flight = self._async.get(flight_key)
+            if flight is not None:
+                flight.waiters += 1
+                self._counters["coalesced"] += 1
+            else:
+                flight = _AsyncFlight(asyncio.ensure_future(fn()))
+                self._async[flight_key] = flight
+                flight.task.add_done_callback(lambda _: self._finish_async(flight_key, flight))
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0
+            if abandoned:
+                flight.task.cancel()
+            raise
+        # Every caller gets its own copy once the result is shared.
+        return copy.deepcopy(result) if flight.waiters > 1 else result
+
+    def _finish_async(self, flight_key: Tuple[int, str], flight: _AsyncFlight) -> None:
+        with self._lock:
+            if self._async.get(flight_key) is flight:
+                del self._async[flight_key]
+
+    def call_sync(self, key: str, fn: Callable[[], T]) -> T:
+        """Blocking counterpart of ``call`` for calls made from worker threads."""
+        with self._lock:
+            self._counters["calls"] += 1
+            flight = self._sync.get(key)
+            leader = flight is None
+            if leader:
+                flight = _SyncFlight()
+                self._sync[key] = flight
+            else:
+                flight.waiters += 1
+                self._counters["coalesced"] += 1
+
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._sync[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result) if flight.waiters > 1 else flight.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters, in_flight=len(self._async) + len(self._sync))
+        counters["coalesced_ratio"] = round(counters["coalesced"] / counters["calls"], 3) if counters["calls"] else 0.0
+        return counters
+
+
+_groups: Dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+def is_enabled_for(name: str) -> bool:
+    return "*" in SINGLE_FLIGHT_DEPENDENCIES or name in SINGLE_FLIGHT_DEPENDENCIES
+
+
+def group(name: str) -> SingleFlight:
+    """Returns the shared SingleFlight of a dependency."""
+    with _registry_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+async def call(name: str, request: Any, fn: Callable[[], Awaitable[T]]) -> T:
+    """Awaits ``fn()``, coalesced with identical in-flight requests if enabled for the dependency."""
+    if not is_enabled_for(name):
+        return await fn()
+    return await group(name).call(request_key(request), fn)
+
+
+def call_sync(name: str, request: Any, fn: Callable[[], T]) -> T:
+    """Blocking counterpart of ``call``."""
+    if not is_enabled_for(name):
+        return fn()
+    return group(name).call_sync(request_key(request), fn)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Returns call and coalescing counters of every dependency used so far."""
+    with _registry_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
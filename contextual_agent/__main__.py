@@ -1,16 +1,12 @@
 import logging
+import os
 import click
-from .config import DEFAULT_CONTEXTUAL_AGENT_URL
+from .config import DEFAULT_CONTEXTUAL_AGENT_URL, SERVER_WORKERS
 
 # Attempt to import A2A/ADK dependencies
 try:
     import uvicorn
-    from a2a.server.apps import A2AStarletteApplication
-    from a2a.server.request_handlers import DefaultRequestHandler
-    from a2a.server.tasks import InMemoryTaskStore
-    from a2a.types import AgentCapabilities, AgentCard, AgentSkill
-    from .agent import root_agent
-    from .agent_executor import ContextualAgentExecutor
+    from .server import create_app
     ADK_AVAILABLE = True
 except ImportError as e:
     ADK_AVAILABLE = False
@@ -31,140 +27,59 @@ logger = logging.getLogger(__name__)
     default=int(DEFAULT_CONTEXTUAL_AGENT_URL.split(":")[2]),
     help="Port to bind the server to.",
 )
-def main(host: str, port: int):
+@click.option(
+    "--workers",
+    default=SERVER_WORKERS,
+    type=int,
+    help="Number of server processes. Above 1, all state is kept in shared stores (defaults to SERVER_WORKERS).",
+)
+@click.option(
+    "--job-workers",
+    default=None,
+    type=int,
+    help="Number of background job workers per process (defaults to JOB_WORKERS).",
+)
+def main(host: str, port: int, workers: int, job_workers: int | None):
     """Runs the CONTEXTUAL AGENT ADK agent as an A2A server."""
     # Fallback to simple HTTP if ADK/A2A deps missing
     if not ADK_AVAILABLE:
         logger.warning(f"! ! ! CONTEXTUAL AGENT ADK or A2A SDK dependencies not found ({missing_dep}), falling back to simple HTTP service.")
         return
     logger.info(f"Configuring CONTEXTUAL AGENT A2A server...")
-    
+
     try:
-        agent_card = AgentCard(
-            name=root_agent.name,
-            description=root_agent.description,
-            url=f"http://{host}:{port}",
-            version="1.0.0",
-            capabilities=AgentCapabilities(
-                streaming=False,
-                pushNotifications=False,
-            ),
-            defaultInputModes=['text'],
-            defaultOutputModes=['text'],
-            skills=[
-                AgentSkill(
-                    id='client_profiling',
-                    name='Build Ideal Client Profile',
-                    description='Interactive conversation to help build a detailed ideal client profile for sales and lead generation.',
-                    examples=[
-                        "Help me build my ideal client profile",
-                        "I need to understand my target customers better",
-                        "What questions should I ask to identify my perfect client?",
-                    ],
-                    tags=['sales', 'lead-generation', 'client-profiling', 'conversation'],
-                ),
-                AgentSkill(
-                    id='profile_management',
-                    name='Manage Client Profile Data',
-                    description='Update and present client profile information gathered through conversation.',
-                    examples=[
-                        "Show me my current client profile",
-                        "Update my target industry information",
-                        "What client profile data do we have so far?",
-                    ],
-                    tags=['data-management', 'profile', 'update'],
-                )
-            ],
-        )
+        logger.info(f"Starting CONTEXTUAL AGENT A2A server on {host}:{port}")
+        logger.info(f"Client profile endpoints available at:")
+        logger.info(f"  POST http://{host}:{port}/client-profile - Receive profile updates")
+        logger.info(f"  GET  http://{host}:{port}/client-profile - Retrieve a profile (ETag, ?session_id=, ?wait=)")
+        logger.info(f"  GET  http://{host}:{port}/client-profile/events - Stream profile changes (SSE)")
+        logger.info(f"  GET  http://{host}:{port}/health/dependencies - Retry and circuit breaker stats")
+
+        if workers > 1:
+            # Worker processes build their own app from these settings.
+            os.environ["CONTEXTUAL_AGENT_HOST"] = host
+            os.environ["CONTEXTUAL_AGENT_PORT"] = str(port)
+            os.environ["CONTEXTUAL_AGENT_WORKERS"] = str(workers)
+            if job_workers is not None:
+                os.environ["CONTEXTUAL_AGENT_JOB_WORKERS"] = str(job_workers)
+            logger.info(f"Starting Contextual Agent A2A server on http://{host}:{port}/ with {workers} workers")
+            uvicorn.run(
+                "contextual_agent.server:create_app_from_env",
+                factory=True,
+                host=host,
+                port=port,
+                workers=workers,
+            )
+        else:
+            starlette_app = create_app(host, port, job_workers=job_workers)
+            logger.info(f"Starting Contextual Agent A2A server on http://{host}:{port}/")
+            uvicorn.run(starlette_app, host=host, port=port)
+
     except AttributeError as e:
         logger.error(
             f"Error accessing attributes from contextual_agent: {e}. Is agent.py correct?"
         )
         raise
-
-    try:
-        agent_executor = ContextualAgentExecutor()
-        
-        task_store = InMemoryTaskStore()
-        
-        request_handler = DefaultRequestHandler(agent_executor, task_store)
-        
-        app_builder = A2AStarletteApplication(
-            agent_card=agent_card,
-            http_handler=request_handler
-        )
-        
-        # Add custom endpoint for client profile updates
-        from starlette.applications import Starlette
-        from starlette.responses import JSONResponse
-        from starlette.routing import Route
-        import json as json_lib
-        
-        # Global storage for the latest client profile
-        latest_client_profile = {"profile": None, "timestamp": None}
-        
-        async def receive_client_profile(request):
-            """Endpoint to receive client profile updates"""
-            try:
-                body = await request.body()
-                profile_data = json_lib.loads(body)
-                
-                # Store the profile with timestamp
-                import datetime
-                latest_client_profile["profile"] = profile_data
-                latest_client_profile["timestamp"] = datetime.datetime.now().isoformat()
-                
-                logger.info(f"Received client profile update: {len(str(profile_data))} characters")
-                
-                return JSONResponse({
-                    "status": "success",
-                    "message": "Client profile received and stored",
-                    "timestamp": latest_client_profile["timestamp"]
-                })
-            except Exception as e:
-                logger.error(f"Error receiving client profile: {e}")
-                return JSONResponse({
-                    "status": "error",
-                    "message": str(e)
-                }, status_code=400)
-        
-        async def get_client_profile(request):
-            """Endpoint to retrieve the latest client profile"""
-            if latest_client_profile["profile"] is None:
-                return JSONResponse({
-                    "status": "no_profile",
-                    "message": "No client profile available yet"
-                }, status_code=404)
-            
-            return JSONResponse({
-                "status": "success",
-                "profile": latest_client_profile["profile"],
-                "timestamp": latest_client_profile["timestamp"]
-            })
-        
-        # Get the Starlette app and add custom routes
-        starlette_app = app_builder.build()
-        
-        # Add the custom routes
-        profile_routes = [
-            Route("/client-profile", receive_client_profile, methods=["POST"]),
-            Route("/client-profile", get_client_profile, methods=["GET"]),
-        ]
-        
-        # Extend the existing routes
-        starlette_app.router.routes.extend(profile_routes)
-        
-        logger.info(f"Starting CONTEXTUAL AGENT A2A server on {host}:{port}")
-        logger.info(f"Client profile endpoints available at:")
-        logger.info(f"  POST http://{host}:{port}/client-profile - Receive profile updates")
-        logger.info(f"  GET  http://{host}:{port}/client-profile - Retrieve latest profile")
-        
-        # Start the Server
-        import uvicorn
-    
-        logger.info(f"Starting Contextual Agent A2A server on http://{host}:{port}/")
-        uvicorn.run(starlette_app, host=host, port=port)
-            
     except Exception as e:
         logger.error(f"Failed to start CONTEXTUAL AGENT A2A server: {e}")
         raise
@@ -1,8 +1,19 @@
 from google.adk.agents import Agent
 from google.adk.agents.sequential_agent import SequentialAgent
-from typing import Optional, List, Dict, Any
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+from typing import Awaitable, Callable, Optional, List, Dict, Any
+import asyncio
+import copy
 import json
-import requests
+import httpx
+from common import deadline, resilience
+from common.agent_json import IncrementalJSONParser, extract_json_values
+from common.instrumentation import instrument
+from .config import TEMPERATURE, TOP_K, TOP_P
+from .compaction import PROFILE_STATE_KEY, compact_history
+from .profile_store import profile_store
+from .lead_store import company_identity, get_store as get_lead_store, is_lead, segment_key
 from .sub_agents.profile_checker_agent import profile_checker_agent
 
 client_profile: Dict[str, Any] = {
@@ -41,13 +52,15 @@ def update_client_profile(
     location: Optional[str] = None,
     green_flags: Optional[List[str]] = None,
     red_flags: Optional[List[str]] = None,
+    tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
     """
     Updates the client profile with new information gathered from the conversation.
     This function acts as the "memory" or "state manager" for the agent.
 
     Args:
-        current_profile (Optional[Dict[str, Any]]): The profile to update. Defaults to the global profile.
+        current_profile (Optional[Dict[str, Any]]): The profile to update. Defaults to the session's profile,
+            or the global profile outside of an agent run.
         service_provided (Optional[str]): A description of the user's primary service offering.
         unique_value_prop (Optional[str]): The user's unique value proposition.
         specific_pain_points_solved (Optional[List[str]]): A list of client problems the user's service solves.
@@ -58,8 +71,16 @@ def update_client_profile(
         location (Optional[str]): The geographical location of the ideal client.
         green_flags (Optional[List[str]]): A list of positive signals indicating a good time to engage.
         red_flags (Optional[List[str]]): A list of negative signals indicating a reason to avoid contact.
+        tool_context (Optional[ToolContext]): Injected by ADK; the updated profile is stored in session state
+            and published to the session's /client-profile subscribers.
     """
-    profile: Dict[str, Any] = current_profile if current_profile is not None else client_profile
+    if current_profile is not None:
+        profile = current_profile
+    elif tool_context is not None:
+        # Each session builds its own profile, kept in session state so that any server process can continue it.
+        profile = copy.deepcopy(tool_context.state.get(PROFILE_STATE_KEY) or client_profile)
+    else:
+        profile = client_profile
 
     # Ensure nested structures exist
     user_info = profile.setdefault("user_info", {})
@@ -99,25 +120,93 @@ def update_client_profile(
         opportunity_signals["green_flags"].extend(green_flags)
     if red_flags:
         opportunity_signals["red_flags"].extend(red_flags)
+
+    if tool_context is not None:
+        tool_context.state[PROFILE_STATE_KEY] = copy.deepcopy(profile)
+        profile_store.publish(tool_context._invocation_context.session.id, profile)
         
     return profile
 
 
-def present_client_profile() -> None:
+def present_client_profile(tool_context: Optional[ToolContext] = None) -> None:
     """
     Presents the current, in-progress client profile to the user.
     This function prints the entire profile state in a clean, human-readable
     JSON format, allowing the user to see the progress of the conversation.
 
     Args:
-        None
+        tool_context (Optional[ToolContext]): Injected by ADK; the session's profile is presented.
     """
+    profile = tool_context.state.get(PROFILE_STATE_KEY) if tool_context is not None else None
     print("\n" * 100)
-    print(json.dumps(client_profile, indent=2))
+    print(json.dumps(profile or client_profile, indent=2))
     print("\n" * 100)
 
 
-def send_to_search_agent(
+LeadCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _parse_sse_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parses one line of an ADK /run_sse stream; returns None for lines that carry no event."""
+    if not line.startswith("data:"):
+        return None
+    try:
+        event = json.loads(line[len("data:"):].strip())
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def _event_text(event: Dict[str, Any]) -> str:
+    """Returns the text parts of an ADK event."""
+    return "".join(part.get("text") or "" for part in (event.get("content") or {}).get("parts") or [])
+
+
+class _LeadStream:
+    """
+    Picks leads out of the search agent's streamed events as soon as each record is complete.
+
+    Partial events carry the answer of an agent in chunks, which go through an
+    incremental parser per agent; the final event of an answer repeats its whole
+    text and catches anything that was not streamed. Each company is reported once.
+    """
+
+    def __init__(self, on_lead: Optional[LeadCallback] = None):
+        self.on_lead = on_lead
+        self.leads: List[Dict[str, Any]] = []
+        self._parsers: Dict[str, IncrementalJSONParser] = {}
+        self._seen: set = set()
+
+    async def add(self, event: Dict[str, Any]) -> None:
+        author = event.get("author") or ""
+        text = _event_text(event)
+        if event.get("partial"):
+            records = self._parsers.setdefault(author, IncrementalJSONParser()).feed(text)
+        else:
+            self._parsers.pop(author, None)
+            records = []
+            for value in extract_json_values(text):
+                records.extend(value if isinstance(value, list) else [value])
+        for record in records:
+            if not is_lead(record):
+                continue
+            identity = company_identity(record.get("name"), record.get("website"))
+            if identity in self._seen:
+                continue
+            self._seen.add(identity)
+            self.leads.append(record)
+            if self.on_lead is not None:
+                await self.on_lead(record)
+
+
+def _search_not_started(exc: BaseException) -> bool:
+    """Retry predicate for /run_sse: only errors that mean the search never started are retried."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in (429, 502, 503, 504)
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+async def send_to_search_agent(
     profile_data: Dict[str, Any],
     user_id: str = "contextual_agent_user",
     session_id: str = "search_session"
@@ -125,6 +214,14 @@ def send_to_search_agent(
     """
     Sends the client profile data to the search agent running on Google Cloud Run.
     This function creates a session and sends the profile data to find potential clients.
+    Companies already found for the same segment are sent as an exclusion list, and
+    the Phase 2 records of the response are saved to the local lead store.
+
+    If the calling task is cancelled, the pending HTTP request is aborted and the
+    remote session is deleted before the cancellation propagates. Timeouts are
+    capped by the request deadline, which is passed on to the search agent.
+    Transient failures are retried, and calls fail fast while the search agent's
+    circuit breaker is open.
 
     Args:
         profile_data (Dict[str, Any]): The complete client profile to send to the search agent
@@ -134,93 +231,180 @@ def send_to_search_agent(
     Returns:
         Dict[str, Any]: The response from the search agent containing potential clients
     """
+    return await stream_search_agent(profile_data, user_id, session_id)
+
+
+async def stream_search_agent(
+    profile_data: Dict[str, Any],
+    user_id: str = "contextual_agent_user",
+    session_id: str = "search_session",
+    on_lead: Optional[LeadCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a search on the search agent, streaming its answer.
+
+    Each lead is saved to the lead store and passed to ``on_lead`` as soon as
+    its record is complete in the stream, so downstream work on the first
+    company can start while the search agent is still writing the others.
+
+    Args:
+        profile_data (Dict[str, Any]): The complete client profile.
+        user_id (str): The user ID for the remote session.
+        session_id (str): The remote session ID.
+        on_lead (Optional[LeadCallback]): Awaited with each new lead record as it arrives.
+
+    Returns:
+        Dict[str, Any]: The search result, as returned by ``send_to_search_agent``.
+    """
     base_url = "https://search-678974019191.europe-north1.run.app"
+    segment = segment_key(profile_data)
+    lead_store = await asyncio.to_thread(get_lead_store)
+    session_url = f"{base_url}/apps/search_agent/users/{user_id}/sessions/{session_id}"
     
-    try:
-        # Step 1: Create/Initialize session with the profile data as state
-        session_url = f"{base_url}/apps/search_agent/users/{user_id}/sessions/{session_id}"
-        session_payload = {
-            "state": {
-                "client_profile": profile_data,
-                "search_initiated": True
+    search_agent = resilience.dependency("search_agent")
+
+    async with httpx.AsyncClient() as client:
+
+        def headers() -> Dict[str, str]:
+            return {"Content-Type": "application/json", **deadline.propagation_headers()}
+
+        async def post(url: str, payload: Dict[str, Any], timeout: float) -> httpx.Response:
+            response = await client.post(url, headers=headers(), json=payload, timeout=deadline.timeout(timeout))
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            return response
+
+        async def open_stream(url: str, payload: Dict[str, Any], timeout: float) -> httpx.Response:
+            request = client.build_request("POST", url, headers=headers(), json=payload, timeout=deadline.timeout(timeout))
+            response = await client.send(request, stream=True)
+            if response.status_code != 200:
+                await response.aread()
+                await response.aclose()
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+            return response
+
+        try:
+            # Step 1: Create/Initialize session with the profile data as state
+            # Lead store calls hit SQLite, so they run off the event loop.
+            excluded_companies = await asyncio.to_thread(lead_store.known_companies, segment)
+            session_payload = {
+                "state": {
+                    "client_profile": profile_data,
+                    "search_initiated": True,
+                    "excluded_companies": excluded_companies,
+                    deadline.DEADLINE_STATE_KEY: deadline.get_deadline(),
+                }
             }
-        }
-        
-        print(f"Creating session at: {session_url}")
-        session_response = requests.post(
-            session_url,
-            headers={"Content-Type": "application/json"},
-            json=session_payload,
-            timeout=30
-        )
-        
-        if session_response.status_code not in [200, 201]:
-            return {
-                "error": f"Failed to create session: {session_response.status_code}",
-                "details": session_response.text
+            
+            print(f"Creating session at: {session_url}")
+            session_response = await search_agent.call(lambda: post(session_url, session_payload, 30))
+            
+            if session_response.status_code not in [200, 201]:
+                return {
+                    "error": f"Failed to create session: {session_response.status_code}",
+                    "details": session_response.text
+                }
+            
+            # Step 2: Send search request message
+            search_url = f"{base_url}/run_sse"
+            search_message = f"Please search for potential clients based on this profile: {json.dumps(profile_data)}"
+            
+            search_payload = {
+                "app_name": "search_agent",
+                "user_id": user_id,
+                "session_id": session_id,
+                "new_message": {
+                    "role": "user",
+                    "parts": [{
+                        "text": search_message
+                    }]
+                },
+                "streaming": True
             }
-        
-        # Step 2: Send search request message
-        search_url = f"{base_url}/run_sse"
-        search_message = f"Please search for potential clients based on this profile: {json.dumps(profile_data)}"
-        
-        search_payload = {
-            "app_name": "search_agent",
-            "user_id": user_id,
-            "session_id": session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{
-                    "text": search_message
-                }]
-            },
-            "streaming": False
-        }
-        
-        print(f"Sending search request to: {search_url}")
-        search_response = requests.post(
-            search_url,
-            headers={"Content-Type": "application/json"},
-            json=search_payload,
-            timeout=60
-        )
-        
-        if search_response.status_code == 200:
-            response_data = search_response.json()
+            
+            print(f"Sending search request to: {search_url}")
+            search_response = await search_agent.call(
+                lambda: open_stream(search_url, search_payload, 60), retryable=_search_not_started
+            )
+            
+            if search_response.status_code != 200:
+                return {
+                    "error": f"Search request failed: {search_response.status_code}",
+                    "details": search_response.text,
+                    "session_created": True
+                }
+
+            events: List[Dict[str, Any]] = []
+            new_leads = 0
+
+            async def save_lead(lead: Dict[str, Any]) -> None:
+                nonlocal new_leads
+                new_leads += await asyncio.to_thread(lead_store.upsert_leads, [lead], segment)
+                if on_lead is not None:
+                    await on_lead(lead)
+
+            stream = _LeadStream(save_lead)
+            try:
+                async with asyncio.timeout(deadline.remaining()):
+                    async for line in search_response.aiter_lines():
+                        event = _parse_sse_line(line)
+                        if event is None:
+                            continue
+                        if not event.get("partial"):
+                            events.append(event)
+                        await stream.add(event)
+            finally:
+                await search_response.aclose()
+
             return {
                 "success": True,
                 "session_created": True,
-                "search_results": response_data,
+                "search_results": events,
+                "leads": stream.leads,
+                "new_leads": new_leads,
                 "message": "Successfully found potential clients matching your profile"
             }
-        else:
+                
+        except asyncio.CancelledError:
+            # Release the remote session; the search itself stops with the closed connection.
+            try:
+                await asyncio.shield(client.delete(session_url, timeout=5))
+            except (httpx.HTTPError, asyncio.CancelledError):
+                pass
+            raise
+        except (httpx.TimeoutException, TimeoutError):
             return {
-                "error": f"Search request failed: {search_response.status_code}",
-                "details": search_response.text,
-                "session_created": True
+                "error": "Request timed out",
+                "details": "The search agent took too long to respond"
+            }
+        except httpx.ConnectError:
+            return {
+                "error": "Connection failed",
+                "details": "Could not connect to the search agent"
+            }
+        except resilience.CircuitOpenError as e:
+            return {
+                "error": "Search agent unavailable",
+                "details": str(e)
+            }
+        except httpx.HTTPStatusError as e:
+            return {
+                "error": f"Search agent returned {e.response.status_code}",
+                "details": e.response.text
+            }
+        except Exception as e:
+            return {
+                "error": f"Unexpected error: {str(e)}",
+                "details": "An unexpected error occurred while communicating with the search agent"
             }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "error": "Request timed out",
-            "details": "The search agent took too long to respond"
-        }
-    except requests.exceptions.ConnectionError:
-        return {
-            "error": "Connection failed",
-            "details": "Could not connect to the search agent"
-        }
-    except Exception as e:
-        return {
-            "error": f"Unexpected error: {str(e)}",
-            "details": "An unexpected error occurred while communicating with the search agent"
-        }
 
 
 # Main contextual agent with sub-agents
 contextual_agent = Agent(
     name="contextual_agent",
     model="gemini-2.5-pro",
+    generate_content_config=types.GenerateContentConfig(temperature=TEMPERATURE, top_p=TOP_P, top_k=TOP_K),
     description="An agent that interviews a user to build a detailed 'Ideal Client Profile' for sales and lead generation.",
     instruction="""
         ## PRIMARY OBJECTIVE
@@ -280,7 +464,8 @@ contextual_agent = Agent(
         - **Confirmation and Completion:** Once the ProfileCheckerAgent confirms the profile is complete (returns "yes"), ask me to confirm if everything looks correct. If I agree, present the final, complete profile one last time.
     """,
     tools=[update_client_profile, present_client_profile],
-    sub_agents=[profile_checker_agent]
+    sub_agents=[profile_checker_agent],
+    before_model_callback=compact_history,
 )
 
-root_agent = contextual_agent
\ No newline at end of file
+root_agent = instrument(contextual_agent)
\ No newline at end of file
@@ -1,8 +1,11 @@
+import asyncio
 import json
 import logging
-from typing import Any
+import os
+import sqlite3
+from contextlib import aclosing
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
-from pathlib import Path
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
@@ -10,43 +13,127 @@ from a2a.server.tasks import TaskUpdater
 from a2a.types import DataPart, Part, TaskState
 
 from google.adk import Runner
-from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
 from google.adk.artifacts import InMemoryArtifactService
 from google.genai import types as genai_types
 
-from .agent import root_agent
-from .config import DEFAULT_UI_CLIENT_URL
+from common import deadline
+from common.config import REQUEST_DEADLINE_SECONDS
+
+from .agent import client_profile, root_agent
+from .compaction import PROFILE_STATE_KEY
+from .config import DEFAULT_UI_CLIENT_URL, EVENT_LOG_PATH, JOB_POLL_INTERVAL
+from .jobs import JobQueue
 
 logger = logging.getLogger(__name__)
 
-# Initialize logging to file
-root_path = Path.cwd()
-log_file = root_path / "contextual_agent/contextual_agent.log"
+# ADK events of every conversation turn go to their own log file
+event_logger = logging.getLogger("contextual_agent.events")
+event_logger.propagate = False
+
+
+def configure_event_log(per_process: bool = False) -> str:
+    """
+    Starts this process's event log, replacing the file of a previous run.
+
+    Args:
+        per_process (bool): Write to contextual_agent.<pid>.log instead of
+            EVENT_LOG_PATH, so that several server workers do not overwrite
+            each other's log.
+
+    Returns:
+        str: The log file path.
+    """
+    path = EVENT_LOG_PATH
+    if per_process:
+        root, extension = os.path.splitext(EVENT_LOG_PATH)
+        path = f"{root}.{os.getpid()}{extension}"
+    for handler in list(event_logger.handlers):
+        event_logger.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(path, mode="w", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("\n[%(asctime)s.%(msecs)03d] %(message)s\n", "%Y-%m-%d %H:%M:%S"))
+    event_logger.addHandler(handler)
+    event_logger.setLevel(logging.INFO)
+    event_logger.info(f"=== CONTEXTUAL AGENT LOG - {datetime.now().isoformat()} (pid {os.getpid()}) ===")
+    return path
+
 
 def log_to_file(message: str):
-    """Write log message to file with timestamp"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write('\n')
-        f.write(f"[{timestamp}] {message}\n")
-        f.write('\n')
+    """Write log message to the event log with timestamp"""
+    if not event_logger.handlers:
+        configure_event_log()
+    event_logger.info(message)
+
+
+# A2A operations that are run as background jobs, mapped to their job kind
+JOB_OPERATIONS = {
+    "search_leads": "search",
+    "research_company": "research",
+    "send_email": "send_email",
+}
+
+
+def _job_request(context: RequestContext) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Returns (job kind, payload) if the message asks for a background job operation."""
+    if not context.message or not context.message.parts:
+        return None
+    for part_union in context.message.parts:
+        part = part_union.root
+        if isinstance(part, DataPart) and part.data.get("operation") in JOB_OPERATIONS:
+            kind = JOB_OPERATIONS[part.data["operation"]]
+            payload = {key: value for key, value in part.data.items() if key != "operation"}
+            return kind, payload
+    return None
+
+
+def _request_budget(context: RequestContext) -> float:
+    """Returns the request's time budget: the caller's deadline header, a "deadline_ms" field, or the default."""
+    if context.call_context is not None:
+        budget = deadline.from_headers(context.call_context.state.get("headers") or {})
+        if budget is not None:
+            return budget
+    for part_union in (context.message.parts if context.message else []):
+        part = part_union.root
+        if isinstance(part, DataPart) and part.data.get("deadline_ms") is not None:
+            budget = deadline.parse_budget_ms(part.data["deadline_ms"])
+            if budget is not None:
+                return budget
+            logger.warning(f"Ignoring invalid deadline_ms {part.data['deadline_ms']!r}; using the default budget")
+    return REQUEST_DEADLINE_SECONDS
 
-with open(log_file, 'w', encoding='utf-8') as f:
-    f.write(f"=== CONTEXTUAL AGENT LOG - {datetime.now().isoformat()} ===\n\n")
 
 class ContextualAgentExecutor(AgentExecutor):
     """Executes the Contextual ADK agent logic in response to A2A requests."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        job_queue: Optional[JobQueue] = None,
+        session_service: Optional[BaseSessionService] = None,
+    ):
+        self._job_queue = job_queue
+        # Running ADK executions by task ID, so cancel() can stop them.
+        self._running_runs: Dict[str, asyncio.Task] = {}
+        # Polls the job database for cancellations requested through other server processes.
+        self._cancel_watcher: Optional[asyncio.Task] = None
         self._adk_agent = root_agent
         self._adk_runner = Runner(
             app_name="contextual_agent_runner",
             agent=self._adk_agent,
             artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
+            session_service=session_service or InMemorySessionService(),
         )
         logger.info("ContextualAgentExecutor initialized with ADK Runner.")
 
+    async def _session_profile(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Returns the client profile built in a conversation session, if any."""
+        if not session_id:
+            return None
+        session = await self._adk_runner.session_service.get_session(
+            app_name=self._adk_runner.app_name, user_id="a2a_user", session_id=session_id
+        )
+        return session.state.get(PROFILE_STATE_KEY) if session else None
+
     async def execute(self, context: RequestContext, event_queue: EventQueue):
         task_updater = TaskUpdater(event_queue, context.task_id, context.context_id)
         
@@ -55,6 +142,38 @@ class ContextualAgentExecutor(AgentExecutor):
         if not context.current_task:
             task_updater.submit(message=context.message)
 
+        job_request = _job_request(context) if self._job_queue else None
+        if job_request:
+            kind, payload = job_request
+            existing_job = self._job_queue.get(context.task_id)
+            if existing_job:
+                task_updater.update_status(
+                    TaskState.working,
+                    message=task_updater.new_agent_message(
+                        parts=[Part(root=DataPart(data={
+                            "status": existing_job["status"],
+                            "job_id": existing_job["id"],
+                            "progress": existing_job["progress"],
+                        }))]
+                    ),
+                )
+                return
+            if kind == "search" and "profile" not in payload:
+                payload["profile"] = await self._session_profile(context.context_id) or client_profile
+            # Held as pending until the request handler has stored this task,
+            # so worker updates are not overwritten by the submission.
+            job_id = self._job_queue.enqueue(
+                kind, payload, job_id=context.task_id, context_id=context.context_id, pending=True
+            )
+            logger.info(f"Task {context.task_id}: Submitted {kind} job")
+            task_updater.update_status(
+                TaskState.working,
+                message=task_updater.new_agent_message(
+                    parts=[Part(root=DataPart(data={"status": "queued", "job_id": job_id, "kind": kind}))]
+                ),
+            )
+            return
+
         task_updater.start_work(
             message=task_updater.new_agent_message(
                 parts=[
@@ -160,26 +279,33 @@ class ContextualAgentExecutor(AgentExecutor):
                     ]
                 )
             
-            async for event in self._adk_runner.run_async(
+            self._running_runs[context.task_id] = asyncio.current_task()
+            self._watch_cancellations()
+            budget = _request_budget(context)
+            events = self._adk_runner.run_async(
                 user_id="a2a_user",
                 session_id=session_id_for_adk,
                 new_message=adk_content,
-            ):
-                log_entry = f" ** - - - - - ** \n [Event] Author: {event.author}, \n Type: {type(event).__name__}, \n Final: {event.is_final_response()}, \n Content: {event.content}"
-                log_to_file(log_entry)
+            )
+            with deadline.deadline_scope(budget):
+                # aclosing makes a cancelled or timed out run close the model stream and pending tool calls.
+                async with asyncio.timeout(budget), aclosing(events):
+                    async for event in events:
+                        log_entry = f" ** - - - - - ** \n [Event] Author: {event.author}, \n Type: {type(event).__name__}, \n Final: {event.is_final_response()}, \n Content: {event.content}"
+                        log_to_file(log_entry)
                 
-                if event.is_final_response():
-                    if event.content and event.content.parts:
-                        # Extract the agent's response
-                        for part in event.content.parts:
-                            if hasattr(part, 'function_call') and part.function_call:
-                                # Handle function calls if any
-                                if part.function_call.name in ["update_client_profile", "present_client_profile"]:
-                                    final_result["function_called"] = part.function_call.name
-                                    if part.function_call.args:
-                                        final_result["function_args"] = part.function_call.args
-                            elif hasattr(part, "text") and part.text:
-                                final_result["response"] = part.text
+                        if event.is_final_response():
+                            if event.content and event.content.parts:
+                                # Extract the agent's response
+                                for part in event.content.parts:
+                                    if hasattr(part, 'function_call') and part.function_call:
+                                        # Handle function calls if any
+                                        if part.function_call.name in ["update_client_profile", "present_client_profile"]:
+                                            final_result["function_called"] = part.function_call.name
+                                            if part.function_call.args:
+                                                final_result["function_args"] = part.function_call.args
+                                    elif hasattr(part, "text") and part.text:
+                                        final_result["response"] = part.text
 
             task_updater.add_artifact(
                 parts=[Part(root=DataPart(data=final_result))],
@@ -187,6 +313,17 @@ class ContextualAgentExecutor(AgentExecutor):
             )
             task_updater.complete()
 
+        except TimeoutError as e:
+            logger.warning(f"Task {context.task_id}: Deadline exceeded: {e}")
+            task_updater.failed(
+                message=task_updater.new_agent_message(
+                    parts=[Part(root=DataPart(data={"error": "Deadline exceeded"}))]
+                )
+            )
+        except asyncio.CancelledError:
+            # The canceled status is reported by cancel().
+            logger.info(f"Task {context.task_id}: ADK run cancelled")
+            raise
         except Exception as e:
             logger.exception(f"Task {context.task_id}: Error running Contextual ADK agent: {e}")
             task_updater.failed(
@@ -194,12 +331,52 @@ class ContextualAgentExecutor(AgentExecutor):
                     parts=[Part(root=DataPart(data={"error": f"ADK Agent error: {e}"}))]
                 )
             )
+        finally:
+            self._running_runs.pop(context.task_id, None)
+
+    def _watch_cancellations(self) -> None:
+        if self._job_queue is None or (self._cancel_watcher is not None and not self._cancel_watcher.done()):
+            return
+        self._cancel_watcher = asyncio.create_task(self._cancellation_watcher(), name="turn-cancel-watcher")
+
+    async def _cancellation_watcher(self) -> None:
+        """Cancels local runs whose cancellation reached another server process; stops when none are left."""
+        while self._running_runs:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            try:
+                requested = self._job_queue.cancel_requested(list(self._running_runs))
+            except sqlite3.Error as e:
+                logger.error(f"Could not check for cancelled turns: {e}")
+                continue
+            for task_id in requested:
+                run = self._running_runs.pop(task_id, None)
+                if run is not None and not run.done():
+                    logger.info(f"Task {task_id}: Cancelling ADK run (cancelled through another worker)")
+                    run.cancel()
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue):
-        logger.warning(f"Cancellation not implemented for Contextual Agent task: {context.task_id}")
+        """
+        Cancels a task: its background job if it is one, otherwise the running
+        ADK execution, which aborts in-flight model and tool calls.
+        """
         task_updater = TaskUpdater(event_queue, context.task_id, context.context_id)
-        task_updater.failed(
+
+        if self._job_queue and self._job_queue.cancel(context.task_id):
+            logger.info(f"Task {context.task_id}: Background job cancelled")
+
+        run = self._running_runs.pop(context.task_id, None)
+        if run is not None and not run.done():
+            logger.info(f"Task {context.task_id}: Cancelling ADK run")
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+        elif self._job_queue:
+            # The turn may be running in another server process, which polls for this.
+            self._job_queue.request_cancel(context.task_id)
+
+        task_updater.update_status(
+            TaskState.canceled,
             message=task_updater.new_agent_message(
-                parts=[Part(root=DataPart(data={"error": "Task cancelled"}))]
-            )
+                parts=[Part(root=DataPart(data={"status": "canceled"}))]
+            ),
+            final=True,
         )
@@ -0,0 +1,93 @@
+"""
+Prompt compaction for long profiling conversations.
+
+ADK replays the whole session to the model on every turn. The facts gathered
+so far are already captured by ``update_client_profile``, which records the
+profile in session state, so older turns can be replaced by that structured
+profile: the model sees a short summary of the completed phases followed by the
+most recent turns. Only the prompt is compacted; the session keeps every event.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from .config import COMPACTION_ENABLED, COMPACTION_KEEP_TURNS, COMPACTION_MIN_CONTENTS
+
+logger = logging.getLogger(__name__)
+
+PROFILE_STATE_KEY = "client_profile"
+
+# Interview phases and the profile fields each one fills in.
+PHASES = [
+    ("Phase 1: Understand My Business", ["user_info.service_provided", "user_info.unique_value_prop"]),
+    ("Phase 2: Define the Core Outreach Message", [
+        "user_info.core_messaging.specific_pain_points_solved",
+        "user_info.core_messaging.key_benefits_and_outcomes",
+        "user_info.core_messaging.competitor_differentiators",
+    ]),
+    ("Phase 3: Identify the Ideal Client Company", [
+        "ideal_client.company_profile.industry_niche",
+        "ideal_client.company_profile.company_size",
+        "ideal_client.company_profile.location",
+    ]),
+    ("Phases 4-5: Buying Signals", [
+        "ideal_client.opportunity_signals.green_flags",
+        "ideal_client.opportunity_signals.red_flags",
+    ]),
+]
+
+
+def _field(profile: Dict[str, Any], path: str) -> Any:
+    value: Any = profile
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def completed_phases(profile: Dict[str, Any]) -> List[str]:
+    """Returns the names of the interview phases whose fields are all filled in."""
+    return [name for name, fields in PHASES if all(_field(profile, path) for path in fields)]
+
+
+def _is_user_turn(content: genai_types.Content) -> bool:
+    """A user turn is a user message with text, as opposed to a function response."""
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def _summary_content(profile: Dict[str, Any]) -> genai_types.Content:
+    phases = completed_phases(profile)
+    summary = (
+        "CONVERSATION SUMMARY (earlier turns were compacted; do not repeat questions already answered)\n"
+        f"Completed phases: {', '.join(phases) if phases else 'none'}\n"
+        f"Client profile gathered so far:\n{json.dumps(profile, separators=(',', ':'))}"
+    )
+    return genai_types.Content(role="user", parts=[genai_types.Part(text=summary)])
+
+
+def compact_history(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """
+    before_model_callback: replaces all but the last COMPACTION_KEEP_TURNS user
+    turns with a summary built from the stored client profile.
+    """
+    if not COMPACTION_ENABLED or len(llm_request.contents) < COMPACTION_MIN_CONTENTS:
+        return None
+    profile = callback_context.state.get(PROFILE_STATE_KEY)
+    if not profile:
+        return None
+
+    # Cut at the start of a user turn so function calls stay paired with their responses.
+    user_turns = [index for index, content in enumerate(llm_request.contents) if _is_user_turn(content)]
+    if len(user_turns) <= COMPACTION_KEEP_TURNS:
+        return None
+    cut = user_turns[-COMPACTION_KEEP_TURNS]
+
+    dropped = len(llm_request.contents[:cut])
+    llm_request.contents = [_summary_content(profile)] + llm_request.contents[cut:]
+    logger.info(f"Compacted {dropped} earlier contents into the client profile summary")
+    return None
@@ -12,8 +12,59 @@ load_dotenv()
 DEFAULT_CONTEXTUAL_AGENT_URL = "http://localhost:8080"
 DEFAULT_UI_CLIENT_URL = os.getenv("UI_CLIENT_URL", "http://localhost:3000")
 
+# ADK event log of conversation turns (one file per process when running several server workers)
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", os.path.join(os.path.dirname(__file__), "contextual_agent.log"))
+
 # Model configuration
 MODEL = os.getenv("MODEL", "gemini-2.5-pro")
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.0"))
 TOP_P = float(os.getenv("TOP_P", "0.95"))
 TOP_K = int(os.getenv("TOP_K", "40"))
+
+# Lead store (persists search results and excludes known companies from new searches)
+LEAD_STORE_PATH = os.getenv("LEAD_STORE_PATH", os.path.join(os.path.dirname(__file__), "leads.db"))
+LEAD_EXCLUSION_LIMIT = int(os.getenv("LEAD_EXCLUSION_LIMIT", "50"))
+
+# Background jobs (long-running lead searches and company research)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2.0"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "900"))
+# Runs of a job whose worker died or hung before it is failed instead of requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are deleted from the queue after this long
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+
+# Push notifications (task state changes sent to client callback URLs)
+PUSH_SIGNING_SECRET = os.getenv("PUSH_SIGNING_SECRET", "")
+PUSH_MAX_RETRIES = int(os.getenv("PUSH_MAX_RETRIES", "3"))
+PUSH_BACKOFF_SECONDS = float(os.getenv("PUSH_BACKOFF_SECONDS", "1.0"))
+PUSH_TIMEOUT = float(os.getenv("PUSH_TIMEOUT", "10"))
+PUSH_MAX_CONNECTIONS = int(os.getenv("PUSH_MAX_CONNECTIONS", "20"))
+# Accept callback URLs on loopback/private hosts (local testing with push_receiver only)
+PUSH_ALLOW_PRIVATE_URLS = os.getenv("PUSH_ALLOW_PRIVATE_URLS", "false").lower() == "true"
+
+# Task store (persists A2A tasks and evicts finished ones)
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", os.path.join(os.path.dirname(__file__), "tasks.db"))
+TASK_STORE_TTL_HOURS = float(os.getenv("TASK_STORE_TTL_HOURS", "24"))
+TASK_STORE_MAX_BYTES = int(os.getenv("TASK_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+TASK_STORE_EVICTION_INTERVAL = float(os.getenv("TASK_STORE_EVICTION_INTERVAL", "300"))
+
+# Prompt compaction (older conversation turns replaced by the stored client profile)
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+COMPACTION_KEEP_TURNS = int(os.getenv("COMPACTION_KEEP_TURNS", "4"))
+COMPACTION_MIN_CONTENTS = int(os.getenv("COMPACTION_MIN_CONTENTS", "16"))
+
+# Server processes (above 1, all state is kept in stores shared by the processes)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+SESSION_DB_URL = os.getenv(
+    "SESSION_DB_URL", f"sqlite:///{os.path.join(os.path.dirname(__file__), 'sessions.db')}"
+)
+PUSH_CONFIG_PATH = os.getenv("PUSH_CONFIG_PATH", os.path.join(os.path.dirname(__file__), "push_configs.db"))
+PROFILE_STORE_PATH = os.getenv("PROFILE_STORE_PATH", os.path.join(os.path.dirname(__file__), "profiles.db"))
+# Sessions whose client profile is kept; the least recently updated ones are dropped beyond this
+PROFILE_STORE_MAX_SESSIONS = int(os.getenv("PROFILE_STORE_MAX_SESSIONS", "10000"))
+AFFINITY_HEADER = os.getenv("AFFINITY_HEADER", "X-Session-Affinity")
+AFFINITY_COOKIE = os.getenv("AFFINITY_COOKIE", "leadconvert_affinity")
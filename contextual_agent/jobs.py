@@ -0,0 +1,697 @@
+"""
+Durable background jobs for long-running lead searches and company research.
+
+A job is submitted as an A2A message and answered at once with its task ID; the
+work itself is stored in a local SQLite queue and executed by a pool of async
+workers. Workers report status, progress and results by updating the A2A task,
+so clients follow a job with the regular tasks/get API.
+
+Job lifecycle: pending -> queued -> running -> completed | failed | canceled.
+Jobs are created "pending" while the submitting request is still being handled
+and only become claimable once the request handler has persisted the task, so
+worker updates are never overwritten by the submission itself. Running jobs are
+kept alive by a heartbeat; jobs of a worker process that died are requeued, so
+several server processes can share one queue. A job whose runs keep dying or
+hanging is failed after JOB_MAX_ATTEMPTS, and finished jobs are deleted after
+JOB_RETENTION_HOURS.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+from a2a.server.context import ServerCallContext
+from a2a.server.events import Event
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import TaskStore
+from a2a.types import (
+    Artifact,
+    DataPart,
+    Message,
+    MessageSendParams,
+    Part,
+    Role,
+    Task,
+    TaskState,
+    TaskStatus,
+)
+
+from common import deadline, rate_limit
+
+from .config import (
+    JOB_DB_PATH,
+    JOB_DEADLINE_SECONDS,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_RETENTION_HOURS,
+    JOB_STALE_SECONDS,
+    JOB_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "canceled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    context_id TEXT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    progress_message TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_context ON jobs(context_id);
+CREATE TABLE IF NOT EXISTS cancel_requests (
+    task_id TEXT PRIMARY KEY,
+    requested_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    context_id: Optional[str]
+    kind: str
+    payload: Dict[str, Any]
+    status: str
+    progress: float
+    attempts: int
+
+
+class JobQueue:
+    """SQLite-backed durable job queue."""
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._available = asyncio.Event()
+        self._cancel_listeners: List[Callable[[str], None]] = []
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        job_id: Optional[str] = None,
+        context_id: Optional[str] = None,
+        pending: bool = False,
+    ) -> str:
+        """
+        Adds a job to the queue.
+
+        Args:
+            kind (str): The job handler to run, e.g. "search" or "research".
+            payload (Dict[str, Any]): JSON-serializable input for the handler.
+            job_id (Optional[str]): The job ID; the A2A task ID when submitted over A2A.
+            context_id (Optional[str]): The A2A context the job belongs to.
+            pending (bool): If True the job waits for ``release`` before workers can claim it.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, context_id, kind, payload, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, context_id, kind, json.dumps(payload), "pending" if pending else "queued", now, now),
+            )
+        if not pending:
+            self._available.set()
+        return job_id
+
+    def release(self, job_id: str) -> bool:
+        """Makes a pending job claimable. Returns False if the job was not pending."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ? AND status = 'pending'",
+                (time.time(), job_id),
+            )
+        if cursor.rowcount:
+            self._available.set()
+        return bool(cursor.rowcount)
+
+    def claim(self) -> Optional[Job]:
+        """Atomically takes the oldest queued job and marks it running."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(
+            id=row["id"],
+            context_id=row["context_id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status="running",
+            progress=row["progress"],
+            attempts=row["attempts"] + 1,
+        )
+
+    def update_progress(self, job_id: str, progress: float, message: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, progress_message = ?, updated_at = ? WHERE id = ?",
+                (progress, message, time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """
+        Records a job's outcome. Finished jobs are never changed again, so a job
+        canceled while running keeps its canceled status.
+
+        Returns:
+            bool: True if the outcome was recorded.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"""
+                UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'completed' THEN 1 ELSE progress END,
+                                result = ?, error = ?, updated_at = ?
+                WHERE id = ? AND status NOT IN ({",".join("?" * len(FINISHED_STATUSES))})
+                """,
+                (status, status, json.dumps(result) if result is not None else None, error,
+                 time.time(), job_id, *FINISHED_STATUSES),
+            )
+        return bool(cursor.rowcount)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job that has not finished. Running jobs are stopped by their
+        worker pool: immediately in this process, at the next heartbeat in others.
+
+        Returns:
+            bool: True if the job was cancelled.
+        """
+        canceled = self.finish(job_id, "canceled", error="Job cancelled")
+        if canceled:
+            for listener in list(self._cancel_listeners):
+                listener(job_id)
+        return canceled
+
+    def add_cancel_listener(self, listener: Callable[[str], None]) -> None:
+        self._cancel_listeners.append(listener)
+
+    def canceled(self, job_ids: List[str]) -> List[str]:
+        """Returns which of the given jobs have been cancelled."""
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'canceled' AND id IN ({', '.join('?' * len(job_ids))})",
+                job_ids,
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def request_cancel(self, task_id: str) -> None:
+        """Asks the server process running a conversation turn to cancel it."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cancel_requests (task_id, requested_at) VALUES (?, ?)",
+                (task_id, time.time()),
+            )
+
+    def cancel_requested(self, task_ids: List[str]) -> List[str]:
+        """Returns which of the given conversation turns have a pending cancel request, consuming the requests."""
+        if not task_ids:
+            return []
+        placeholders = ", ".join("?" * len(task_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT task_id FROM cancel_requests WHERE task_id IN ({placeholders})", task_ids
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    f"DELETE FROM cancel_requests WHERE task_id IN ({', '.join('?' * len(rows))})",
+                    [row["task_id"] for row in rows],
+                )
+        return [row["task_id"] for row in rows]
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Marks running jobs as alive so ``recover`` leaves them to their worker."""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = 'running' AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids),
+            )
+
+    def requeue(self, job_id: str) -> None:
+        """Returns a running job to the queue when its worker shuts down; the interrupted run is not counted."""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), updated_at = ?
+                WHERE id = ? AND status = 'running'
+                """,
+                (time.time(), job_id),
+            )
+        self._available.set()
+
+    def exhausted(self, stale_seconds: float = JOB_STALE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS) -> List[Job]:
+        """Returns running jobs without a heartbeat for ``stale_seconds`` that have used up their attempts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                (time.time() - stale_seconds, max_attempts),
+            ).fetchall()
+        return [
+            Job(
+                id=row["id"],
+                context_id=row["context_id"],
+                kind=row["kind"],
+                payload=json.loads(row["payload"]),
+                status=row["status"],
+                progress=row["progress"],
+                attempts=row["attempts"],
+            )
+            for row in rows
+        ]
+
+    def recover(self, stale_seconds: float = JOB_STALE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Requeues jobs whose worker is gone: running jobs without a heartbeat for
+        ``stale_seconds`` that have attempts left (see ``exhausted`` for the
+        others), and pending jobs whose submitting request never completed its
+        handoff.
+
+        Returns:
+            int: The number of requeued jobs.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', updated_at = ?
+                WHERE (status = 'running' AND updated_at < ? AND attempts < ?)
+                   OR (status = 'pending' AND created_at < ?)
+                """,
+                (now, now - stale_seconds, max_attempts, now - stale_seconds),
+            )
+            # Requests for turns that finished before any process saw them.
+            self._conn.execute("DELETE FROM cancel_requests WHERE requested_at < ?", (now - stale_seconds,))
+        if cursor.rowcount:
+            self._available.set()
+        return cursor.rowcount
+
+    def prune(self, max_age_seconds: float = JOB_RETENTION_HOURS * 3600) -> int:
+        """Deletes finished jobs last updated more than ``max_age_seconds`` ago; returns how many."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND updated_at < ?",
+                (*FINISHED_STATUSES, time.time() - max_age_seconds),
+            )
+        return cursor.rowcount
+
+    async def wait_for_work(self, timeout: float) -> None:
+        """Waits until a job may be available or ``timeout`` seconds have passed."""
+        try:
+            await asyncio.wait_for(self._available.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._available.clear()
+
+
+class JobContext:
+    """Handed to job handlers to report progress."""
+
+    def __init__(self, job: Job, pool: "WorkerPool"):
+        self.job = job
+        self._pool = pool
+
+    async def report_progress(self, progress: float, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        await self._pool.report_progress(self.job, progress, message, data)
+
+
+JobHandler = Callable[[Dict[str, Any], JobContext], Awaitable[Any]]
+
+
+class WorkerPool:
+    """A pool of async workers that run queued jobs and mirror their state into A2A tasks."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        task_store: TaskStore,
+        handlers: Dict[str, JobHandler],
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.task_store = task_store
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+        queue.add_cancel_listener(self._cancel_local)
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(n), name=f"job-worker-{n}") for n in range(self.workers)
+        ]
+        self._worker_tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+        logger.info(f"Started {self.workers} job worker(s)")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                # BEGIN IMMEDIATE may wait for other processes' writes; keep it off the event loop.
+                job = await asyncio.to_thread(self.queue.claim)
+            except sqlite3.Error as e:
+                logger.error(f"Job worker {number}: could not claim a job: {e}")
+                job = None
+            if job is None:
+                await self.queue.wait_for_work(self.poll_interval)
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self) -> None:
+        """
+        Keeps this pool's running jobs alive, stops cancelled ones, requeues jobs
+        of workers that died (failing those out of attempts) and prunes old jobs.
+        """
+        while True:
+            try:
+                running = list(self._running)
+                await asyncio.to_thread(self.queue.heartbeat, running)
+                # Jobs cancelled through another server process.
+                for job_id in await asyncio.to_thread(self.queue.canceled, running):
+                    self._cancel_local(job_id)
+                for job in await asyncio.to_thread(self.queue.exhausted):
+                    logger.error(f"Job {job.id}: giving up after {job.attempts} interrupted attempt(s)")
+                    await self._finish(
+                        job, "failed", error=f"Job interrupted {job.attempts} times (worker died or hung)"
+                    )
+                recovered = await asyncio.to_thread(self.queue.recover)
+                if recovered:
+                    logger.info(f"Requeued {recovered} interrupted job(s)")
+                pruned = await asyncio.to_thread(self.queue.prune)
+                if pruned:
+                    logger.info(f"Deleted {pruned} finished job(s)")
+            except sqlite3.Error as e:
+                logger.error(f"Job heartbeat failed: {e}")
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+
+    def _cancel_local(self, job_id: str) -> None:
+        task = self._running.get(job_id)
+        if task is not None:
+            logger.info(f"Job {job_id}: cancelling")
+            task.cancel()
+
+    async def _run(self, job: Job) -> None:
+        # Each job runs in its own task so cancelling it leaves the worker loop running.
+        task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+        self._running[job.id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Cancelling the worker also cancels the job; cancelling only the job leaves the worker running.
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            self._running.pop(job.id, None)
+
+    async def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            await self._finish(job, "failed", error=f"Unknown job kind: {job.kind}")
+            return
+
+        logger.info(f"Job {job.id}: running {job.kind} job (attempt {job.attempts})")
+        await self._update_task(job, TaskState.working, {"status": "running", "job_id": job.id, "progress": job.progress})
+        try:
+            # Jobs are batch work: conversation turns get the provider quota first.
+            with deadline.deadline_scope(JOB_DEADLINE_SECONDS), rate_limit.priority_scope(rate_limit.BATCH):
+                async with asyncio.timeout(JOB_DEADLINE_SECONDS):
+                    result = await handler(job.payload, JobContext(job, self))
+        except TimeoutError:
+            logger.warning(f"Job {job.id}: deadline of {JOB_DEADLINE_SECONDS:.0f}s exceeded")
+            await self._finish(job, "failed", error="Deadline exceeded")
+            return
+        except asyncio.CancelledError:
+            if self._stopping:
+                # Picked up again after the restart.
+                self.queue.requeue(job.id)
+            else:
+                await self._finish(job, "canceled", error="Job cancelled")
+                logger.info(f"Job {job.id}: cancelled")
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job.id}: {job.kind} job failed: {e}")
+            await self._finish(job, "failed", error=str(e))
+            return
+        await self._finish(job, "completed", result=result)
+
+    async def report_progress(
+        self, job: Job, progress: float, message: str, data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if self._running.get(job.id) is None or self._running[job.id].cancelling():
+            return
+        await asyncio.to_thread(self.queue.update_progress, job.id, progress, message)
+        await self._update_task(
+            job, TaskState.working,
+            {**(data or {}), "status": "running", "job_id": job.id, "progress": progress, "message": message},
+        )
+
+    async def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        if not await asyncio.to_thread(self.queue.finish, job.id, status, result, error):
+            return
+        state = {"completed": TaskState.completed, "failed": TaskState.failed, "canceled": TaskState.canceled}[status]
+        data: Dict[str, Any] = {"status": status, "job_id": job.id}
+        if error:
+            data["error"] = error
+        artifact = None
+        if result is not None:
+            artifact = Artifact(
+                artifactId=str(uuid.uuid4()),
+                name=f"{job.kind}_result",
+                parts=[Part(root=DataPart(data=result if isinstance(result, dict) else {"result": result}))],
+            )
+        await self._update_task(job, state, data, artifact)
+
+    async def _update_task(
+        self, job: Job, state: TaskState, data: Dict[str, Any], artifact: Optional[Artifact] = None
+    ) -> None:
+        task = await self.task_store.get(job.id)
+        if task is None:
+            logger.warning(f"Job {job.id}: no A2A task to update")
+            return
+        task.status = TaskStatus(
+            state=state,
+            message=Message(
+                role=Role.agent,
+                taskId=task.id,
+                contextId=task.contextId,
+                messageId=str(uuid.uuid4()),
+                parts=[Part(root=DataPart(data=data))],
+            ),
+            timestamp=datetime.now(timezone.utc).isoformat(),
+        )
+        if artifact is not None:
+            task.artifacts = (task.artifacts or []) + [artifact]
+        await self.task_store.save(task)
+
+
+class JobRequestHandler(DefaultRequestHandler):
+    """
+    Request handler that hands pending jobs to the worker pool once the request
+    that submitted them has been fully processed and its task persisted.
+    """
+
+    def __init__(self, *args, job_queue: JobQueue, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job_queue = job_queue
+
+    async def on_message_send(
+        self, params: MessageSendParams, context: ServerCallContext | None = None
+    ) -> Message | Task:
+        result = await super().on_message_send(params, context)
+        if isinstance(result, Task):
+            self.job_queue.release(result.id)
+        return result
+
+    async def on_message_send_stream(
+        self, params: MessageSendParams, context: ServerCallContext | None = None
+    ) -> AsyncGenerator[Event, None]:
+        task_id = None
+        try:
+            async for event in super().on_message_send_stream(params, context):
+                task_id = getattr(event, "taskId", None) or getattr(event, "id", None) or task_id
+                yield event
+        finally:
+            if task_id:
+                self.job_queue.release(task_id)
+
+
+async def run_search_job(payload: Dict[str, Any], job_context: JobContext) -> Dict[str, Any]:
+    """
+    Runs a lead search on the remote search agent for the profile in the payload.
+
+    Each lead is reported in a progress update ("lead") as soon as the search
+    agent has written it, so clients following the task can act on the first
+    companies while the rest are still being enriched.
+    """
+    from .agent import stream_search_agent
+
+    found = 0
+
+    async def on_lead(lead: Dict[str, Any]) -> None:
+        nonlocal found
+        found += 1
+        await job_context.report_progress(
+            min(0.9, 0.1 + 0.15 * found), f"Found {lead.get('name')}", {"lead": lead}
+        )
+
+    await job_context.report_progress(0.1, "Searching for potential clients")
+    return await stream_search_agent(
+        payload["profile"],
+        payload.get("user_id", "contextual_agent_user"),
+        f"search_{job_context.job.id}",
+        on_lead=on_lead,
+    )
+
+
+def _research_job_pipeline(payload: Dict[str, Any]):
+    """
+    Builds the part of the research pipeline a research job runs.
+
+    Research always runs; "persona": true adds the persona creator and
+    "draft_email": true also drafts the email. The email sender is never part of
+    a job: sending is the separate, explicit "send_email" operation.
+    """
+    from google.adk.agents import SequentialAgent
+    from research_personal_agent.agent import root_agent as research_pipeline
+
+    stages = {agent.name: agent for agent in research_pipeline.sub_agents}
+    names = ["research_agent"]
+    if payload.get("persona") or payload.get("draft_email"):
+        names.append("persona_creator")
+    if payload.get("draft_email"):
+        names.append("email_creator")
+    # Clones, since an agent can only belong to one parent.
+    return SequentialAgent(
+        name="research_job_pipeline",
+        description="Research, and optionally persona and email drafting, for one company",
+        sub_agents=[stages[name].clone() for name in names],
+    )
+
+
+async def run_research_job(payload: Dict[str, Any], job_context: JobContext) -> Dict[str, Any]:
+    """Runs research (and, if asked, persona and email drafting) for the company in the payload; never sends email."""
+    from google.adk import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+
+    research_pipeline = _research_job_pipeline(payload)
+    stages = [agent.name for agent in research_pipeline.sub_agents]
+    runner = Runner(
+        app_name="research_job_runner",
+        agent=research_pipeline,
+        session_service=InMemorySessionService(),
+    )
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id="job_user",
+        state={
+            "company_name": payload.get("company_name"),
+            "company_website": payload.get("company_website"),
+        },
+    )
+    message = payload.get("message") or payload.get("company_name") or ""
+
+    completed_stages = set()
+    async for event in runner.run_async(
+        user_id="job_user",
+        session_id=session.id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part(text=message)]),
+    ):
+        if event.author in stages and event.is_final_response() and event.author not in completed_stages:
+            completed_stages.add(event.author)
+            await job_context.report_progress(len(completed_stages) / len(stages), f"{event.author} finished")
+
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="job_user", session_id=session.id
+    )
+    return {key: session.state.get(key) for key in ("research", "persona", "email") if key in session.state}
+
+
+async def run_send_email_job(payload: Dict[str, Any], job_context: JobContext) -> Dict[str, Any]:
+    """Sends one email whose recipient, subject and content are all given explicitly in the payload."""
+    from research_personal_agent.tools import send_email
+
+    missing = [key for key in ("receiver_email", "subject", "content") if not payload.get(key)]
+    if missing:
+        raise ValueError(f"send_email requires {', '.join(missing)}")
+    await job_context.report_progress(0.1, f"Sending email to {payload['receiver_email']}")
+    result = json.loads(await send_email(
+        payload["receiver_email"],
+        payload.get("receiver_name") or "",
+        payload["subject"],
+        payload["content"],
+    ))
+    if result.get("status") == "error":
+        raise RuntimeError(result.get("error") or "Email could not be sent")
+    return result
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "search": run_search_job,
+    "research": run_research_job,
+    "send_email": run_send_email_job,
+}
@@ -0,0 +1,198 @@
+"""
+Local store of the leads returned by the search agent.
+
+Phase 2 metadata records are persisted under a normalized company identity
+(website domain when known, otherwise the normalized name) together with the
+profile segment (industry niche and location) they were found for. The store
+also produces the compact exclusion list sent with the next search for the same
+segment, so repeated runs spend their search budget on new companies.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from common.agent_json import extract_json_values
+from common.entity_resolution import normalize_domain, normalize_name
+
+from .config import LEAD_EXCLUSION_LIMIT, LEAD_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+LEAD_FIELDS = (
+    "name", "address", "phone_number", "email", "website",
+    "review_rate", "number_of_reviews", "description",
+)
+_METADATA_FIELDS = set(LEAD_FIELDS) - {"name", "description"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    name_key TEXT NOT NULL,
+    domain TEXT,
+    segment TEXT NOT NULL,
+    name TEXT,
+    address TEXT,
+    phone_number TEXT,
+    email TEXT,
+    website TEXT,
+    review_rate TEXT,
+    number_of_reviews TEXT,
+    description TEXT,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_leads_name_key ON leads(name_key);
+CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads(domain);
+CREATE INDEX IF NOT EXISTS idx_leads_segment_seen ON leads(segment, last_seen_at DESC);
+"""
+
+
+def segment_key(profile: Dict[str, Any]) -> str:
+    """Returns the segment a profile searches in: its normalized industry niche and location."""
+    company_profile = (profile.get("ideal_client") or {}).get("company_profile") or {}
+    return "|".join(
+        normalize_name(company_profile.get(field)) for field in ("industry_niche", "location")
+    )
+
+
+def company_identity(name: Optional[str], website: Optional[str]) -> Optional[str]:
+    """Returns the identity a company is stored under, or None if it has neither name nor website."""
+    domain = normalize_domain(website)
+    if domain:
+        return f"domain:{domain}"
+    name_key = normalize_name(name)
+    return f"name:{name_key}" if name_key else None
+
+
+def is_lead(record: Any) -> bool:
+    """
+    Tells Phase 2 metadata records apart from other JSON in the search agent's output.
+
+    Phase 1 entries (name and location only) are not leads; a record counts as a
+    lead once it carries at least one contact or review field.
+    """
+    return isinstance(record, dict) and bool(record.get("name")) and bool(_METADATA_FIELDS & record.keys())
+
+
+def extract_leads(text: str) -> List[Dict[str, Any]]:
+    """Extracts Phase 2 metadata records from the search agent's text output."""
+    leads = []
+    for value in extract_json_values(text):
+        records = value if isinstance(value, list) else [value]
+        leads.extend(record for record in records if is_lead(record))
+    return leads
+
+
+class LeadStore:
+    """SQLite-backed, indexed store of discovered leads."""
+
+    def __init__(self, path: str = LEAD_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _find_id(self, name_key: str, domain: Optional[str]) -> Optional[int]:
+        if domain:
+            row = self._conn.execute("SELECT id FROM leads WHERE domain = ?", (domain,)).fetchone()
+            if row:
+                return row["id"]
+        if name_key:
+            row = self._conn.execute("SELECT id FROM leads WHERE name_key = ?", (name_key,)).fetchone()
+            if row:
+                return row["id"]
+        return None
+
+    def upsert_leads(self, leads: List[Dict[str, Any]], segment: str) -> int:
+        """
+        Stores Phase 2 records, merging them into known leads.
+
+        A record matches a known lead by website domain first and normalized name
+        second; non-empty new values overwrite stored ones.
+
+        Args:
+            leads (List[Dict[str, Any]]): Phase 2 metadata records.
+            segment (str): The segment the leads were found for (see ``segment_key``).
+
+        Returns:
+            int: The number of leads that were not known before.
+        """
+        new_leads = 0
+        now = time.time()
+        with self._lock, self._conn:
+            for lead in leads:
+                identity = company_identity(lead.get("name"), lead.get("website"))
+                if identity is None:
+                    continue
+                name_key = normalize_name(lead.get("name"))
+                domain = normalize_domain(lead.get("website"))
+                values = {field: _as_text(lead.get(field)) for field in LEAD_FIELDS}
+
+                lead_id = self._find_id(name_key, domain)
+                if lead_id is None:
+                    self._conn.execute(
+                        f"""
+                        INSERT INTO leads (identity, name_key, domain, segment, {", ".join(LEAD_FIELDS)},
+                                           first_seen_at, last_seen_at)
+                        VALUES (?, ?, ?, ?, {", ".join("?" * len(LEAD_FIELDS))}, ?, ?)
+                        """,
+                        (identity, name_key, domain, segment, *values.values(), now, now),
+                    )
+                    new_leads += 1
+                else:
+                    assignments = ", ".join(f"{field} = COALESCE(NULLIF(?, ''), {field})" for field in LEAD_FIELDS)
+                    self._conn.execute(
+                        f"""
+                        UPDATE leads
+                        SET {assignments}, domain = COALESCE(domain, ?),
+                            last_seen_at = ?, times_seen = times_seen + 1
+                        WHERE id = ?
+                        """,
+                        (*values.values(), domain, now, lead_id),
+                    )
+        return new_leads
+
+    def known_companies(self, segment: str, limit: int = LEAD_EXCLUSION_LIMIT) -> List[str]:
+        """
+        Returns the compact exclusion list for a segment: the most recently seen
+        known companies, formatted as "Name (domain)".
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, domain FROM leads WHERE segment = ? ORDER BY last_seen_at DESC LIMIT ?",
+                (segment, limit),
+            ).fetchall()
+        return [f"{row['name']} ({row['domain']})" if row["domain"] else row["name"] for row in rows]
+
+    def get(self, name: Optional[str] = None, website: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Looks up a stored lead by website domain or normalized name."""
+        with self._lock:
+            lead_id = self._find_id(normalize_name(name), normalize_domain(website))
+            if lead_id is None:
+                return None
+            row = self._conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+        return dict(row)
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value).strip()
+
+
+_store: Optional[LeadStore] = None
+
+
+def get_store() -> LeadStore:
+    """Returns the process-wide lead store, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = LeadStore()
+    return _store
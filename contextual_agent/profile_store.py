@@ -0,0 +1,353 @@
+"""
+Versioned client profiles and the /client-profile HTTP endpoints.
+
+Each session (A2A context) has its own profile and version counter.
+``update_client_profile`` publishes every change here, and UI clients can
+follow a profile in three ways:
+
+- GET /client-profile?session_id=... with If-None-Match, which answers 304 when
+  the profile did not change (the ETag is the version plus a hash of the
+  profile, so an ETag from before a restart, when versions start over, never
+  matches a different profile)
+- the same GET with ?wait=<seconds>, which long-polls until a newer version
+  exists and answers 304 on timeout (a session_id is required, as profiles
+  are published per session)
+- GET /client-profile/events?session_id=..., a server-sent event stream that
+  sends the full profile once and then only the changed fields
+
+Without a session_id the most recently updated profile is used. Profiles of
+the PROFILE_STORE_MAX_SESSIONS most recently updated sessions are kept.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .config import PROFILE_STORE_MAX_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+MAX_WAIT_SECONDS = 60
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def flatten(profile: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flattens a nested profile into dotted field paths, e.g. "ideal_client.company_profile.location"."""
+    fields = {}
+    for key, value in profile.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            fields.update(flatten(value, f"{path}."))
+        else:
+            fields[path] = value
+    return fields
+
+
+def diff_fields(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the fields of ``new`` that differ from ``old``; removed fields map to None."""
+    old_fields = flatten(old or {})
+    new_fields = flatten(new)
+    changes = {path: value for path, value in new_fields.items() if old_fields.get(path) != value}
+    changes.update({path: None for path in old_fields.keys() - new_fields.keys()})
+    return changes
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.changed = asyncio.Event()
+
+
+class ProfileStore:
+    """
+    Versioned store of client profiles per session.
+
+    Profiles are kept in memory, or in a SQLite file when several server
+    processes share them; waiting clients then also poll the file for versions
+    published by other processes. ``publish`` may be called from any thread
+    (ADK runs sync tools in worker threads); waiting clients are woken on their
+    own event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        poll_interval: float = 0.5,
+        max_sessions: int = PROFILE_STORE_MAX_SESSIONS,
+    ):
+        self._lock = threading.Lock()
+        # Least recently updated first.
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_sessions = max(1, max_sessions)
+        self._latest_session: Optional[str] = None
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self.poll_interval = poll_interval
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self.open(path)
+
+    def open(self, path: str) -> None:
+        """Switches to a SQLite file shared with other processes."""
+        with self._lock:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    session_id TEXT PRIMARY KEY,
+                    profile TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_profiles_updated ON profiles(updated_at)")
+
+    def _read(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return self._profiles.get(session_id)
+        row = self._db.execute(
+            "SELECT profile, version, timestamp FROM profiles WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return {"profile": json.loads(row[0]), "version": row[1], "timestamp": row[2]} if row else None
+
+    def _latest(self) -> Optional[str]:
+        if self._db is None:
+            return self._latest_session
+        row = self._db.execute("SELECT session_id FROM profiles ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def publish(self, session_id: Optional[str], profile: Dict[str, Any]) -> int:
+        """
+        Stores a new profile version for a session if it changed.
+
+        Returns:
+            int: The session's current version.
+        """
+        session_id = session_id or DEFAULT_SESSION
+        with self._lock:
+            current = self._read(session_id)
+            if current is not None and current["profile"] == profile:
+                return current["version"]
+            entry = {
+                "profile": copy.deepcopy(profile),
+                "version": (current["version"] if current else 0) + 1,
+                "timestamp": datetime.now().isoformat(),
+            }
+            if self._db is None:
+                self._profiles[session_id] = entry
+                self._profiles.move_to_end(session_id)
+                while len(self._profiles) > self.max_sessions:
+                    self._profiles.popitem(last=False)
+                self._latest_session = session_id
+            else:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?)",
+                        (session_id, json.dumps(profile), entry["version"], entry["timestamp"], time.time()),
+                    )
+                    if entry["version"] == 1:
+                        # A new session; drop the least recently updated ones beyond the bound.
+                        self._db.execute(
+                            "DELETE FROM profiles WHERE session_id IN "
+                            "(SELECT session_id FROM profiles ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                            (self.max_sessions,),
+                        )
+            subscribers = list(self._subscribers.get(session_id, ()))
+
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.changed.set)
+        return entry["version"]
+
+    def get(self, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns {"session_id", "profile", "version", "timestamp"} or None."""
+        with self._lock:
+            session_id = session_id or self._latest()
+            entry = self._read(session_id) if session_id else None
+        if entry is None:
+            return None
+        return dict(entry, session_id=session_id)
+
+    async def wait_for_change(self, session_id: str, since_version: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """Waits up to ``timeout`` seconds for a version newer than ``since_version``."""
+        subscriber = self._subscribe(session_id)
+        try:
+            deadline = asyncio.get_running_loop().time() + timeout
+            while True:
+                entry = self.get(session_id)
+                if entry and entry["version"] > since_version:
+                    return entry
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    return None
+                if self._db is not None:
+                    # Other processes publish to the shared file without waking us.
+                    remaining = min(remaining, self.poll_interval)
+                try:
+                    await asyncio.wait_for(subscriber.changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    continue
+                subscriber.changed.clear()
+        finally:
+            self._unsubscribe(session_id, subscriber)
+
+    def _subscribe(self, session_id: str) -> _Subscriber:
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscriber)
+        return subscriber
+
+    def _unsubscribe(self, session_id: str, subscriber: _Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+
+profile_store = ProfileStore()
+
+
+def _etag(entry: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(json.dumps(entry["profile"], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f'"{entry["session_id"]}:{entry["version"]}:{digest}"'
+
+
+def _matches(etag: Optional[str], entry: Optional[Dict[str, Any]]) -> bool:
+    """Returns whether an If-None-Match value names the entry's current version."""
+    if not etag or entry is None:
+        return False
+    return any(value.strip().removeprefix("W/") == _etag(entry) for value in etag.split(","))
+
+
+def _profile_response(entry: Dict[str, Any]) -> JSONResponse:
+    return JSONResponse(
+        {
+            "status": "success",
+            "session_id": entry["session_id"],
+            "profile": entry["profile"],
+            "version": entry["version"],
+            "timestamp": entry["timestamp"],
+        },
+        headers={"ETag": _etag(entry), "Cache-Control": "no-cache"},
+    )
+
+
+async def receive_client_profile(request: Request):
+    """Endpoint to receive client profile updates"""
+    try:
+        profile_data = json.loads(await request.body())
+        session_id = request.query_params.get("session_id") or DEFAULT_SESSION
+        version = profile_store.publish(session_id, profile_data)
+        entry = profile_store.get(session_id)
+
+        logger.info(f"Received client profile update for session {session_id}: version {version}")
+
+        return JSONResponse({
+            "status": "success",
+            "message": "Client profile received and stored",
+            "session_id": session_id,
+            "version": version,
+            "timestamp": entry["timestamp"],
+        }, headers={"ETag": _etag(entry)})
+    except Exception as e:
+        logger.error(f"Error receiving client profile: {e}")
+        return JSONResponse({
+            "status": "error",
+            "message": str(e)
+        }, status_code=400)
+
+
+async def get_client_profile(request: Request):
+    """Endpoint to retrieve a client profile, with conditional GET and optional long-polling"""
+    requested_session = request.query_params.get("session_id")
+    entry = profile_store.get(requested_session)
+    session_id = entry["session_id"] if entry else requested_session or DEFAULT_SESSION
+    etag_matches = _matches(request.headers.get("if-none-match"), entry)
+
+    try:
+        wait = float(request.query_params.get("wait") or 0)
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait) or wait < 0:
+        return JSONResponse({
+            "status": "error",
+            "message": "wait must be a non-negative number of seconds"
+        }, status_code=400)
+    if wait > 0 and not requested_session:
+        # Without a session there is nothing to wait on: updates are published per session.
+        return JSONResponse({
+            "status": "error",
+            "message": "wait requires a session_id"
+        }, status_code=400)
+    wait = min(wait, MAX_WAIT_SECONDS)
+
+    # An ETag that does not name the current version is answered at once, whatever its version.
+    if wait > 0 and (entry is None or etag_matches):
+        entry = await profile_store.wait_for_change(session_id, entry["version"] if entry else 0, wait)
+        if entry is None:
+            return Response(status_code=304)
+        etag_matches = False
+
+    if entry is None:
+        return JSONResponse({
+            "status": "no_profile",
+            "message": "No client profile available yet"
+        }, status_code=404)
+    if etag_matches:
+        return Response(status_code=304, headers={"ETag": _etag(entry)})
+    return _profile_response(entry)
+
+
+async def stream_client_profile(request: Request):
+    """Server-sent events with the changed profile fields of a session"""
+    session_id = request.query_params.get("session_id") or DEFAULT_SESSION
+
+    async def events():
+        sent: Optional[Dict[str, Any]] = None
+        version = 0
+        while not await request.is_disconnected():
+            entry = await profile_store.wait_for_change(session_id, version, SSE_KEEPALIVE_SECONDS)
+            if entry is None:
+                yield ": keepalive\n\n"
+                continue
+            payload = {
+                "session_id": session_id,
+                "version": entry["version"],
+                "changes": diff_fields(sent, entry["profile"]),
+            }
+            if sent is None:
+                payload["profile"] = entry["profile"]
+            sent, version = entry["profile"], entry["version"]
+            yield f"id: {version}\nevent: profile\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def profile_routes() -> List[Route]:
+    """Returns the /client-profile routes."""
+    return [
+        Route("/client-profile", receive_client_profile, methods=["POST"]),
+        Route("/client-profile", get_client_profile, methods=["GET"]),
+        Route("/client-profile/events", stream_client_profile, methods=["GET"]),
+    ]
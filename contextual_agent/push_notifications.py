@@ -0,0 +1,323 @@
+"""
+Signed A2A push notifications.
+
+Clients register a callback URL for a task (through the message's push
+notification config or tasks/pushNotificationConfig/set) and receive the task
+as JSON whenever its state changes, instead of polling tasks/get. Deliveries go
+through a pooled HTTP client, are retried with exponential backoff on network
+errors and 5xx/429 responses, and are signed with HMAC-SHA256 when
+PUSH_SIGNING_SECRET is set:
+
+    X-LeadConvert-Timestamp: <unix seconds>
+    X-LeadConvert-Signature: sha256=<hex HMAC of "<timestamp>.<body>">
+
+Receivers check these with ``verify_signature``.
+
+Callback URLs must be http(s) and resolve only to public addresses; loopback,
+private, link-local and other internal hosts are rejected when the URL is
+registered and checked again before each delivery, so clients cannot make the
+server call internal services. PUSH_ALLOW_PRIVATE_URLS lifts this for local
+testing.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+from a2a.server.tasks import PushNotifier, TaskStore
+from a2a.types import InvalidParamsError, PushNotificationConfig, Task
+from a2a.utils.errors import ServerError
+
+from .config import (
+    PUSH_ALLOW_PRIVATE_URLS,
+    PUSH_BACKOFF_SECONDS,
+    PUSH_MAX_CONNECTIONS,
+    PUSH_MAX_RETRIES,
+    PUSH_SIGNING_SECRET,
+    PUSH_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-LeadConvert-Signature"
+TIMESTAMP_HEADER = "X-LeadConvert-Timestamp"
+TOKEN_HEADER = "X-A2A-Notification-Token"
+
+# Tasks whose last pushed state is remembered; older ones may get a duplicate push at most.
+_MAX_TRACKED_TASKS = 10000
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """Returns the signature header value for a notification body."""
+    digest = hmac.new(secret.encode("utf-8"), timestamp.encode("utf-8") + b"." + body, hashlib.sha256)
+    return f"sha256={digest.hexdigest()}"
+
+
+def verify_signature(
+    secret: str,
+    body: bytes,
+    timestamp: Optional[str],
+    signature: Optional[str],
+    tolerance_seconds: float = 300,
+) -> bool:
+    """
+    Verifies a received notification.
+
+    Args:
+        secret (str): The shared PUSH_SIGNING_SECRET.
+        body (bytes): The raw request body.
+        timestamp (Optional[str]): The X-LeadConvert-Timestamp header.
+        signature (Optional[str]): The X-LeadConvert-Signature header.
+        tolerance_seconds (float): Maximum accepted age of the notification, against replays.
+
+    Returns:
+        bool: True if the signature matches and the notification is recent.
+    """
+    if not timestamp or not signature:
+        return False
+    try:
+        if abs(time.time() - float(timestamp)) > tolerance_seconds:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), signature)
+
+
+async def check_callback_url(url: str, allow_private: bool = PUSH_ALLOW_PRIVATE_URLS) -> Optional[str]:
+    """
+    Checks that a callback URL may be called.
+
+    Args:
+        url (str): The callback URL.
+        allow_private (bool): Accept hosts that resolve to internal addresses.
+
+    Returns:
+        Optional[str]: Why the URL is rejected, or None if it is acceptable.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError as e:
+        return f"invalid URL: {e}"
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return "only http and https URLs with a host are accepted"
+    if allow_private:
+        return None
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        return f"cannot resolve {parts.hostname}: {e}"
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # Covers loopback, private, link-local (cloud metadata), shared and reserved ranges.
+        if not address.is_global or address.is_multicast:
+            return f"{parts.hostname} resolves to the non-public address {address}"
+    return None
+
+
+def _is_retryable(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _fingerprint(task: Task) -> str:
+    """Identifies a task state worth notifying: its state, status time and artifacts."""
+    return f"{task.status.state.value}|{task.status.timestamp}|{len(task.artifacts or [])}"
+
+
+class SignedPushNotifier(PushNotifier):
+    """
+    Push notifier that delivers task state changes in the background with
+    pooled connections, retries and HMAC signatures.
+    """
+
+    def __init__(
+        self,
+        httpx_client: Optional[httpx.AsyncClient] = None,
+        signing_secret: str = PUSH_SIGNING_SECRET,
+        max_retries: int = PUSH_MAX_RETRIES,
+        config_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            httpx_client (Optional[httpx.AsyncClient]): Client to deliver with; a pooled client by default.
+            signing_secret (str): HMAC secret; notifications are unsigned when empty.
+            max_retries (int): Delivery retries after the first attempt.
+            config_path (Optional[str]): SQLite file to keep callback registrations in, so that
+                several server processes share them. Kept in memory when None.
+        """
+        self._client = httpx_client or httpx.AsyncClient(
+            timeout=PUSH_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=PUSH_MAX_CONNECTIONS,
+                max_keepalive_connections=PUSH_MAX_CONNECTIONS,
+            ),
+        )
+        self._signing_secret = signing_secret
+        self._max_retries = max_retries
+        self._configs: Dict[str, PushNotificationConfig] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if config_path:
+            self._db = sqlite3.connect(config_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS push_configs (task_id TEXT PRIMARY KEY, config TEXT NOT NULL)")
+        self._last_sent: "OrderedDict[str, str]" = OrderedDict()
+        self._task_locks: Dict[str, asyncio.Lock] = {}
+        # Deliveries scheduled per task; its lock is dropped when none are left.
+        self._pending: Dict[str, int] = {}
+        self._deliveries: Set[asyncio.Task] = set()
+        if not signing_secret:
+            logger.warning("PUSH_SIGNING_SECRET is not set; push notifications will be sent unsigned")
+
+    async def set_info(self, task_id: str, notification_config: PushNotificationConfig):
+        reason = await check_callback_url(notification_config.url)
+        if reason:
+            logger.warning(f"Task {task_id}: rejected push notification URL {notification_config.url}: {reason}")
+            raise ServerError(error=InvalidParamsError(message=f"Push notification URL rejected: {reason}"))
+        if self._db is None:
+            self._configs[task_id] = notification_config
+            return
+        await asyncio.to_thread(self._write_config, task_id, notification_config.model_dump_json(exclude_none=True))
+
+    def _write_config(self, task_id: str, config: str) -> None:
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO push_configs (task_id, config) VALUES (?, ?)", (task_id, config))
+
+    async def get_info(self, task_id: str) -> PushNotificationConfig | None:
+        if self._db is None:
+            return self._configs.get(task_id)
+        config = await asyncio.to_thread(self._read_config, task_id)
+        return PushNotificationConfig.model_validate_json(config) if config else None
+
+    def _read_config(self, task_id: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._db.execute("SELECT config FROM push_configs WHERE task_id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    async def delete_info(self, task_id: str):
+        if self._db is None:
+            self._configs.pop(task_id, None)
+        else:
+            await asyncio.to_thread(self._delete_config, task_id)
+        self._last_sent.pop(task_id, None)
+
+    def _delete_config(self, task_id: str) -> None:
+        with self._db_lock:
+            self._db.execute("DELETE FROM push_configs WHERE task_id = ?", (task_id,))
+
+    async def send_notification(self, task: Task):
+        """Schedules delivery of the task if it has a callback and its state changed since the last push."""
+        config = await self.get_info(task.id)
+        if config is None:
+            return
+        fingerprint = _fingerprint(task)
+        if self._last_sent.get(task.id) == fingerprint:
+            return
+        self._last_sent[task.id] = fingerprint
+        self._last_sent.move_to_end(task.id)
+        if len(self._last_sent) > _MAX_TRACKED_TASKS:
+            self._last_sent.popitem(last=False)
+
+        body = json.dumps(task.model_dump(mode="json", exclude_none=True)).encode("utf-8")
+        self._pending[task.id] = self._pending.get(task.id, 0) + 1
+        delivery = asyncio.create_task(self._deliver(task.id, config, body))
+        self._deliveries.add(delivery)
+        delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, task_id: str, config: PushNotificationConfig, body: bytes) -> None:
+        # Deliveries for one task are sent in order.
+        lock = self._task_locks.setdefault(task_id, asyncio.Lock())
+        try:
+            async with lock:
+                await self._post(task_id, config, body)
+        finally:
+            self._pending[task_id] -= 1
+            if not self._pending[task_id]:
+                del self._pending[task_id]
+                self._task_locks.pop(task_id, None)
+
+    async def _post(self, task_id: str, config: PushNotificationConfig, body: bytes) -> None:
+        # Checked again on every delivery, as the host may resolve differently by now.
+        reason = await check_callback_url(config.url)
+        if reason:
+            logger.error(f"Task {task_id}: not delivering push notification to {config.url}: {reason}")
+            return
+        for attempt in range(self._max_retries + 1):
+            headers = {"Content-Type": "application/json"}
+            if config.token:
+                headers[TOKEN_HEADER] = config.token
+            if self._signing_secret:
+                timestamp = str(int(time.time()))
+                headers[TIMESTAMP_HEADER] = timestamp
+                headers[SIGNATURE_HEADER] = sign_payload(self._signing_secret, timestamp, body)
+            try:
+                response = await self._client.post(config.url, content=body, headers=headers)
+                if not _is_retryable(response):
+                    response.raise_for_status()
+                    logger.info(f"Task {task_id}: push notification delivered to {config.url}")
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Task {task_id}: push notification rejected by {config.url}: {e}")
+                return
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+
+            if attempt < self._max_retries:
+                delay = PUSH_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(
+                    f"Task {task_id}: push notification to {config.url} failed ({error}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+        logger.error(f"Task {task_id}: giving up on push notification to {config.url}: {error}")
+
+    async def aclose(self) -> None:
+        """Waits for in-flight deliveries and closes the HTTP client."""
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        await self._client.aclose()
+
+
+class NotifyingTaskStore(TaskStore):
+    """
+    Task store wrapper that pushes every saved task state to its registered callback.
+
+    Background job workers update tasks directly in the store, outside of any
+    request, so notifying on save covers them as well as regular requests.
+    """
+
+    def __init__(self, task_store: TaskStore, push_notifier: PushNotifier):
+        self._task_store = task_store
+        self._push_notifier = push_notifier
+        # Tasks the store evicts on its own lose their push registration as well.
+        if hasattr(task_store, "add_eviction_listener"):
+            task_store.add_eviction_listener(self._forget)
+
+    async def _forget(self, task_ids: List[str]) -> None:
+        for task_id in task_ids:
+            await self._push_notifier.delete_info(task_id)
+
+    async def save(self, task: Task):
+        await self._task_store.save(task)
+        await self._push_notifier.send_notification(task)
+
+    async def get(self, task_id: str) -> Task | None:
+        return await self._task_store.get(task_id)
+
+    async def delete(self, task_id: str):
+        await self._task_store.delete(task_id)
+        await self._push_notifier.delete_info(task_id)
@@ -0,0 +1,56 @@
+"""
+Local HTTP receiver for testing push notifications.
+
+    python -m contextual_agent.push_receiver --port 9000
+
+Register http://localhost:9000/notifications as the task's push notification URL,
+with PUSH_ALLOW_PRIVATE_URLS=true on the server (loopback callbacks are rejected otherwise).
+Every received task is verified against PUSH_SIGNING_SECRET and logged.
+"""
+
+import json
+import logging
+
+import click
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from .config import PUSH_SIGNING_SECRET
+from .push_notifications import SIGNATURE_HEADER, TIMESTAMP_HEADER, verify_signature
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def receive_notification(request):
+    """Endpoint that verifies and logs a pushed task"""
+    body = await request.body()
+    if PUSH_SIGNING_SECRET and not verify_signature(
+        PUSH_SIGNING_SECRET,
+        body,
+        request.headers.get(TIMESTAMP_HEADER),
+        request.headers.get(SIGNATURE_HEADER),
+    ):
+        logger.warning("Rejected push notification with an invalid signature")
+        return JSONResponse({"status": "error", "message": "Invalid signature"}, status_code=401)
+
+    task = json.loads(body)
+    status = task.get("status", {})
+    logger.info(f"Task {task.get('id')}: {status.get('state')} - {json.dumps(status.get('message'))}")
+    return JSONResponse({"status": "success"})
+
+
+@click.command()
+@click.option("--host", default="localhost", help="Host to bind the receiver to.")
+@click.option("--port", default=9000, help="Port to bind the receiver to.")
+def main(host: str, port: int):
+    """Runs a local push notification receiver."""
+    app = Starlette(routes=[Route("/notifications", receive_notification, methods=["POST"])])
+    logger.info(f"Receiving push notifications at http://{host}:{port}/notifications")
+    uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Builds the Contextual Agent A2A server application.
+
+With one worker all state may live in process memory. With several workers
+(``--workers N``) every piece of shared state goes through a store that all
+processes can reach: ADK sessions in a SQL database (DatabaseSessionService),
+tasks, jobs, push notification registrations and client profiles in local
+SQLite files. Any worker can then serve any request; the affinity hints only
+help a load balancer keep a conversation on one instance.
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from a2a.server.apps import A2AStarletteApplication
+from a2a.server.apps.starlette_app import DefaultCallContextBuilder
+from a2a.server.context import ServerCallContext
+from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+from google.adk.sessions import DatabaseSessionService
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from common import hedging, rate_limit, resilience, single_flight
+
+from .agent import root_agent
+from .agent_executor import ContextualAgentExecutor, configure_event_log
+from .config import (
+    AFFINITY_COOKIE,
+    AFFINITY_HEADER,
+    PROFILE_STORE_PATH,
+    PUSH_CONFIG_PATH,
+    SESSION_DB_URL,
+)
+from .jobs import JOB_HANDLERS, JobQueue, JobRequestHandler, WorkerPool
+from .profile_store import profile_routes, profile_store
+from .push_notifications import NotifyingTaskStore, SignedPushNotifier
+from .task_store import SQLiteTaskStore
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{os.uname().nodename}-{os.getpid()}"
+
+
+def build_agent_card(host: str, port: int) -> AgentCard:
+    """Returns the agent card served at /.well-known/agent.json."""
+    return AgentCard(
+        name=root_agent.name,
+        description=root_agent.description,
+        url=f"http://{host}:{port}",
+        version="1.0.0",
+        capabilities=AgentCapabilities(
+            streaming=False,
+            pushNotifications=True,
+        ),
+        defaultInputModes=['text'],
+        defaultOutputModes=['text'],
+        skills=[
+            AgentSkill(
+                id='client_profiling',
+                name='Build Ideal Client Profile',
+                description='Interactive conversation to help build a detailed ideal client profile for sales and lead generation.',
+                examples=[
+                    "Help me build my ideal client profile",
+                    "I need to understand my target customers better",
+                    "What questions should I ask to identify my perfect client?",
+                ],
+                tags=['sales', 'lead-generation', 'client-profiling', 'conversation'],
+            ),
+            AgentSkill(
+                id='profile_management',
+                name='Manage Client Profile Data',
+                description='Update and present client profile information gathered through conversation.',
+                examples=[
+                    "Show me my current client profile",
+                    "Update my target industry information",
+                    "What client profile data do we have so far?",
+                ],
+                tags=['data-management', 'profile', 'update'],
+            ),
+            AgentSkill(
+                id='background_jobs',
+                name='Background Lead Search and Research',
+                description='Runs lead searches ({"operation": "search_leads"}), company research ({"operation": "research_company", "company_name": ..., "persona": true, "draft_email": true}) and sending of a reviewed email ({"operation": "send_email", "receiver_email": ..., "subject": ..., "content": ...}) as background jobs. Research never sends email. The returned task is updated with progress and results; poll it with tasks/get.',
+                examples=[
+                    "Search for leads matching my client profile",
+                    "Research this company and draft an email",
+                ],
+                tags=['jobs', 'lead-generation', 'research'],
+            )
+        ],
+    )
+
+
+class HeaderCallContextBuilder(DefaultCallContextBuilder):
+    """Makes the request headers available to the executor as call context state."""
+
+    def build(self, request) -> ServerCallContext:
+        call_context = super().build(request)
+        call_context.state["headers"] = dict(request.headers)
+        return call_context
+
+
+class AffinityMiddleware(BaseHTTPMiddleware):
+    """
+    Adds session-affinity hints to every response: the serving worker in
+    X-LeadConvert-Worker, the client's affinity key echoed back, and a cookie
+    that cookie-based load balancers can route on.
+    """
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        affinity_key = (
+            request.headers.get(AFFINITY_HEADER)
+            or request.query_params.get("session_id")
+            or request.cookies.get(AFFINITY_COOKIE)
+        )
+        response.headers["X-LeadConvert-Worker"] = WORKER_ID
+        if affinity_key:
+            response.headers[AFFINITY_HEADER] = affinity_key
+            if request.cookies.get(AFFINITY_COOKIE) != affinity_key:
+                response.set_cookie(AFFINITY_COOKIE, affinity_key, httponly=True, samesite="lax")
+        return response
+
+
+async def dependency_health(request):
+    """Retry, circuit breaker, hedging, rate limit and coalescing counters of the external dependencies used by this worker"""
+    return JSONResponse({
+        "worker": WORKER_ID,
+        "open_breakers": resilience.open_breakers(),
+        "dependencies": resilience.stats(),
+        "hedging": hedging.stats(),
+        "rate_limits": rate_limit.stats(),
+        "single_flight": single_flight.stats(),
+    })
+
+
+def create_app(host: str, port: int, workers: int = 1, job_workers: Optional[int] = None) -> Starlette:
+    """
+    Builds the A2A Starlette application with the client profile endpoints.
+
+    Args:
+        host (str): Host advertised in the agent card.
+        port (int): Port advertised in the agent card.
+        workers (int): Number of server processes sharing state; above 1 all state goes through shared stores.
+        job_workers (Optional[int]): Background job workers per process (defaults to JOB_WORKERS).
+
+    Returns:
+        Starlette: The application.
+    """
+    shared = workers > 1
+    configure_event_log(per_process=shared)
+    session_service = None
+    if shared:
+        session_service = DatabaseSessionService(db_url=SESSION_DB_URL)
+        profile_store.open(PROFILE_STORE_PATH)
+
+    job_queue = JobQueue()
+    agent_executor = ContextualAgentExecutor(job_queue=job_queue, session_service=session_service)
+
+    push_notifier = SignedPushNotifier(config_path=PUSH_CONFIG_PATH if shared else None)
+    task_store = NotifyingTaskStore(SQLiteTaskStore(cache_active=not shared), push_notifier)
+
+    request_handler = JobRequestHandler(
+        agent_executor, task_store, push_notifier=push_notifier, job_queue=job_queue
+    )
+
+    worker_pool = WorkerPool(job_queue, task_store, JOB_HANDLERS)
+    if job_workers is not None:
+        worker_pool.workers = job_workers
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await worker_pool.start()
+        try:
+            yield
+        finally:
+            await worker_pool.stop()
+            await push_notifier.aclose()
+
+    app_builder = A2AStarletteApplication(
+        agent_card=build_agent_card(host, port),
+        http_handler=request_handler,
+        context_builder=HeaderCallContextBuilder(),
+    )
+    starlette_app = app_builder.build(lifespan=lifespan)
+    starlette_app.router.routes.extend(profile_routes())
+    starlette_app.router.routes.append(Route("/health/dependencies", dependency_health, methods=["GET"]))
+    if shared:
+        starlette_app.add_middleware(AffinityMiddleware)
+    logger.info(f"Worker {WORKER_ID} ready ({'shared' if shared else 'in-process'} state)")
+    return starlette_app
+
+
+def create_app_from_env() -> Starlette:
+    """Application factory used by uvicorn worker processes; settings come from the server command."""
+    return create_app(
+        host=os.environ["CONTEXTUAL_AGENT_HOST"],
+        port=int(os.environ["CONTEXTUAL_AGENT_PORT"]),
+        workers=int(os.environ.get("CONTEXTUAL_AGENT_WORKERS", "1")),
+        job_workers=int(os.environ["CONTEXTUAL_AGENT_JOB_WORKERS"]) if os.environ.get("CONTEXTUAL_AGENT_JOB_WORKERS") else None,
+    )
@@ -0,0 +1,181 @@
+"""
+Persistent A2A task store.
+
+Tasks are stored as JSON in a local SQLite database indexed by task and context
+ID, so they survive restarts. Only active (non-terminal) tasks are also kept in
+memory. Terminal tasks (completed, failed, canceled, rejected) are evicted once
+they are older than TASK_STORE_TTL_HOURS, and the oldest of them are evicted
+early when the stored tasks exceed TASK_STORE_MAX_BYTES. Eviction listeners are
+told which tasks were evicted, so state kept per task elsewhere (push
+notification registrations) goes with them.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from a2a.server.tasks import TaskStore
+from a2a.types import Task, TaskState
+
+from .config import (
+    TASK_STORE_EVICTION_INTERVAL,
+    TASK_STORE_MAX_BYTES,
+    TASK_STORE_PATH,
+    TASK_STORE_TTL_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = {TaskState.completed, TaskState.failed, TaskState.canceled, TaskState.rejected}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    context_id TEXT,
+    state TEXT NOT NULL,
+    terminal INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_context ON tasks(context_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_terminal_updated ON tasks(terminal, updated_at);
+"""
+
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite-backed task store with an in-memory cache of active tasks and TTL/size eviction."""
+
+    def __init__(
+        self,
+        path: str = TASK_STORE_PATH,
+        ttl_hours: float = TASK_STORE_TTL_HOURS,
+        max_bytes: int = TASK_STORE_MAX_BYTES,
+        eviction_interval: float = TASK_STORE_EVICTION_INTERVAL,
+        cache_active: bool = True,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_bytes = max_bytes
+        self.eviction_interval = eviction_interval
+        # Disabled when several processes share the database, as their caches would diverge.
+        self.cache_active = cache_active
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._active: Dict[str, Tuple[Task, float]] = {}
+        self._last_eviction = 0.0
+        self._eviction_listeners: List[Callable[[List[str]], Awaitable[None]]] = []
+
+    def add_eviction_listener(self, listener: Callable[[List[str]], Awaitable[None]]) -> None:
+        """Registers a coroutine function called with the IDs of evicted tasks."""
+        self._eviction_listeners.append(listener)
+
+    async def save(self, task: Task):
+        terminal = task.status.state in TERMINAL_STATES
+        if terminal or not self.cache_active:
+            self._active.pop(task.id, None)
+        else:
+            self._active[task.id] = (task.model_copy(deep=True), time.time())
+        await asyncio.to_thread(self._write, task, terminal)
+
+        if time.time() - self._last_eviction > self.eviction_interval:
+            self._last_eviction = time.time()
+            evicted = await asyncio.to_thread(self.evict)
+            if evicted:
+                await self._notify_evicted(evicted)
+
+    async def _notify_evicted(self, task_ids: List[str]) -> None:
+        for listener in list(self._eviction_listeners):
+            try:
+                await listener(task_ids)
+            except Exception as e:
+                logger.exception(f"Task eviction listener failed: {e}")
+
+    def _write(self, task: Task, terminal: bool) -> None:
+        data = task.model_dump_json(exclude_none=True)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO tasks (id, context_id, state, terminal, data, size, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    context_id = excluded.context_id, state = excluded.state, terminal = excluded.terminal,
+                    data = excluded.data, size = excluded.size, updated_at = excluded.updated_at
+                """,
+                (task.id, task.contextId, task.status.state.value, int(terminal), data, len(data), time.time()),
+            )
+
+    async def get(self, task_id: str) -> Task | None:
+        cached = self._active.get(task_id)
+        if cached is not None:
+            return cached[0].model_copy(deep=True)
+        return await asyncio.to_thread(self._read, task_id)
+
+    def _read(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return Task.model_validate_json(row[0]) if row else None
+
+    async def delete(self, task_id: str):
+        self._active.pop(task_id, None)
+        await asyncio.to_thread(self._delete, task_id)
+
+    def _delete(self, task_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    async def list_by_context(self, context_id: str) -> List[Task]:
+        """Returns the tasks of a context, oldest first."""
+        return await asyncio.to_thread(self._list_by_context, context_id)
+
+    def _list_by_context(self, context_id: str) -> List[Task]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM tasks WHERE context_id = ? ORDER BY updated_at", (context_id,)
+            ).fetchall()
+        return [Task.model_validate_json(row[0]) for row in rows]
+
+    def evict(self) -> List[str]:
+        """
+        Removes expired terminal tasks, then the oldest terminal tasks while the
+        store exceeds its size bound. Active tasks are never evicted from the
+        database; ones idle for longer than the TTL only leave the memory cache.
+
+        Returns:
+            List[str]: The IDs of the evicted tasks.
+        """
+        with self._lock, self._conn:
+            evicted = [
+                task_id for (task_id,) in self._conn.execute(
+                    "SELECT id FROM tasks WHERE terminal = 1 AND updated_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+            ]
+            self._conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in evicted])
+
+            total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tasks").fetchone()[0]
+            if total_size > self.max_bytes:
+                excess = total_size - self.max_bytes
+                rows = self._conn.execute(
+                    "SELECT id, size FROM tasks WHERE terminal = 1 ORDER BY updated_at"
+                ).fetchall()
+                to_delete = []
+                for task_id, size in rows:
+                    if excess <= 0:
+                        break
+                    to_delete.append(task_id)
+                    excess -= size
+                self._conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in to_delete])
+                evicted += to_delete
+        cutoff = time.time() - self.ttl_seconds
+        for task_id, (_, saved_at) in list(self._active.items()):
+            if saved_at < cutoff:
+                self._active.pop(task_id, None)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} finished task(s) from the task store")
+        return evicted
@@ -0,0 +1,186 @@
+"""
+Deploys one agent to Cloud Run together with the shared packages it imports.
+
+``adk deploy cloud_run ./<agent_directory>`` uploads only the agent directory,
+but every agent imports the root-level ``common`` package (and the contextual
+agent also imports ``research_personal_agent``), so the deployed service would
+fail at startup. This script stages the agent next to those packages, writes a
+Dockerfile that puts them on PYTHONPATH and installs the agent's requirements,
+and deploys the staged directory with ``gcloud run deploy --source``.
+
+    python deploy.py search_agent --service-name search-agent
+    python deploy.py brand-search-optimization/brand_search_optimization --service-name brand-search --with-ui
+    python deploy.py contextual_agent --service-name contextual-agent --allow-unauthenticated
+    python deploy.py search_agent --service-name search-agent --stage-only build/search_agent
+
+Agents with a ``__main__.py`` (the contextual agent) are started with
+``python -m <agent>``; the others with ``adk api_server`` (or ``adk web``).
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from importlib import metadata
+from typing import List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Shared root-level packages each agent imports, beyond its own directory.
+SHARED_PACKAGES = {
+    "contextual_agent": ["common", "research_personal_agent"],
+}
+DEFAULT_SHARED_PACKAGES = ["common"]
+
+_IGNORED_FILES = shutil.ignore_patterns(
+    "__pycache__", "*.pyc", "*.db", "*.db-wal", "*.db-shm", "*.log", ".env", ".cache"
+)
+
+_DOCKERFILE = """FROM python:3.11-slim
+WORKDIR /app
+
+RUN adduser --disabled-password --gecos "" myuser
+USER myuser
+
+ENV PATH="/home/myuser/.local/bin:$PATH"
+ENV PYTHONPATH=/app
+ENV GOOGLE_GENAI_USE_VERTEXAI=1
+ENV GOOGLE_CLOUD_PROJECT={project}
+ENV GOOGLE_CLOUD_LOCATION={region}
+
+RUN pip install --no-cache-dir google-adk=={adk_version}
+COPY --chown=myuser:myuser requirements/ /app/requirements/
+{install_requirements}
+COPY --chown=myuser:myuser packages/ /app/
+COPY --chown=myuser:myuser "agents/{app_name}/" "/app/agents/{app_name}/"
+
+EXPOSE {port}
+
+CMD {command}
+"""
+
+
+def _adk_version() -> str:
+    try:
+        return metadata.version("google-adk")
+    except metadata.PackageNotFoundError:
+        return "1.13.0"
+
+
+def _requirements_files(agent_dir: str, packages: List[str]) -> List[str]:
+    """Returns the requirements files to install: the agent's own, then those of the shared packages."""
+    candidates = [os.path.join(agent_dir, "requirements.txt")]
+    candidates += [os.path.join(REPO_ROOT, package, "requirements.txt") for package in packages]
+    found = [path for path in candidates if os.path.isfile(path)]
+    return found or [os.path.join(REPO_ROOT, "requirements.txt")]
+
+
+def stage(
+    agent_dir: str,
+    target: str,
+    project: str,
+    region: str,
+    port: int,
+    with_ui: bool,
+    packages: Optional[List[str]] = None,
+) -> str:
+    """
+    Writes the Cloud Run source directory for one agent.
+
+    Args:
+        agent_dir (str): The agent package directory (the one holding agent.py).
+        target (str): The directory to stage into; it is replaced if it exists.
+        project (str): The Google Cloud project.
+        region (str): The Google Cloud region.
+        port (int): The port the service listens on.
+        with_ui (bool): Serve the ADK dev UI (``adk web``) instead of the API server.
+        packages (Optional[List[str]]): Root-level packages to ship with the agent.
+
+    Returns:
+        str: The staged directory.
+    """
+    agent_dir = os.path.abspath(agent_dir)
+    app_name = os.path.basename(agent_dir.rstrip(os.sep))
+    if packages is None:
+        packages = SHARED_PACKAGES.get(app_name, DEFAULT_SHARED_PACKAGES)
+    packages = [package for package in packages if package != app_name]
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    shutil.copytree(agent_dir, os.path.join(target, "agents", app_name), ignore=_IGNORED_FILES)
+    os.makedirs(os.path.join(target, "packages"))
+    for package in packages:
+        shutil.copytree(os.path.join(REPO_ROOT, package), os.path.join(target, "packages", package), ignore=_IGNORED_FILES)
+
+    os.makedirs(os.path.join(target, "requirements"))
+    install_lines = []
+    for index, path in enumerate(_requirements_files(agent_dir, packages)):
+        name = f"{index}-requirements.txt"
+        shutil.copy(path, os.path.join(target, "requirements", name))
+        install_lines.append(f'RUN pip install --no-cache-dir -r "/app/requirements/{name}"')
+
+    if os.path.isfile(os.path.join(agent_dir, "__main__.py")):
+        # Self-hosted servers (the contextual agent) run from the agents directory.
+        command = f"cd /app/agents && python -m {app_name} --host 0.0.0.0 --port {port}"
+    else:
+        command = f'adk {"web" if with_ui else "api_server"} --host=0.0.0.0 --port={port} "/app/agents"'
+
+    with open(os.path.join(target, "Dockerfile"), "w") as f:
+        f.write(_DOCKERFILE.format(
+            project=project,
+            region=region,
+            adk_version=_adk_version(),
+            install_requirements="\n".join(install_lines),
+            app_name=app_name,
+            port=port,
+            command=command,
+        ))
+    return target
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("agent_dir", help="The agent package directory, e.g. search_agent.")
+    parser.add_argument("--service-name", required=True, help="The Cloud Run service name.")
+    parser.add_argument("--project", default=os.getenv("GOOGLE_CLOUD_PROJECT"), help="Defaults to GOOGLE_CLOUD_PROJECT.")
+    parser.add_argument("--region", default=os.getenv("GOOGLE_CLOUD_LOCATION"), help="Defaults to GOOGLE_CLOUD_LOCATION.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--with-ui", action="store_true", help="Serve the ADK dev UI as well.")
+    parser.add_argument(
+        "--package", action="append", dest="packages",
+        help="Root-level package to ship with the agent (repeatable; replaces the defaults).",
+    )
+    parser.add_argument("--stage-only", metavar="DIR", help="Write the source directory to DIR and do not deploy.")
+    # Anything else (e.g. --allow-unauthenticated) is passed on to gcloud.
+    args, gcloud_args = parser.parse_known_args(argv)
+
+    if not os.path.isfile(os.path.join(args.agent_dir, "agent.py")):
+        parser.error(f"{args.agent_dir} is not an agent directory (no agent.py)")
+    if not args.project or not args.region:
+        parser.error("--project and --region are required (or set GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION)")
+
+    if args.stage_only:
+        stage(args.agent_dir, args.stage_only, args.project, args.region, args.port, args.with_ui, args.packages)
+        print(f"Staged {args.agent_dir} in {args.stage_only}")
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="leadconvert-deploy-") as temp_dir:
+        source = stage(
+            args.agent_dir, os.path.join(temp_dir, "source"), args.project, args.region,
+            args.port, args.with_ui, args.packages,
+        )
+        return subprocess.call([
+            "gcloud", "run", "deploy", args.service_name,
+            "--source", source,
+            "--project", args.project,
+            "--region", args.region,
+            "--port", str(args.port),
+            "--labels", "created-by=adk",
+            *gcloud_args,
+        ])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 from google.adk.agents import SequentialAgent
 
+from common.instrumentation import instrument
+
 from .sub_agent import persona_creator, research_agent, email_creator, email_sender
 
 load_dotenv()
@@ -11,8 +13,8 @@ load_dotenv()
 #  - `positive_critic` runs first to provide a positive critique,
 #  - `negative_critic` runs next to provide a negative critique,
 #  - `review_critic` runs last to review combined outputs and produce a final evaluation.
-root_agent = SequentialAgent(
+root_agent = instrument(SequentialAgent(
     name="pipeline_agent",
     sub_agents=[research_agent, persona_creator, email_creator, email_sender],
     description="This is an agent that sequentially executes agents(research_agent, persona_creator, email_creator, email_sender)"
-)
\ No newline at end of file
+))
\ No newline at end of file
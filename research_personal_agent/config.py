@@ -0,0 +1,48 @@
+"""
+Configuration for the Research Personal Agent.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Research content reduction
+RESEARCH_TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "6000"))
+RESEARCH_QUERY_TOKEN_BUDGET = int(os.getenv("RESEARCH_QUERY_TOKEN_BUDGET", "1500"))
+RESEARCH_CHUNK_WORDS = int(os.getenv("RESEARCH_CHUNK_WORDS", "120"))
+RESEARCH_DUPLICATE_THRESHOLD = float(os.getenv("RESEARCH_DUPLICATE_THRESHOLD", "0.8"))
+
+# Research store (skips research for companies researched recently)
+RESEARCH_STORE_ENABLED = os.getenv("RESEARCH_STORE_ENABLED", "true").lower() == "true"
+RESEARCH_STORE_PATH = os.getenv(
+    "RESEARCH_STORE_PATH", os.path.join(os.path.dirname(__file__), "research_store.db")
+)
+RESEARCH_STORE_TTL_DAYS = float(os.getenv("RESEARCH_STORE_TTL_DAYS", "7"))
+RESEARCH_STORE_FUZZY_THRESHOLD = float(os.getenv("RESEARCH_STORE_FUZZY_THRESHOLD", "0.88"))
+# Fuzzy name matches re-run the research (whose website then decides the record) instead of skipping it
+RESEARCH_STORE_VERIFY_FUZZY = os.getenv("RESEARCH_STORE_VERIFY_FUZZY", "true").lower() == "true"
+
+# Timeouts for external calls (capped by the request deadline)
+TAVILY_TIMEOUT_SECONDS = float(os.getenv("TAVILY_TIMEOUT_SECONDS", "30"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# Connections of the pooled Tavily client shared by concurrent searches
+TAVILY_MAX_CONNECTIONS = int(os.getenv("TAVILY_MAX_CONNECTIONS", "10"))
+
+# Email template fast path ("off", "tiered": templates for leads scoring below
+# EMAIL_LLM_MIN_SCORE, "always": templates for every lead)
+EMAIL_TEMPLATE_MODE = os.getenv("EMAIL_TEMPLATE_MODE", "off").lower()
+EMAIL_LLM_MIN_SCORE = float(os.getenv("EMAIL_LLM_MIN_SCORE", "0.5"))
+EMAIL_TEMPLATE_OFFER = os.getenv("EMAIL_TEMPLATE_OFFER", "")
+EMAIL_TEMPLATE_SIGNATURE = os.getenv("EMAIL_TEMPLATE_SIGNATURE", os.getenv("EMAIL_NAME", "The Team"))
+
+# Suppression index consulted before every send (bounces, unsubscribes, earlier contacts)
+SUPPRESSION_ENABLED = os.getenv("SUPPRESSION_ENABLED", "true").lower() == "true"
+SUPPRESSION_DB_PATH = os.getenv(
+    "SUPPRESSION_DB_PATH", os.path.join(os.path.dirname(__file__), "suppression.db")
+)
+SUPPRESSION_EXPECTED_ADDRESSES = int(os.getenv("SUPPRESSION_EXPECTED_ADDRESSES", "1000000"))
+SUPPRESSION_FALSE_POSITIVE_RATE = float(os.getenv("SUPPRESSION_FALSE_POSITIVE_RATE", "0.001"))
+SUPPRESSION_RECONTACT_DAYS = float(os.getenv("SUPPRESSION_RECONTACT_DAYS", "90"))
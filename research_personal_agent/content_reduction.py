@@ -0,0 +1,335 @@
+"""
+Content reduction for research search results.
+
+Tavily returns full page dumps for every hit, and the research queries for one
+company overlap heavily (about pages, press pages and contact pages repeat the
+same boilerplate). This module cuts pages into chunks, drops near-duplicate
+chunks with MinHash, scores what is left against the research intents and keeps
+the best chunks within a token budget, so the model only sees the excerpts that
+matter.
+"""
+
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import (
+    RESEARCH_CHUNK_WORDS,
+    RESEARCH_DUPLICATE_THRESHOLD,
+    RESEARCH_QUERY_TOKEN_BUDGET,
+)
+
+# Keywords describing what the research agent is looking for, per intent.
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "mission": (
+        "mission", "vision", "values", "about", "purpose", "founded", "believe",
+        "customers", "platform", "product", "products", "solution", "services",
+    ),
+    "news": (
+        "announced", "announces", "announcement", "press", "release", "news",
+        "launch", "launches", "partnership", "acquired", "acquisition", "funding",
+        "raised", "series", "expansion", "award", "hiring", "careers",
+    ),
+    "leadership": (
+        "ceo", "cto", "cfo", "coo", "founder", "co-founder", "president", "chief",
+        "director", "head", "vp", "leadership", "team", "board", "executive",
+    ),
+    "contact": (
+        "contact", "email", "phone", "call", "address", "office", "headquarters",
+        "support", "sales", "reach", "tel", "inquiries",
+    ),
+}
+
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_PATTERN = re.compile(r"\+?\d[\d\s\-().]{7,}\d")
+_WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+# Large Mersenne prime used for the MinHash universal hash family.
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text: str, max_words: int = RESEARCH_CHUNK_WORDS) -> List[str]:
+    """
+    Splits page text into chunks of at most ``max_words`` words.
+
+    Paragraph boundaries are respected where possible; paragraphs longer than
+    ``max_words`` are split on word boundaries.
+
+    Args:
+        text (str): The raw page content.
+        max_words (int): Maximum number of words per chunk.
+
+    Returns:
+        List[str]: The chunks, in page order.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        words = paragraph.split()
+        if not words:
+            continue
+        if len(current) + len(words) > max_words and current:
+            chunks.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _tokenize(text: str) -> List[str]:
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """
+    Returns the set of hashed word ``size``-shingles of a text.
+
+    Texts shorter than ``size`` words produce a single shingle of all their words.
+    """
+    words = _tokenize(text)
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for gram in grams
+    }
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of universal hash functions."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set: Iterable[int]) -> Tuple[int, ...]:
+        values = list(shingle_set)
+        if not values:
+            return tuple([_MERSENNE_PRIME] * self.num_perm)
+        return tuple(
+            min((a * value + b) % _MERSENNE_PRIME for value in values)
+            for a, b in self._params
+        )
+
+
+def estimate_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimates the Jaccard similarity of two texts from their MinHash signatures."""
+    if not first:
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures.
+
+    Signatures are split into bands; two chunks are compared only when they share
+    at least one band bucket, which keeps lookups cheap as the index grows over
+    all the searches made for one company.
+    """
+
+    def __init__(
+        self,
+        threshold: float = RESEARCH_DUPLICATE_THRESHOLD,
+        bands: int = 16,
+        hasher: Optional[MinHasher] = None,
+    ):
+        self.hasher = hasher or _DEFAULT_HASHER
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._signatures: List[Tuple[int, ...]] = []
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add_if_new(self, text: str) -> bool:
+        """
+        Adds a chunk to the index unless a near-duplicate is already present.
+
+        Returns:
+            bool: True if the chunk was new and has been added, False if it is a
+            near-duplicate of a chunk seen before.
+        """
+        signature = self.hasher.signature(shingles(text))
+        candidates: Set[int] = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        for candidate in candidates:
+            if estimate_similarity(signature, self._signatures[candidate]) >= self.threshold:
+                return False
+
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(position)
+        return True
+
+
+_DEFAULT_HASHER = MinHasher()
+
+
+def score_chunk(text: str, query: str = "") -> Tuple[str, float]:
+    """
+    Scores a chunk against the research intents and the query that found it.
+
+    Args:
+        text (str): The chunk text.
+        query (str): The search query the chunk was returned for.
+
+    Returns:
+        Tuple[str, float]: The best matching intent and the chunk's relevance score.
+    """
+    words = _tokenize(text)
+    if not words:
+        return "mission", 0.0
+
+    counts: Dict[str, int] = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    length_norm = len(words) ** 0.5
+
+    intent_scores = {
+        intent: sum(min(counts.get(keyword, 0), 3) for keyword in keywords) / length_norm
+        for intent, keywords in INTENT_KEYWORDS.items()
+    }
+    if _EMAIL_PATTERN.search(text) or _PHONE_PATTERN.search(text):
+        intent_scores["contact"] += 2.0
+
+    query_terms = set(_tokenize(query))
+    query_score = sum(1 for term in query_terms if term in counts) / max(len(query_terms), 1)
+
+    intent = max(intent_scores, key=intent_scores.get)
+    return intent, intent_scores[intent] + query_score
+
+
+def reduce_search_results(
+    results: List[Dict[str, Any]],
+    query: str,
+    index: Optional[NearDuplicateIndex] = None,
+    token_budget: int = RESEARCH_QUERY_TOKEN_BUDGET,
+) -> List[Dict[str, Any]]:
+    """
+    Reduces raw Tavily results to the most relevant, non-duplicate excerpts.
+
+    Args:
+        results (List[Dict[str, Any]]): Tavily results with url, title, content and
+            optionally raw_content.
+        query (str): The query the results were returned for.
+        index (Optional[NearDuplicateIndex]): Index of chunks already shown for this
+            company. Pass the same index across searches to de-duplicate between them.
+        token_budget (int): Maximum estimated tokens of excerpts to return.
+
+    Returns:
+        List[Dict[str, Any]]: Excerpts with url, title, intent, score and text,
+        ordered by descending score.
+    """
+    index = index or NearDuplicateIndex()
+    candidates: List[Dict[str, Any]] = []
+
+    for result in results:
+        page_text = result.get("raw_content") or result.get("content") or ""
+        for chunk in split_into_chunks(page_text):
+            intent, score = score_chunk(chunk, query)
+            if score <= 0:
+                continue
+            candidates.append({
+                "url": result.get("url"),
+                "title": result.get("title"),
+                "intent": intent,
+                "score": round(score, 3),
+                "text": chunk,
+            })
+
+    selected: List[Dict[str, Any]] = []
+    spent = 0
+    for candidate in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        cost = estimate_tokens(candidate["text"])
+        if spent + cost > token_budget:
+            continue
+        # Only chunks that make the cut enter the index, so a duplicate of a
+        # dropped chunk can still be selected from a later, better page.
+        if not index.add_if_new(candidate["text"]):
+            continue
+        selected.append(candidate)
+        spent += cost
+    return selected
+
+
+class ResearchBudget:
+    """Tracks the near-duplicate index and remaining token budget for one research run."""
+
+    def __init__(self, token_budget: int):
+        self.index = NearDuplicateIndex()
+        self.remaining = token_budget
+        # Searches of one run may be reduced in several threads at once.
+        self._lock = threading.Lock()
+
+    def take(self, excerpts: List[Dict[str, Any]]) -> None:
+        self.remaining -= sum(estimate_tokens(excerpt["text"]) for excerpt in excerpts)
+
+    def reduce(self, results: List[Dict[str, Any]], query: str, shares: int = 1) -> List[Dict[str, Any]]:
+        """
+        Reduces one search's results against the run's index and charges them to its budget.
+
+        Args:
+            results (List[Dict[str, Any]]): Tavily results of the search.
+            query (str): The query the results were returned for.
+            shares (int): Searches still to be reduced from the remaining budget, this one included;
+                this search gets an even share.
+
+        Returns:
+            List[Dict[str, Any]]: The selected excerpts.
+        """
+        with self._lock:
+            share = max(self.remaining, 0) // max(shares, 1)
+            excerpts = reduce_search_results(
+                results, query, index=self.index, token_budget=min(RESEARCH_QUERY_TOKEN_BUDGET, share)
+            )
+            self.take(excerpts)
+        return excerpts
+
+
+_budgets: "OrderedDict[str, ResearchBudget]" = OrderedDict()
+_budgets_lock = threading.Lock()
+_MAX_TRACKED_RUNS = 128
+
+
+def budget_for_run(run_id: str, token_budget: int) -> ResearchBudget:
+    """
+    Returns the research budget shared by all searches of one agent invocation.
+
+    Budgets for the least recently used runs are dropped once more than
+    ``_MAX_TRACKED_RUNS`` are tracked.
+    """
+    with _budgets_lock:
+        budget = _budgets.get(run_id)
+        if budget is None:
+            budget = _budgets[run_id] = ResearchBudget(token_budget)
+            while len(_budgets) > _MAX_TRACKED_RUNS:
+                _budgets.popitem(last=False)
+        else:
+            _budgets.move_to_end(run_id)
+        return budget
@@ -0,0 +1,185 @@
+"""
+Template fast path for the email creator.
+
+Each lead is scored from its research and persona: leads with little
+to personalize on (few facts, no decision makers, no pain points, no contact)
+score low. With EMAIL_TEMPLATE_MODE=tiered, leads scoring below
+EMAIL_LLM_MIN_SCORE get an email filled from a precompiled template instead of
+an email_creator model call; EMAIL_TEMPLATE_MODE=always uses the templates for
+every lead. A caller can set its own score in state["lead_score"] (e.g. from a
+CRM), which takes precedence over the computed one.
+
+The template output has the same JSON shape as the email_creator output and is
+placed in state["email"], so the email sender is unaffected.
+"""
+
+import json
+import logging
+import re
+from string import Template
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from common.agent_json import loads_agent_json
+
+from .config import EMAIL_LLM_MIN_SCORE, EMAIL_TEMPLATE_MODE, EMAIL_TEMPLATE_OFFER, EMAIL_TEMPLATE_SIGNATURE
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+TIERED = "tiered"
+ALWAYS = "always"
+
+LEAD_SCORE_STATE_KEY = "lead_score"
+
+_SUBJECTS = {
+    "formal": Template("Supporting $company with $pain"),
+    "friendly": Template("An idea for the $team"),
+}
+
+_BODIES = {
+    "formal": Template(
+        "Dear $team,\n\n"
+        "$opening\n\n"
+        "Organizations that are $trait often tell us that $pain takes more time and attention "
+        "than it should. $offer_sentence\n\n"
+        "We would welcome the opportunity to share how this could apply to $company. "
+        "Would a 20-minute call early next week or later this week suit you? "
+        "If a short written overview is more convenient, we are happy to send one instead.\n\n"
+        "Kind regards,\n$signature"
+    ),
+    "friendly": Template(
+        "Hi $team,\n\n"
+        "$opening\n\n"
+        "Teams that are $trait usually run into $pain sooner or later, and that is where we help. "
+        "$offer_sentence\n\n"
+        "Would you be up for a quick 20-minute chat early next week, or later in the week? "
+        "If that is too much, I can also just send over a one-page summary.\n\n"
+        "Best,\n$signature"
+    ),
+}
+
+_OPENINGS = {
+    "formal": Template("I have been following $company with interest. $detail."),
+    "friendly": Template("I came across $company recently. $detail caught my eye."),
+}
+
+_DEFAULT_DETAIL = "The way the company has been growing"
+_DEFAULT_TRAIT = "growing quickly"
+_DEFAULT_PAIN = "scaling day-to-day operations"
+
+
+def _tone_key(tone: Optional[str]) -> str:
+    tone = (tone or "").lower()
+    return "friendly" if any(word in tone for word in ("friendly", "casual", "warm", "informal")) else "formal"
+
+
+def _first_item(value: Any) -> Optional[str]:
+    """Returns the first entry of a list or comma-separated string, if any."""
+    if isinstance(value, list):
+        value = next((item for item in value if isinstance(item, str) and item.strip()), None)
+    elif isinstance(value, str):
+        value = value.split(",")[0]
+    else:
+        return None
+    value = value.strip().rstrip(".") if value else None
+    return value or None
+
+
+def _as_clause(text: str) -> str:
+    """Lowercases the first letter of a fact so it reads inside a sentence."""
+    return text[0].lower() + text[1:] if len(text) > 1 and not text[:2].isupper() else text
+
+
+def _list(value: Any) -> List[str]:
+    return [item for item in value if isinstance(item, str) and item.strip()] if isinstance(value, list) else []
+
+
+def score_lead(research: Optional[Dict[str, Any]], persona: Optional[Dict[str, Any]]) -> float:
+    """
+    Scores how much a lead would gain from a personalized email, between 0 and 1.
+
+    Args:
+        research (Optional[Dict[str, Any]]): The research agent output.
+        persona (Optional[Dict[str, Any]]): The persona creator output.
+
+    Returns:
+        float: The lead score; higher means more worth a model-written email.
+    """
+    research = research or {}
+    persona = persona or {}
+    score = 0.4 * min(len(_list(research.get("summary_bullets"))), 5) / 5
+    if _list(persona.get("decision_makers")):
+        score += 0.2
+    if _first_item(persona.get("pain_points")):
+        score += 0.15
+    if _list(research.get("primary_contact_emails")):
+        score += 0.15
+    if research.get("official_website_url") or _list(research.get("key_links")):
+        score += 0.1
+    return round(score, 3)
+
+
+def render_email(research: Optional[Dict[str, Any]], persona: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fills the template matching the persona's recommended tone.
+
+    Returns:
+        Dict[str, Any]: An email with the same keys as the email_creator output.
+    """
+    research = research or {}
+    persona = persona or {}
+    name = research.get("company_name") or persona.get("company")
+    company = name or "your company"
+    tone = _tone_key(persona.get("recommended_tone"))
+    detail = _first_item(research.get("summary_bullets"))
+    fields = {
+        "company": company,
+        "team": f"{name} team" if name else "team",
+        "trait": _as_clause(_first_item(persona.get("key_traits")) or _DEFAULT_TRAIT),
+        "pain": _as_clause(_first_item(persona.get("pain_points")) or _DEFAULT_PAIN),
+        "signature": EMAIL_TEMPLATE_SIGNATURE,
+    }
+    fields["opening"] = _OPENINGS[tone].substitute(fields, detail=detail or _DEFAULT_DETAIL)
+    fields["offer_sentence"] = (
+        f"We help with exactly this through {EMAIL_TEMPLATE_OFFER}." if EMAIL_TEMPLATE_OFFER
+        else "We help teams like yours take this off their plate."
+    )
+    subject = _SUBJECTS[tone].substitute(fields)
+    return {
+        "company_name": name,
+        "to_emails": _list(research.get("primary_contact_emails"))[:3],
+        "to_phones": _list(research.get("primary_contact_phones"))[:3],
+        "subject": re.sub(r"\s+", " ", subject),
+        "body": _BODIES[tone].substitute(fields),
+    }
+
+
+def use_email_template(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for email_creator: writes a template email for low-score leads.
+
+    The email is placed in state["email"], exactly where the email creator's
+    output_key would have put it, and the model call is skipped.
+    """
+    if EMAIL_TEMPLATE_MODE not in (TIERED, ALWAYS):
+        return None
+    state = callback_context.state
+    research = loads_agent_json(state.get("research"))
+    persona = loads_agent_json(state.get("persona"))
+    research = research if isinstance(research, dict) else None
+    persona = persona if isinstance(persona, dict) else None
+
+    if EMAIL_TEMPLATE_MODE == TIERED:
+        score = state.get(LEAD_SCORE_STATE_KEY)
+        if not isinstance(score, (int, float)):
+            score = score_lead(research, persona)
+        if score >= EMAIL_LLM_MIN_SCORE:
+            return None
+        logger.info(f"Lead score {score} below {EMAIL_LLM_MIN_SCORE}; using the email template")
+
+    email_json = json.dumps(render_email(research, persona), separators=(",", ":"))
+    callback_context.state["email"] = email_json
+    return types.Content(role="model", parts=[types.Part(text=email_json)])
@@ -0,0 +1,347 @@
+"""
+Persistent store of company research.
+
+Research is keyed by a resolved company identity (normalized name plus website
+domain, with fuzzy name matching), so a company researched for one user is not
+researched again when it comes back under a slightly different name or URL.
+The research agent consults the store before running and records its output
+afterwards.
+
+Names are only matched fuzzily when a website domain is known on at least one
+side, and only when the names share a word and differ by typos, never by a
+whole word ("Acme Health" is not "Acme Wealth"). With RESEARCH_STORE_VERIFY_FUZZY
+a fuzzy hit does not skip the research: the research runs, and the website it
+finds decides whether its output joins the stored company.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from common.agent_json import loads_agent_json
+from common.entity_resolution import (
+    blocking_keys,
+    is_fuzzy_match,
+    name_similarity,
+    normalize_domain,
+    normalize_name,
+)
+
+from .config import (
+    RESEARCH_STORE_ENABLED,
+    RESEARCH_STORE_FUZZY_THRESHOLD,
+    RESEARCH_STORE_PATH,
+    RESEARCH_STORE_TTL_DAYS,
+    RESEARCH_STORE_VERIFY_FUZZY,
+)
+
+logger = logging.getLogger(__name__)
+
+# A website written in a message: it must start with a scheme or "www." (so "Node.js"
+# is not one) and must not be the domain part of an email address.
+_URL_PATTERN = re.compile(
+    r"(?<![@\w.])(?:https?://|www\.)[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}\b(?:/\S*)?", re.IGNORECASE
+)
+
+DOMAIN_MATCH = "domain"
+EXACT_MATCH = "exact"
+FUZZY_MATCH = "fuzzy"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    id INTEGER PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    domain TEXT,
+    display_name TEXT,
+    research TEXT,
+    contacts TEXT,
+    created_at REAL NOT NULL,
+    researched_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_companies_name_key ON companies(name_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_companies_domain ON companies(domain) WHERE domain IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS company_aliases (
+    alias TEXT PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS company_blocking_keys (
+    key TEXT NOT NULL,
+    company_id INTEGER NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    PRIMARY KEY (key, company_id)
+) WITHOUT ROWID;
+"""
+
+
+class ResearchStore:
+    """SQLite-backed research store with company entity resolution."""
+
+    def __init__(self, path: str = RESEARCH_STORE_PATH, fuzzy_threshold: float = RESEARCH_STORE_FUZZY_THRESHOLD):
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+
+    def resolve(self, name: Optional[str] = None, website: Optional[str] = None) -> Optional[int]:
+        """
+        Resolves a company name and/or website to a stored company ID.
+
+        Matching order: exact website domain, exact normalized name or known alias,
+        then fuzzy name match among companies sharing a blocking key. Name matches
+        are rejected when both sides have a domain and the domains differ, and fuzzy
+        matches need a domain on at least one side (see ``is_fuzzy_match``).
+
+        Args:
+            name (Optional[str]): The company name as written by the caller.
+            website (Optional[str]): The company website or domain.
+
+        Returns:
+            Optional[int]: The company ID, or None if the company is unknown.
+        """
+        with self._lock:
+            return self._resolve(normalize_name(name), normalize_domain(website))[0]
+
+    def _resolve(self, name_key: str, domain: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+        """Returns the matching company ID and how it matched (DOMAIN_MATCH, EXACT_MATCH or FUZZY_MATCH)."""
+        if domain:
+            row = self._conn.execute("SELECT id FROM companies WHERE domain = ?", (domain,)).fetchone()
+            if row:
+                return row["id"], DOMAIN_MATCH
+        if not name_key:
+            return None, None
+
+        row = self._conn.execute(
+            """
+            SELECT a.company_id, c.domain
+            FROM company_aliases a JOIN companies c ON c.id = a.company_id
+            WHERE a.alias = ?
+            """,
+            (name_key,),
+        ).fetchone()
+        if row:
+            # Same name, different website: another company of that name.
+            if domain and row["domain"] and row["domain"] != domain:
+                return None, None
+            return row["company_id"], EXACT_MATCH
+
+        keys = list(blocking_keys(name_key))
+        placeholders = ",".join("?" * len(keys))
+        candidates = self._conn.execute(
+            f"""
+            SELECT DISTINCT c.id, c.name_key, c.domain
+            FROM company_blocking_keys k JOIN companies c ON c.id = k.company_id
+            WHERE k.key IN ({placeholders})
+            """,
+            keys,
+        ).fetchall()
+
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            if domain and candidate["domain"] and candidate["domain"] != domain:
+                continue
+            # Without any website, only exact names identify a company.
+            if not domain and not candidate["domain"]:
+                continue
+            if not is_fuzzy_match(name_key, candidate["name_key"], self.fuzzy_threshold):
+                continue
+            score = name_similarity(name_key, candidate["name_key"])
+            if score > best_score:
+                best_id, best_score = candidate["id"], score
+        return best_id, FUZZY_MATCH if best_id is not None else None
+
+    def get(
+        self,
+        name: Optional[str] = None,
+        website: Optional[str] = None,
+        max_age_seconds: Optional[float] = None,
+        allow_fuzzy: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Looks up the stored research for a company.
+
+        Args:
+            name (Optional[str]): The company name.
+            website (Optional[str]): The company website or domain.
+            max_age_seconds (Optional[float]): If given, research older than this is ignored.
+            allow_fuzzy (bool): Whether a fuzzy name match may answer the lookup.
+
+        Returns:
+            Optional[Dict[str, Any]]: A record with id, name, domain, research, contacts,
+            created_at, researched_at and match (how the company was matched), or None
+            if nothing (fresh enough) is stored.
+        """
+        with self._lock:
+            company_id, match = self._resolve(normalize_name(name), normalize_domain(website))
+            if company_id is None or (match == FUZZY_MATCH and not allow_fuzzy):
+                return None
+            row = self._conn.execute("SELECT * FROM companies WHERE id = ?", (company_id,)).fetchone()
+
+        if row["research"] is None:
+            return None
+        if max_age_seconds is not None and (row["researched_at"] or 0) < time.time() - max_age_seconds:
+            return None
+        return {
+            "id": row["id"],
+            "name": row["display_name"],
+            "domain": row["domain"],
+            "research": json.loads(row["research"]),
+            "contacts": json.loads(row["contacts"] or "{}"),
+            "created_at": row["created_at"],
+            "researched_at": row["researched_at"],
+            "match": match,
+        }
+
+    def save(self, research: Dict[str, Any], aliases: Optional[List[str]] = None) -> Optional[int]:
+        """
+        Stores research output for a company, merging it into an existing record
+        when the company resolves to one.
+
+        Args:
+            research (Dict[str, Any]): The research agent's JSON output.
+            aliases (Optional[List[str]]): Extra names the company was explicitly requested under.
+
+        Returns:
+            Optional[int]: The company ID, or None if the research names no company.
+        """
+        name = research.get("company_name")
+        name_key = normalize_name(name)
+        domain = normalize_domain(research.get("official_website_url"))
+        if not name_key and not domain:
+            return None
+
+        now = time.time()
+        with self._lock, self._conn:
+            company_id, _ = self._resolve(name_key, domain)
+            contacts = {
+                "emails": list(research.get("primary_contact_emails") or []),
+                "phones": list(research.get("primary_contact_phones") or []),
+            }
+
+            if company_id is None:
+                company_id = self._conn.execute(
+                    """
+                    INSERT INTO companies (name_key, domain, display_name, research, contacts, created_at, researched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (name_key, domain, name, json.dumps(research), json.dumps(contacts), now, now),
+                ).lastrowid
+            else:
+                row = self._conn.execute("SELECT domain, contacts FROM companies WHERE id = ?", (company_id,)).fetchone()
+                previous = json.loads(row["contacts"] or "{}")
+                for key in ("emails", "phones"):
+                    contacts[key] = list(dict.fromkeys(contacts[key] + previous.get(key, [])))
+                self._conn.execute(
+                    """
+                    UPDATE companies
+                    SET domain = COALESCE(domain, ?), display_name = COALESCE(?, display_name),
+                        research = ?, contacts = ?, researched_at = ?
+                    WHERE id = ?
+                    """,
+                    (domain, name, json.dumps(research), json.dumps(contacts), now, company_id),
+                )
+
+            for alias in [name_key] + [normalize_name(alias) for alias in aliases or []]:
+                if not alias:
+                    continue
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO company_aliases (alias, company_id) VALUES (?, ?)",
+                    (alias, company_id),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO company_blocking_keys (key, company_id) VALUES (?, ?)",
+                    [(key, company_id) for key in blocking_keys(alias)],
+                )
+        return company_id
+
+
+_store: Optional[ResearchStore] = None
+
+
+def get_store() -> ResearchStore:
+    """Returns the process-wide research store, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = ResearchStore()
+    return _store
+
+
+def _requested_company(callback_context: CallbackContext) -> Dict[str, Optional[str]]:
+    """
+    Works out which company a research run is for.
+
+    The name only comes from the "company_name" state key set by a caller; free
+    text is never taken as a company name. The website comes from the
+    "company_website" state key or, failing that, a URL in the user message.
+    """
+    state = callback_context.state
+    name = state.get("company_name")
+    website = state.get("company_website")
+
+    content = callback_context.user_content
+    text = " ".join(part.text for part in (content.parts if content else []) or [] if part.text).strip()
+    if not website and text:
+        match = _URL_PATTERN.search(text)
+        if match:
+            website = match.group(0)
+    return {"name": name, "website": website}
+
+
+def use_stored_research(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for research_agent: skips the research when a fresh
+    record for the requested company is already stored.
+
+    The stored research is placed in state["research"], exactly where the research
+    agent's output_key would have put it, so later stages are unaffected.
+    """
+    if not RESEARCH_STORE_ENABLED:
+        return None
+    requested = _requested_company(callback_context)
+    if not requested["name"] and not requested["website"]:
+        return None
+
+    try:
+        record = get_store().get(
+            requested["name"],
+            requested["website"],
+            max_age_seconds=RESEARCH_STORE_TTL_DAYS * 86400,
+            allow_fuzzy=not RESEARCH_STORE_VERIFY_FUZZY,
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Research store lookup failed: {e}")
+        return None
+    if record is None:
+        return None
+
+    research_json = json.dumps(record["research"], separators=(",", ":"))
+    callback_context.state["research"] = research_json
+    logger.info(f"Using stored research for '{record['name']}' (company {record['id']}, {record['match']} match)")
+    return types.Content(role="model", parts=[types.Part(text=research_json)])
+
+
+def store_research(callback_context: CallbackContext) -> None:
+    """after_agent_callback for research_agent: records the research output in the store."""
+    if not RESEARCH_STORE_ENABLED:
+        return None
+    research = loads_agent_json(callback_context.state.get("research"))
+    if not isinstance(research, dict):
+        return None
+
+    requested = _requested_company(callback_context)
+    try:
+        get_store().save(research, aliases=[requested["name"]] if requested["name"] else None)
+    except sqlite3.Error as e:
+        logger.error(f"Research store update failed: {e}")
+    return None
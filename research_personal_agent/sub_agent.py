@@ -4,22 +4,18 @@ from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.tools import google_search
 from google.adk.tools import FunctionTool
-from google.adk.tools.langchain_tool import LangchainTool
-from langchain_community.tools import TavilySearchResults
-from .tools import build_persona, send_email
+from google.genai import types
+from .email_templates import use_email_template
+from .research_store import store_research, use_stored_research
+from .tools import build_persona, send_email, tavily_research, tavily_search
 
 load_dotenv()
 
 #--------------------------------[positive_critic]----------------------------------
-# Tavily via LangChain wrapped as an ADK tool
-_tavily_search = TavilySearchResults(
-    max_results=5,
-    search_depth="advanced",
-    include_answer=True,
-    include_raw_content=True,
-    include_images=False,
-)
-_adk_tavily_tool = LangchainTool(tool=_tavily_search)
+# Tavily search tools; return de-duplicated, relevance-ranked excerpts instead of full pages
+_adk_tavily_tool = FunctionTool(tavily_search)
+# Runs all standard research searches for a company concurrently in one tool call
+_adk_tavily_research_tool = FunctionTool(tavily_research)
 
 research_agent = Agent(
     name = "research_agent",
@@ -27,23 +23,20 @@ research_agent = Agent(
      description="Gather mission, values, and news summaries.",
     instruction=(
         """
-        USE THE TAVILY SEARCH TOOL (VIA LANGCHAIN) TO GATHER INFORMATION
+        USE THE TAVILY RESEARCH TOOL (tavily_research) TO GATHER INFORMATION
         You are the Research Agent.
         Goal: Identify and compile authoritative information for the target company, with special
         focus on contact details and recent credible updates.
 
         Required steps:
         1) Determine the company name from the state or the latest user message.
-        2) Use the Tavily search tool to collect source content (mission, values, press/news,
-           about pages, leadership, product pages, careers, contact info, etc.). Make multiple
-           targeted queries such as:
-           - "company_name official site about mission values"
-           - "company_name press newsroom recent announcements"
-           - "company_name product platform overview"
-           - "company_name leadership team"
-           - "company_name careers hiring"
-           - "company_name contact email"
-           - "company_name contact phone number"
+        2) Call tavily_research ONCE with the company name and an empty intents list. It runs
+           all standard searches at the same time (about/mission, newsroom, product, leadership,
+           careers, contact email, contact phone) and returns the excerpts of each.
+           Only if something important is still missing, use tavily_search for a few targeted
+           follow-up queries such as "company_name contact email".
+           Searches return short excerpts (already de-duplicated against earlier
+           searches) rather than full pages; rely on them instead of repeating queries.
         3) From the collected content and your own reasoning, extract:
            - primary_contact_emails: up to 3 likely official emails
            - primary_contact_phones: up to 3 likely official phone numbers
@@ -54,7 +47,7 @@ research_agent = Agent(
         Output strictly as minified JSON with the following structure:
         {
           "company_name": string,
-          "research_text": string,          // raw or combined text from sources
+          "research_text": string,          // condensed notes from the excerpts, max ~150 words
           "summary_bullets": [string],     // concise facts, 5-10 items
           "primary_contact_emails": [string],
           "primary_contact_phones": [string],
@@ -63,17 +56,21 @@ research_agent = Agent(
         }
 
         If any field is unknown, set it to null or an empty array as appropriate.
-        DONT MOVE TO NEXT STEP UNTIL THE TAVILY TOOL HAS BEEN CALLED AND SUMMARIZED
+        DONT MOVE TO NEXT STEP UNTIL THE TAVILY RESEARCH TOOL HAS BEEN CALLED AND SUMMARIZED
         """
     ),
-    tools=[_adk_tavily_tool],
-    output_key="research",                   
+    tools=[_adk_tavily_research_tool, _adk_tavily_tool],
+    output_key="research",
+    before_agent_callback=use_stored_research,
+    after_agent_callback=store_research,
 )    
 
 #--------------------------------[negative_critic]----------------------------------
 persona_creator = Agent(
     name = "persona_creator",
     model = "gemini-2.0-flash",
+    # Deterministic, so the same research always yields the same persona (and can be cached)
+    generate_content_config=types.GenerateContentConfig(temperature=0),
      description="Builds a detailed persona from contacts and research.",
     instruction=(
         """
@@ -148,6 +145,7 @@ email_creator = Agent(
             - Avoid hallucinating data; if uncertain, keep statements general and honest.
         """,
     output_key="email",
+    before_agent_callback=use_email_template,
 )
 
 #--------------------------------[final_sender]----------------------------------
@@ -176,6 +174,9 @@ email_sender = Agent(
            - subject = email.subject
            - content = email.body
 
+        If send_email returns status "suppressed", the address must not be emailed: do not retry it,
+        report the reason instead.
+
         MUST CALL THE send_email TOOL TO COMPLETE THE TASK 
         """
     ),
@@ -0,0 +1,357 @@
+"""
+Suppression index consulted before every outgoing email.
+
+Addresses that bounced, unsubscribed or complained, and addresses already
+contacted within SUPPRESSION_RECONTACT_DAYS, are not emailed again. The exact
+index is a SQLite table keyed by normalized address; in front of it sits an
+in-memory Bloom filter sized for SUPPRESSION_EXPECTED_ADDRESSES, so the common
+case (an address that was never suppressed) is answered without reading the
+table. Only Bloom filter hits, a SUPPRESSION_FALSE_POSITIVE_RATE fraction of
+new addresses plus the truly suppressed ones, go to the table.
+
+Several processes (server workers, the import command) may write the table.
+Before the filter answers, SQLite's data_version tells whether another
+connection committed since the last check; if so, the addresses added since
+then are loaded into the filter first.
+
+Senders call ``reserve`` rather than ``check``: it checks and records the
+contact in one write transaction, so two processes can never both send to the
+same address, and ``release`` drops the reservation if the email was not sent.
+
+Lists from other systems are imported and exported as CSV (address, reason):
+
+    python -m research_personal_agent.suppression import unsubscribes.csv --reason unsubscribed
+    python -m research_personal_agent.suppression export suppressed.csv
+    python -m research_personal_agent.suppression check someone@example.com
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import (
+    SUPPRESSION_DB_PATH,
+    SUPPRESSION_EXPECTED_ADDRESSES,
+    SUPPRESSION_FALSE_POSITIVE_RATE,
+    SUPPRESSION_RECONTACT_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTACTED = "contacted"
+BOUNCED = "bounced"
+UNSUBSCRIBED = "unsubscribed"
+COMPLAINED = "complained"
+
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+_IMPORT_CHUNK = 10000
+# Rows written by other processes are picked up by their added_at; this much
+# clock skew and transaction latency between writers is tolerated.
+_SYNC_MARGIN_SECONDS = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressed (
+    address TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    added_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# A newer entry replaces an existing one only when the existing one merely records
+# an earlier contact, so an unsubscribe is never downgraded by a later send.
+_UPSERT = """
+INSERT INTO suppressed (address, reason, added_at) VALUES (?, ?, ?)
+ON CONFLICT(address) DO UPDATE SET reason = excluded.reason, added_at = excluded.added_at
+WHERE suppressed.reason = 'contacted'
+"""
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """
+    Normalizes an email address so that variants of one mailbox compare equal.
+
+    Lowercases, strips display names and "mailto:", drops "+tag" suffixes and,
+    for Gmail, dots in the local part.
+
+    Returns:
+        str: The normalized address, or "" if the input is not an address.
+    """
+    address = (address or "").strip()
+    if "<" in address and address.endswith(">"):
+        address = address[address.rindex("<") + 1:-1]
+    address = address.lower()
+    if address.startswith("mailto:"):
+        address = address[len("mailto:"):]
+    local, _, domain = address.strip().rpartition("@")
+    if not local or "." not in domain:
+        return ""
+    local = local.split("+", 1)[0]
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}" if local else ""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing of one blake2b digest."""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SuppressionIndex:
+    """Exact SQLite suppression index behind a Bloom filter."""
+
+    def __init__(
+        self,
+        path: str = SUPPRESSION_DB_PATH,
+        expected_addresses: int = SUPPRESSION_EXPECTED_ADDRESSES,
+        false_positive_rate: float = SUPPRESSION_FALSE_POSITIVE_RATE,
+        recontact_days: float = SUPPRESSION_RECONTACT_DAYS,
+    ):
+        self.path = path
+        self.false_positive_rate = false_positive_rate
+        self.recontact_seconds = recontact_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._counters = {"checks": 0, "bloom_hits": 0, "suppressed": 0, "reserved": 0, "syncs": 0}
+        self._rebuild_filter(expected_addresses)
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _rebuild_filter(self, capacity: int) -> None:
+        # Read first: commits made while the filter loads are picked up by the next sync.
+        self._seen_version = self._data_version()
+        total, watermark = self._conn.execute("SELECT COUNT(*), MAX(added_at) FROM suppressed").fetchone()
+        bloom = BloomFilter(max(capacity, total * 2), self.false_positive_rate)
+        for (address,) in self._conn.execute("SELECT address FROM suppressed"):
+            bloom.add(address)
+        self._bloom = bloom
+        self._watermark = watermark or 0.0
+        logger.info(f"Suppression index loaded {total} addresses from {self.path}")
+
+    def _sync_filter(self) -> None:
+        """Adds the addresses other connections wrote since the last check to the Bloom filter."""
+        version = self._data_version()
+        if version == self._seen_version:
+            return
+        self._seen_version = version
+        self._counters["syncs"] += 1
+        rows = self._conn.execute(
+            "SELECT address, added_at FROM suppressed WHERE added_at >= ?",
+            (self._watermark - _SYNC_MARGIN_SECONDS,),
+        ).fetchall()
+        for address, added_at in rows:
+            self._watermark = max(self._watermark, added_at)
+            self._add_to_filter(address)
+
+    def _add_to_filter(self, address: str) -> None:
+        if address in self._bloom:
+            return
+        self._bloom.add(address)
+        if self._bloom.count > self._bloom.capacity:
+            # Past its capacity the filter's false positive rate climbs; grow it.
+            self._rebuild_filter(self._bloom.capacity * 2)
+
+    def check(self, address: str) -> Optional[str]:
+        """
+        Returns why an address must not be emailed, or None if it may be.
+
+        Args:
+            address (str): The recipient address, in any form.
+
+        Returns:
+            Optional[str]: The suppression reason, e.g. "unsubscribed".
+        """
+        normalized = normalize_address(address)
+        with self._lock:
+            self._counters["checks"] += 1
+            if not normalized:
+                return None
+            self._sync_filter()
+            if normalized not in self._bloom:
+                return None
+            self._counters["bloom_hits"] += 1
+            return self._lookup(normalized)
+
+    def _lookup(self, normalized: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT reason, added_at FROM suppressed WHERE address = ?", (normalized,)
+        ).fetchone()
+        if row is None:
+            return None
+        reason, added_at = row
+        if reason == CONTACTED and self.recontact_seconds and added_at < time.time() - self.recontact_seconds:
+            return None
+        self._counters["suppressed"] += 1
+        return reason
+
+    def reserve(self, address: str) -> Optional[str]:
+        """
+        Checks an address and, if it may be emailed, records it as contacted, atomically.
+
+        The check and the write share one write transaction, so concurrent senders
+        in any process see each other's reservations. Call ``release`` if the email
+        is then not sent.
+
+        Args:
+            address (str): The recipient address, in any form.
+
+        Returns:
+            Optional[str]: The suppression reason, or None if the address is now reserved.
+        """
+        normalized = normalize_address(address)
+        with self._lock:
+            self._counters["checks"] += 1
+            if not normalized:
+                return None
+            self._sync_filter()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                reason = self._lookup(normalized)
+                if reason is None:
+                    self._conn.execute(_UPSERT, (normalized, CONTACTED, time.time()))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            if reason is None:
+                self._counters["reserved"] += 1
+                self._add_to_filter(normalized)
+            return reason
+
+    def release(self, address: str) -> None:
+        """Drops a reservation made by ``reserve`` for an email that was not sent."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM suppressed WHERE address = ? AND reason = ?", (normalize_address(address), CONTACTED)
+            )
+
+    def add(self, address: str, reason: str) -> bool:
+        """Suppresses one address; returns False if it is not a valid address."""
+        return self.add_many([(address, reason)]) == 1
+
+    def add_many(self, entries: Iterable[Tuple[str, str]]) -> int:
+        """
+        Suppresses many (address, reason) pairs, committing in chunks.
+
+        Returns:
+            int: Number of valid addresses processed.
+        """
+        added = 0
+        chunk = []
+        for address, reason in entries:
+            normalized = normalize_address(address)
+            if normalized:
+                chunk.append((normalized, reason, time.time()))
+            if len(chunk) >= _IMPORT_CHUNK:
+                added += self._write(chunk)
+                chunk = []
+        if chunk:
+            added += self._write(chunk)
+        return added
+
+    def _write(self, chunk: List[Tuple[str, str, float]]) -> int:
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, chunk)
+            for address, _, _ in chunk:
+                self._add_to_filter(address)
+        return len(chunk)
+
+    def remove(self, address: str) -> bool:
+        """Lifts the suppression of an address (the Bloom filter bit stays; the exact index decides)."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM suppressed WHERE address = ?", (normalize_address(address),))
+        return cursor.rowcount > 0
+
+    def import_csv(self, path: str, default_reason: str = UNSUBSCRIBED) -> int:
+        """Imports a CSV or plain list of addresses; an optional second column holds the reason."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = csv.reader(f)
+            return self.add_many(
+                (row[0], row[1].strip() if len(row) > 1 and row[1].strip() else default_reason)
+                for row in rows if row and "@" in row[0]
+            )
+
+    def export_csv(self, path: str) -> int:
+        """Writes every suppressed address as address, reason, added_at; returns the row count."""
+        count = 0
+        with self._lock, open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["address", "reason", "added_at"])
+            for row in self._conn.execute("SELECT address, reason, added_at FROM suppressed ORDER BY address"):
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, addresses=self._bloom.count, bloom_bits=self._bloom.size)
+
+
+_index: Optional[SuppressionIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SuppressionIndex:
+    """Returns the process-wide suppression index, opening it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SuppressionIndex()
+        return _index
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the email suppression index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Import addresses from a CSV file.")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--reason", default=UNSUBSCRIBED, help="Reason for rows without one.")
+    export_parser = commands.add_parser("export", help="Export all suppressed addresses to a CSV file.")
+    export_parser.add_argument("path")
+    check_parser = commands.add_parser("check", help="Show whether an address is suppressed.")
+    check_parser.add_argument("address")
+    remove_parser = commands.add_parser("remove", help="Lift the suppression of an address.")
+    remove_parser.add_argument("address")
+    args = parser.parse_args(argv)
+
+    index = get_index()
+    if args.command == "import":
+        print(f"Imported {index.import_csv(args.path, args.reason)} addresses")
+    elif args.command == "export":
+        print(f"Exported {index.export_csv(args.path)} addresses")
+    elif args.command == "check":
+        print(index.check(args.address) or "not suppressed")
+    elif args.command == "remove":
+        print("removed" if index.remove(args.address) else "not found")
+
+
+if __name__ == "__main__":
+    main()
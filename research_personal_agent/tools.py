@@ -1,13 +1,32 @@
+import asyncio
 import json
 import os
 import re
 import logging
+import sqlite3
+import weakref
 # from tavily import TavilyClient
 from dotenv import load_dotenv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import httpx
+from google.adk.tools import ToolContext
+from langchain_community.tools import TavilySearchResults
+from langchain_community.utilities.tavily_search import TAVILY_API_URL
+
+from common import cassette, deadline, hedging, rate_limit, resilience, single_flight
+
+from . import content_reduction, email_templates, suppression
+from .config import (
+    RESEARCH_TOKEN_BUDGET,
+    SMTP_TIMEOUT_SECONDS,
+    SUPPRESSION_ENABLED,
+    TAVILY_MAX_CONNECTIONS,
+    TAVILY_TIMEOUT_SECONDS,
+)
+
 load_dotenv()
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 if not TAVILY_API_KEY:
@@ -16,6 +35,15 @@ if not TAVILY_API_KEY:
 # tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
 logging.basicConfig(level=logging.INFO)
 
+# Tavily search settings; results are reduced before they reach the model
+_tavily_search = TavilySearchResults(
+    max_results=5,
+    search_depth="advanced",
+    include_answer=True,
+    include_raw_content=True,
+    include_images=False,
+)
+
 # def extract_contacts(company_name: str) -> str:
 #     """Extract contact emails and phone numbers for a company.
 
@@ -67,6 +95,133 @@ logging.basicConfig(level=logging.INFO)
 #             content += r.get("content", "") + "\n\n"
 #     return json.dumps({"research_text": content})
 
+# One pooled HTTP client per event loop, shared by all Tavily searches, so
+# concurrent searches reuse connections instead of opening one each.
+_tavily_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _tavily_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _tavily_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=TAVILY_API_URL,
+            limits=httpx.Limits(max_connections=TAVILY_MAX_CONNECTIONS, max_keepalive_connections=TAVILY_MAX_CONNECTIONS),
+        )
+        _tavily_clients[loop] = client
+    return client
+
+
+async def _search_tavily(query: str) -> dict:
+    """Runs one raw Tavily search through the rate limit, hedging, retry, coalescing and cassette layers."""
+    async def search() -> dict:
+        await rate_limit.acquire("tavily")
+        timeout = deadline.timeout(TAVILY_TIMEOUT_SECONDS)
+        # Async so that cancelling the research run aborts the pending request.
+        async with asyncio.timeout(timeout):
+            response = await _tavily_client().post(
+                "/search",
+                json={
+                    "api_key": TAVILY_API_KEY,
+                    "query": query,
+                    "max_results": _tavily_search.max_results,
+                    "search_depth": _tavily_search.search_depth,
+                    "include_answer": _tavily_search.include_answer,
+                    "include_raw_content": _tavily_search.include_raw_content,
+                    "include_images": _tavily_search.include_images,
+                },
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+
+    request = {"query": query, "max_results": _tavily_search.max_results, "search_depth": _tavily_search.search_depth}
+    return await cassette.call_async(
+        "tavily",
+        request,
+        lambda: single_flight.call(
+            "tavily",
+            dict(request, query=single_flight.normalize_text(query)),
+            lambda: resilience.dependency("tavily").call(lambda: hedging.hedged("tavily", search)),
+        ),
+    )
+
+
+async def tavily_search(query: str, tool_context: ToolContext) -> dict:
+    """Search the web with Tavily and return the most relevant excerpts for the query.
+
+    Full pages are split into chunks, near-duplicates of anything already returned
+    during this research run are dropped, and the best-scoring chunks are kept
+    within the run's token budget.
+
+    Args:
+        query: The search query, e.g. "Acme Corp leadership team".
+
+    Returns:
+        dict with the query, Tavily's short answer and a list of excerpts
+        (url, title, intent, score, text).
+    """
+    raw = await _search_tavily(query)
+    budget = content_reduction.budget_for_run(tool_context.invocation_id, RESEARCH_TOKEN_BUDGET)
+    # MinHash over full pages is CPU-bound; it runs off the event loop.
+    excerpts = await asyncio.to_thread(budget.reduce, raw.get("results", []), query)
+    return {"query": query, "answer": raw.get("answer"), "excerpts": excerpts}
+
+
+# Query templates of the standard research intents
+RESEARCH_INTENTS = {
+    "about": "{company} official site about mission values",
+    "newsroom": "{company} press newsroom recent announcements",
+    "product": "{company} product platform overview",
+    "leadership": "{company} leadership team",
+    "careers": "{company} careers hiring",
+    "contact_email": "{company} contact email",
+    "contact_phone": "{company} contact phone number",
+}
+
+
+async def tavily_research(company_name: str, intents: list[str], tool_context: ToolContext) -> dict:
+    """Research a company with several Tavily searches at once and return their excerpts in one response.
+
+    All searches run concurrently. Their results are de-duplicated against each
+    other and against everything already returned during this research run, and
+    the run's token budget is shared evenly between the intents.
+
+    Args:
+        company_name: The company to research, e.g. "Acme Corp".
+        intents: Any of "about", "newsroom", "product", "leadership", "careers",
+            "contact_email", "contact_phone"; other entries are searched as
+            "<company_name> <entry>". Empty for all standard intents.
+
+    Returns:
+        dict with the company name, one entry per intent (intent, query, answer,
+        excerpts) and the intents whose search failed.
+    """
+    intents = list(dict.fromkeys(intent.strip() for intent in intents or RESEARCH_INTENTS if intent.strip()))
+    queries = [
+        RESEARCH_INTENTS[intent].format(company=company_name) if intent in RESEARCH_INTENTS
+        else f"{company_name} {intent}"
+        for intent in intents
+    ]
+    raws = await asyncio.gather(*(_search_tavily(query) for query in queries), return_exceptions=True)
+
+    budget = content_reduction.budget_for_run(tool_context.invocation_id, RESEARCH_TOKEN_BUDGET)
+    results, errors = [], {}
+    seen_urls = set()
+    for position, (intent, query, raw) in enumerate(zip(intents, queries, raws)):
+        if isinstance(raw, BaseException):
+            if isinstance(raw, asyncio.CancelledError):
+                raise raw
+            errors[intent] = str(raw) or type(raw).__name__
+            continue
+        # A page returned for several intents is only read once.
+        pages = [page for page in raw.get("results", []) if page.get("url") not in seen_urls]
+        seen_urls.update(page.get("url") for page in pages)
+        excerpts = await asyncio.to_thread(budget.reduce, pages, query, len(intents) - position)
+        results.append({"intent": intent, "query": query, "answer": raw.get("answer"), "excerpts": excerpts})
+    return {"company_name": company_name, "results": results, "errors": errors}
+
+
 def build_persona(input_json: str) -> str:
     """Generate a persona summary from research text and contacts.
 
@@ -87,24 +242,21 @@ def draft_email(input_json: str) -> str:
     Inputs JSON should include: persona, contacts, user_context, company_name.
     """
     data = json.loads(input_json)
-    company = data.get("company_name") or data["persona"].get("company")
-    traits = data["persona"]["key_traits"]
-    pain = data["persona"]["pain_points"]
-    subject = f"Partnership Opportunity with {company}"
-    body = (
-        f"Hello {company} team,\n\n"
-        f"Your focus on {traits} aligns perfectly with our solutions. "
-        f"We understand challenges around {pain} and can help by ...\n\n"
-        f"Best regards,\nYour Name"
-    )
-    return json.dumps({"subject": subject, "body": body})
+    persona = data.get("persona") or {}
+    research = {
+        "company_name": data.get("company_name") or persona.get("company"),
+        "primary_contact_emails": (data.get("contacts") or {}).get("emails") or [],
+    }
+    email = email_templates.render_email(research, persona)
+    return json.dumps({"subject": email["subject"], "body": email["body"]})
 
 
-def send_email(receiver_email: str, receiver_name: str, subject: str, content: str) -> str:
+async def send_email(receiver_email: str, receiver_name: str, subject: str, content: str) -> str:
     """Send an email via SMTP.
 
     Requires EMAIL_USER and EMAIL_PASSWORD in environment variables.
-    Returns JSON with status and optional error message.
+    Returns JSON with status and optional error message; status is "suppressed"
+    when the address bounced, unsubscribed or was contacted recently.
     """
     print("Starting mail senfing process...")
     email_user = os.getenv("EMAIL_USER")
@@ -123,19 +275,65 @@ def send_email(receiver_email: str, receiver_name: str, subject: str, content: s
     message['Subject'] = subject
     message.attach(MIMEText(content, 'plain'))
 
+    if SUPPRESSION_ENABLED:
+        # Records the contact before sending, so a concurrent send to the same address is suppressed.
+        try:
+            reason = await asyncio.to_thread(lambda: suppression.get_index().reserve(receiver_email))
+        except sqlite3.Error as e:
+            return json.dumps({"status": "error", "error": f"Suppression check failed: {e}"})
+        if reason:
+            return json.dumps({"status": "suppressed", "reason": reason})
+
     print("Sending mail to:", receiver_email)
     print("Content of message:", content)
 
+    # Connection and login failures are retried; once the message has been
+    # handed to the server it is not sent again. The blocking SMTP client runs
+    # in a worker thread, so a slow mail server does not hold up other sessions.
+    submitted = False
+
+    def send() -> None:
+        nonlocal submitted
+        server = smtplib.SMTP('smtp.gmail.com', 587, timeout=deadline.timeout(SMTP_TIMEOUT_SECONDS))
+        try:
+            server.starttls()
+            server.login(email_user, email_password)
+            submitted = True
+            server.send_message(message)
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(email_user, email_password)
-        server.send_message(message)
-        return json.dumps({"status": "success"})
+        await resilience.dependency("smtp").call(
+            lambda: asyncio.to_thread(send), retryable=lambda e: not submitted and resilience.is_retryable(e)
+        )
+    except smtplib.SMTPRecipientsRefused as e:
+        await _suppress(receiver_email, suppression.BOUNCED)
+        return json.dumps({"status": "error", "error": str(e)})
     except Exception as e:
+        if not submitted:
+            # The message never reached the server; the address may be tried again.
+            await _release(receiver_email)
         return json.dumps({"status": "error", "error": str(e)})
-    finally:
-        try:
-            server.quit()
-        except Exception:
-            pass
+    return json.dumps({"status": "success"})
+
+
+async def _suppress(address: str, reason: str) -> None:
+    if not SUPPRESSION_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(lambda: suppression.get_index().add(address, reason))
+    except sqlite3.Error as e:
+        logging.error(f"Could not record '{reason}' for {address}: {e}")
+
+
+async def _release(address: str) -> None:
+    if not SUPPRESSION_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(lambda: suppression.get_index().release(address))
+    except sqlite3.Error as e:
+        logging.error(f"Could not release the reservation of {address}: {e}")
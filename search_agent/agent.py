@@ -1,19 +1,80 @@
-from google.adk.agents import Agent, LlmAgent, BaseAgent
+import json
+from typing import Optional
+
+from google.adk.agents import Agent, LlmAgent, BaseAgent, SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
 from google.adk.tools import google_search
+from google.genai import types
 
-# Main search agent with instructions and tools
-search_agent = LlmAgent(
-    name="search_agent",
-    model="gemini-2.5-pro",
-    description="An agent that searches for potential clients based on user profiles and ideal client criteria",
-    instruction="""
-        You are an expert in finding information on the internet using Google Search. Your goal is to find the best possible results for the user based on their profile, their goal and the provided criteria.
+from common.instrumentation import instrument
+
+from .config import DISCOVERY_CANDIDATES, ENRICHMENT_COMPANIES
+from .prescoring import CANDIDATES_STATE_KEY, SHORTLIST_STATE_KEY, CandidatePrescorer
+
+
+def add_excluded_companies(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Tells the model which companies the caller already knows for this profile.
+
+    The caller puts a compact list of known companies in the session state under
+    "excluded_companies"; they are appended to the instruction so discovery
+    spends its searches on new leads only.
+    """
+    excluded = callback_context.state.get("excluded_companies") or []
+    if excluded:
+        llm_request.append_instructions([
+            "## ALREADY KNOWN COMPANIES - EXCLUDE\n"
+            "The user already has these companies. Do NOT return them, "
+            "and do not spend searches on them; find different companies instead:\n"
+            + "\n".join(f"- {company}" for company in excluded)
+        ])
+    return None
 
-        ## CORE WORKFLOW
-        You will receive context data containing user_info and ideal_client information. You must AUTOMATICALLY complete BOTH phases in a single response:
 
-        ### PHASE 1: Initial Company Discovery (get_top_results function)
-        When given context data, you must:
+def add_shortlist(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Gives the enrichment agent the companies to enrich: the pre-scored shortlist,
+    or the raw discovery output when it could not be pre-scored.
+    """
+    state = callback_context.state
+    shortlist = state.get(SHORTLIST_STATE_KEY)
+    if shortlist is not None:
+        companies = json.dumps(
+            [{key: value for key, value in company.items() if key != "prescore"} for company in shortlist]
+        )
+    else:
+        companies = str(state.get(CANDIDATES_STATE_KEY) or "")
+    llm_request.append_instructions([
+        "## COMPANIES TO ENRICH (PHASE 1 RESULTS)\n"
+        "Extract metadata for exactly these companies, in this order. The snippets are what "
+        "discovery found about each one:\n" + companies
+    ])
+    return None
+
+
+def skip_empty_shortlist(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Skips enrichment when pre-scoring discarded every discovered company."""
+    if callback_context.state.get(SHORTLIST_STATE_KEY) == []:
+        return types.Content(role="model", parts=[types.Part(text="[]")])
+    return None
+
+
+# Phase 1: finds candidate companies; the flags are checked locally afterwards
+discovery_agent = LlmAgent(
+    name="discovery_agent",
+    model="gemini-2.5-pro",
+    description="Finds candidate companies that match the ideal client profile",
+    instruction=f"""
+        You are an expert in finding information on the internet using Google Search. Your goal is to find companies that could become clients of the user, based on their profile, their goal and the provided criteria.
+
+        ## PHASE 1: Initial Company Discovery
+        You will receive context data containing user_info and ideal_client information. You must:
         1. Extract the user's profile from user_info (service_provided, unique_value_prop, core_messaging)
         2. Extract target client information from ideal_client.company_profile (industry_niche, company_size, location)
         3. Extract search criteria from ideal_client.opportunity_signals (green_flags and red_flags)
@@ -22,26 +83,51 @@ search_agent = LlmAgent(
         - You MUST use the google_search tool multiple times to find companies that match the industry niche, company size, and location
         - NEVER provide company information without first searching for it using google_search
         - Apply green flags as positive search criteria (e.g., "hiring for marketing position", "featured in major publication")
-        - Avoid companies that match red flag criteria (e.g., "recent layoffs", "sells on Amazon")
-        - Find exactly 5 top results that best match the user's goal and criteria
-        - REQUIRED: Use google_search tool for EVERY company you identify
+        - Find up to {DISCOVERY_CANDIDATES} candidate companies
+        - Do NOT spend extra searches verifying green or red flags for each company; candidates are checked against the flags automatically afterwards
+        - For each company, keep the snippets your searches returned about it (what it does, size, hiring, news, reviews, anything matching or contradicting the flags)
 
-        **CRITICAL: You MUST NOT return anythin, immediately proceed to phase 2! 
-        
+        **CRITICAL: You MUST return ONLY this JSON array, with no other text:**
+        ```json
+        [
+            {{
+                "name": "The name of the company.",
+                "location": "The city or region of the company.",
+                "source_url": "The most relevant URL found for the company.",
+                "snippets": ["Short excerpts from the search results about the company."]
+            }}
+        ]
+        ```
 
-        **IMPORTANT CONSTRAINTS FOR PHASE 1:**
-        - MANDATORY: You MUST use google_search tool before providing ANY company information
-        - Only return the JSON array of 5 companies, do not include any other text
+        ## QUALITY STANDARDS
+        - MANDATORY: Always use google_search tool before providing ANY information
         - NEVER mention companies without first using google_search to verify they exist
-        - Validate results don't match red flag criteria using google_search
-        - Return exactly 5 results maximum
-        - **THEN AUTOMATICALLY PROCEED TO PHASE 2**
+        - Snippets must come from google_search results; never invent them
+    """,
+    tools=[google_search],
+    output_key=CANDIDATES_STATE_KEY,
+    before_model_callback=add_excluded_companies,
+)
+
+# Ranks the candidates against the green/red flags without model or search calls
+prescoring_agent = CandidatePrescorer(
+    name="prescoring_agent",
+    description="Ranks discovered companies against the green and red flags and shortlists the best ones",
+)
+
+# Phase 2: enriches only the shortlisted companies
+enrichment_agent = LlmAgent(
+    name="enrichment_agent",
+    model="gemini-2.5-pro",
+    description="Extracts detailed metadata for the shortlisted companies",
+    instruction=f"""
+        You are an expert in finding information on the internet using Google Search.
 
-        ### PHASE 2: Detailed Metadata Extraction (extract_metadata function)
-        **AUTOMATICALLY** proceed to Phase 2 for each company found in Phase 1. For each company, search for detailed information using the pattern "What is '[Company Name] in [Location]'?"
+        ### PHASE 2: Detailed Metadata Extraction
+        For each company listed under COMPANIES TO ENRICH (at most {ENRICHMENT_COMPANIES}), search for detailed information using the pattern "What is '[Company Name] in [Location]'?"
 
         **MANDATORY Search Strategy - YOU MUST USE GOOGLE_SEARCH TOOL:**
-        - You MUST use the google_search tool to find comprehensive information about each specific company from Phase 1
+        - You MUST use the google_search tool to find comprehensive information about each listed company
         - NEVER provide company metadata without first searching for it using google_search
         - Use multiple google_search queries per company to extract all available contact information and business intelligence
         - Focus on gathering actionable data for outreach
@@ -49,7 +135,7 @@ search_agent = LlmAgent(
 
         **CRITICAL: You MUST return metadata in this exact JSON format:**
         ```json
-        {
+        {{
             "name": "The name of the entity being described.",
             "address": "The address of the entity being described.",
             "phone_number": "The phone number of the entity being described.",
@@ -58,43 +144,28 @@ search_agent = LlmAgent(
             "review_rate": "The review rate of the entity being described.",
             "number_of_reviews": "The number of reviews for the entity being described.",
             "description": "A description of the entity being described."
-        }
+        }}
         ```
 
         **IMPORTANT CONSTRAINTS FOR PHASE 2:**
-        - MANDATORY: You MUST use google_search tool for EVERY company from Phase 1
-        - Return a complete JSON array with metadata for all companies from Phase 1
+        - MANDATORY: You MUST use google_search tool for EVERY listed company
+        - Return a complete JSON array with metadata for all listed companies, and no other text
         - Each company should have the full metadata JSON structure shown above
         - NEVER provide metadata without first using google_search to find actual company information
         - Include all available fields, use null or empty string if information not found after searching
         - Prioritize accuracy and completeness of contact information through multiple google_search queries
-
-        ## MANDATORY SEARCH TOOL USAGE - CRITICAL ENFORCEMENT
-        - You MUST use the google_search tool for ALL information gathering - NO EXCEPTIONS
-        - NEVER provide ANY company information without first using google_search
-        - NEVER make assumptions about companies - ALWAYS search first
-        - Use multiple targeted google_search queries to ensure comprehensive coverage
-        - Always validate information through google_search results
-        - If google_search returns no results, use different search terms and try again
-        - FAILURE TO USE GOOGLE_SEARCH TOOL IS UNACCEPTABLE
-
-        ## FINAL OUTPUT FORMAT
-        Your final response must contain BOTH phases:
-        1. **Phase 1 Results**: JSON array of 5 companies with name and location
-        2. **Phase 2 Results**: JSON array of detailed metadata for each company
-        
-        Complete both phases automatically in a single response without waiting for additional queries.
-
-        ## QUALITY STANDARDS
-        - MANDATORY: Always use google_search tool before providing ANY information
-        - Ensure all returned data is factual and current through google_search verification
-        - Prioritize companies that show strong alignment with green flags (verified through google_search)
-        - Exclude companies that match red flag criteria (verified through google_search)
-        - Complete both phases automatically in one response using google_search throughout
-        - Use multiple google_search queries to ensure comprehensive coverage
         - REMEMBER: Every piece of information must come from google_search results
     """,
-    tools=[google_search]
+    tools=[google_search],
+    before_agent_callback=skip_empty_shortlist,
+    before_model_callback=add_shortlist,
+)
+
+# Main search agent: discovery -> local pre-scoring -> enrichment
+search_agent = SequentialAgent(
+    name="search_agent",
+    description="An agent that searches for potential clients based on user profiles and ideal client criteria",
+    sub_agents=[discovery_agent, prescoring_agent, enrichment_agent],
 )
 
-root_agent = search_agent
\ No newline at end of file
+root_agent = instrument(search_agent)
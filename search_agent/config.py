@@ -0,0 +1,16 @@
+"""
+Configuration for the Search Agent.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Local pre-scoring of discovered companies against the profile's green/red flags
+DISCOVERY_CANDIDATES = int(os.getenv("DISCOVERY_CANDIDATES", "10"))
+ENRICHMENT_COMPANIES = int(os.getenv("ENRICHMENT_COMPANIES", "5"))
+PRESCORE_HASH_DIMENSIONS = int(os.getenv("PRESCORE_HASH_DIMENSIONS", str(2 ** 16)))
+PRESCORE_RED_FLAG_THRESHOLD = float(os.getenv("PRESCORE_RED_FLAG_THRESHOLD", "0.75"))
+PRESCORE_RED_FLAG_WEIGHT = float(os.getenv("PRESCORE_RED_FLAG_WEIGHT", "0.5"))
@@ -0,0 +1,204 @@
+"""
+Local pre-scoring of discovered companies against the profile's opportunity signals.
+
+Discovery returns more candidates than are enriched, each with the snippets its
+searches turned up. Instead of verifying every candidate against the green and
+red flags with further searches, candidates and flags are turned into hashed
+word and word-pair feature vectors and scored in one NumPy batch: a flag's
+coverage of a candidate is the share of the flag's features found in the
+candidate's text. Candidates that clearly match a red flag are dropped, the
+rest are ranked by green-flag coverage, and only the best ones are enriched.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import numpy as np
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from common.agent_json import extract_json_values, loads_agent_json
+
+from .config import (
+    ENRICHMENT_COMPANIES,
+    PRESCORE_HASH_DIMENSIONS,
+    PRESCORE_RED_FLAG_THRESHOLD,
+    PRESCORE_RED_FLAG_WEIGHT,
+)
+
+logger = logging.getLogger(__name__)
+
+CANDIDATES_STATE_KEY = "candidates"
+SHORTLIST_STATE_KEY = "shortlist"
+DISCARDED_STATE_KEY = "discarded_companies"
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:['&][a-z0-9]+)*")
+_FLAG_SEPARATORS = re.compile(r"[,;\n]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "their", "they", "this", "to", "was", "with",
+}
+
+
+def features(text: str) -> List[str]:
+    """Returns the word and word-pair features of a text, stopwords removed."""
+    words = [word for word in _WORD_PATTERN.findall(text.lower()) if word not in _STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def _bucket(feature: str, dimensions: int) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % dimensions
+
+
+def vectorize(texts: List[str], dimensions: int = PRESCORE_HASH_DIMENSIONS) -> List[Counter]:
+    """Returns the hashed feature counts of each text, keyed by bucket."""
+    return [Counter(_bucket(feature, dimensions) for feature in features(text)) for text in texts]
+
+
+def flag_coverage(texts: List[str], flags: List[str], dimensions: int = PRESCORE_HASH_DIMENSIONS) -> np.ndarray:
+    """
+    Computes how much of each flag appears in each text.
+
+    Only the buckets the flags use become matrix columns, so the matrices stay
+    (texts x flag features) however many hash dimensions are configured.
+
+    Returns:
+        np.ndarray: A (texts x flags) matrix of coverages between 0 and 1.
+    """
+    if not texts or not flags:
+        return np.zeros((len(texts), len(flags)), dtype=np.float32)
+    flag_counts = vectorize(flags, dimensions)
+    columns = {bucket: column for column, bucket in enumerate(sorted(set().union(*flag_counts)))}
+    weights = np.zeros((len(flags), len(columns)), dtype=np.float32)
+    for row, counts in enumerate(flag_counts):
+        total = sum(counts.values())
+        for bucket, count in counts.items():
+            weights[row, columns[bucket]] = count / total
+    present = np.zeros((len(texts), len(columns)), dtype=np.float32)
+    for row, counts in enumerate(vectorize(texts, dimensions)):
+        present[row, [columns[bucket] for bucket in counts.keys() & columns.keys()]] = 1
+    return present @ weights.T
+
+
+def _flag_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = _FLAG_SEPARATORS.split(value)
+    if not isinstance(value, list):
+        return []
+    return [flag.strip() for flag in value if isinstance(flag, str) and features(flag)]
+
+
+def _candidate_text(candidate: Dict[str, Any]) -> str:
+    return " ".join(
+        " ".join(map(str, value)) if isinstance(value, list) else str(value)
+        for value in candidate.values() if isinstance(value, (str, list))
+    )
+
+
+def score_candidates(
+    candidates: List[Dict[str, Any]], green_flags: List[str], red_flags: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Scores and ranks candidate companies against green and red flags.
+
+    Args:
+        candidates (List[Dict[str, Any]]): Discovered companies with their snippets.
+        green_flags (List[str]): Signals of a good lead.
+        red_flags (List[str]): Signals of a lead to avoid.
+
+    Returns:
+        List[Dict[str, Any]]: The candidates, best first, each with a "prescore"
+        entry holding its score, green and red coverage and whether it was discarded.
+    """
+    texts = [_candidate_text(candidate) for candidate in candidates]
+    green = flag_coverage(texts, green_flags)
+    red = flag_coverage(texts, red_flags)
+    green_score = 0.5 * green.max(axis=1) + 0.5 * green.mean(axis=1) if green_flags else np.zeros(len(texts))
+    red_score = red.max(axis=1) if red_flags else np.zeros(len(texts))
+    scores = green_score - PRESCORE_RED_FLAG_WEIGHT * red_score
+    discarded = red_score >= PRESCORE_RED_FLAG_THRESHOLD
+
+    ranked = []
+    for index in np.argsort(-scores, kind="stable"):
+        matched_red = [red_flags[j] for j in np.flatnonzero(red[index] >= PRESCORE_RED_FLAG_THRESHOLD)]
+        ranked.append(dict(candidates[index], prescore={
+            "score": round(float(scores[index]), 3),
+            "green": round(float(green_score[index]), 3),
+            "red": round(float(red_score[index]), 3),
+            "discarded": bool(discarded[index]),
+            "red_flags": matched_red,
+        }))
+    return ranked
+
+
+def _client_profile(ctx: InvocationContext) -> Dict[str, Any]:
+    """Returns the client profile from session state, or from the JSON in the user message."""
+    profile = loads_agent_json(ctx.session.state.get("client_profile"))
+    if isinstance(profile, dict):
+        return profile
+    content = ctx.user_content
+    text = " ".join(part.text for part in (content.parts if content else []) or [] if part.text)
+    for value in extract_json_values(text):
+        if isinstance(value, dict) and "ideal_client" in value:
+            return value
+    return {}
+
+
+def _candidates(value: Any) -> Optional[List[Dict[str, Any]]]:
+    parsed = loads_agent_json(value)
+    if parsed is None and isinstance(value, str):
+        parsed = next((v for v in extract_json_values(value) if isinstance(v, list)), None)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("companies")
+    if not isinstance(parsed, list):
+        return None
+    return [candidate for candidate in parsed if isinstance(candidate, dict) and candidate.get("name")]
+
+
+class CandidatePrescorer(BaseAgent):
+    """
+    Ranks the discovery agent's candidates locally and shortlists the ones to enrich.
+
+    Reads state["candidates"], writes the shortlist to state["shortlist"] and the
+    dropped companies to state["discarded_companies"], and answers with the
+    Phase 1 array (name and location of the shortlisted companies).
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        candidates = _candidates(ctx.session.state.get(CANDIDATES_STATE_KEY))
+        if candidates is None:
+            # Leave the enrichment agent to work from the discovery output directly.
+            logger.warning("Could not parse the discovered companies; skipping pre-scoring")
+            yield Event(author=self.name, invocation_id=ctx.invocation_id, branch=ctx.branch,
+                        actions=EventActions(state_delta={SHORTLIST_STATE_KEY: None}))
+            return
+
+        signals = (_client_profile(ctx).get("ideal_client") or {}).get("opportunity_signals") or {}
+        ranked = score_candidates(
+            candidates, _flag_list(signals.get("green_flags")), _flag_list(signals.get("red_flags"))
+        )
+        kept = [candidate for candidate in ranked if not candidate["prescore"]["discarded"]]
+        shortlist = kept[:ENRICHMENT_COMPANIES]
+        discarded = [
+            {"name": candidate["name"], "red_flags": candidate["prescore"]["red_flags"]}
+            for candidate in ranked if candidate["prescore"]["discarded"]
+        ]
+        logger.info(
+            f"Pre-scored {len(candidates)} companies: {len(discarded)} discarded, {len(shortlist)} shortlisted"
+        )
+
+        phase_1 = [{"name": candidate["name"], "location": candidate.get("location")} for candidate in shortlist]
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(phase_1))]),
+            actions=EventActions(state_delta={SHORTLIST_STATE_KEY: shortlist, DISCARDED_STATE_KEY: discarded}),
+        )
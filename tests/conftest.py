@@ -0,0 +1,4 @@
+import os
+
+# research_personal_agent.tools refuses to import without a Tavily key; no test calls Tavily.
+os.environ.setdefault("TAVILY_API_KEY", "test")
@@ -0,0 +1,78 @@
+import json
+import random
+
+import pytest
+
+from common.agent_json import IncrementalJSONParser, extract_json_values, loads_agent_json
+
+COMPANIES = [
+    {"name": "Acme {Widgets}", "location": "Berlin", "notes": 'Said "hi [there]" \\ left'},
+    {"name": "Globex", "location": None, "tags": ["b2b", {"nested": [1, 2]}]},
+    {"name": "Initech", "location": "Austin"},
+]
+
+STREAMS = [
+    json.dumps(COMPANIES),
+    "Here are the companies:\n```json\n" + json.dumps(COMPANIES, indent=2) + "\n```\nLet me know.",
+    "\n".join(json.dumps(company) for company in COMPANIES),
+]
+
+
+def _feed(text, sizes):
+    parser = IncrementalJSONParser()
+    objects, position = [], 0
+    for size in sizes:
+        objects.extend(parser.feed(text[position:position + size]))
+        position += size
+    objects.extend(parser.feed(text[position:]))
+    return objects
+
+
+@pytest.mark.parametrize("text", STREAMS)
+def test_whole_text(text):
+    assert _feed(text, []) == COMPANIES
+
+
+@pytest.mark.parametrize("text", STREAMS)
+def test_one_character_at_a_time(text):
+    assert _feed(text, [1] * len(text)) == COMPANIES
+
+
+@pytest.mark.parametrize("text", STREAMS)
+@pytest.mark.parametrize("seed", range(25))
+def test_random_chunk_splits(text, seed):
+    rng = random.Random(seed)
+    sizes, total = [], 0
+    while total < len(text):
+        sizes.append(rng.randint(0, 12))
+        total += sizes[-1]
+    assert _feed(text, sizes) == COMPANIES
+
+
+def test_objects_are_reported_as_soon_as_they_close():
+    text = json.dumps(COMPANIES)
+    first_end = text.index(json.dumps(COMPANIES[0])) + len(json.dumps(COMPANIES[0]))
+    parser = IncrementalJSONParser()
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [COMPANIES[0]]
+
+
+def test_nested_objects_are_not_reported_separately():
+    assert _feed('{"outer": {"inner": 1}}', [3, 3]) == [{"outer": {"inner": 1}}]
+    assert _feed('[[{"deep": 1}]]', []) == []
+
+
+def test_prose_and_broken_json_are_skipped():
+    text = 'He said "use {braces}" and ] then {"name": "Acme"} then {"name": oops} {"name": "Globex"}'
+    assert _feed(text, [5] * 20) == [{"name": "Acme"}, {"name": "Globex"}]
+
+
+def test_loads_agent_json():
+    assert loads_agent_json('```json\n{"a": 1}\n```') == {"a": 1}
+    assert loads_agent_json('[1, 2]') == [1, 2]
+    assert loads_agent_json({"a": 1}) == {"a": 1}
+    assert loads_agent_json("not json") is None
+
+
+def test_extract_json_values():
+    assert extract_json_values('Result: {"a": 1} and [2, 3], not {broken') == [{"a": 1}, [2, 3]]
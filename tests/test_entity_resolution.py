@@ -0,0 +1,84 @@
+import pytest
+
+from common.entity_resolution import (
+    blocking_keys,
+    is_fuzzy_match,
+    name_similarity,
+    normalize_domain,
+    normalize_name,
+)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("The ACME Widgets, Inc.", "acme widgets"),
+        ("Acme GmbH", "acme"),
+        ("Société Générale SA", "societe generale"),
+        ("Johnson & Johnson", "johnson and johnson"),
+        # A name that is nothing but a legal suffix keeps it.
+        ("Company", "company"),
+        ("", ""),
+        (None, ""),
+    ],
+)
+def test_normalize_name(name, expected):
+    assert normalize_name(name) == expected
+
+
+@pytest.mark.parametrize(
+    "website, expected",
+    [
+        ("https://www.Acme.com/about", "acme.com"),
+        ("acme.com", "acme.com"),
+        ("http://shop.acme.co.uk:8080", "shop.acme.co.uk"),
+        ("localhost", None),
+        ("  ", None),
+        (None, None),
+    ],
+)
+def test_normalize_domain(website, expected):
+    assert normalize_domain(website) == expected
+
+
+def test_blocking_keys():
+    assert blocking_keys("acme health co") == {"acme", "health", "prefix:acme"}
+    assert blocking_keys("") == set()
+
+
+def test_name_similarity():
+    assert name_similarity("acme widgets", "acme widgets") == 1.0
+    assert name_similarity("widgets acme", "acme widgets") == 1.0
+    assert name_similarity("acme", "") == 0.0
+    assert name_similarity("acme helth", "acme health") > 0.9
+    assert name_similarity("acme", "globex") < 0.5
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("acme helth", "acme health"),
+        ("acme health", "acme health"),
+        ("health acme", "acme helth"),
+        ("globex industries", "globex industires"),
+    ],
+)
+def test_is_fuzzy_match_accepts_typos(first, second):
+    assert is_fuzzy_match(first, second, 0.88)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        # One letter apart, but a different word: a different company.
+        ("acme health", "acme wealth"),
+        ("acme", "acne"),
+        # No shared word.
+        ("acme health", "acmi helth"),
+        # An extra word.
+        ("acme", "acme health"),
+        ("acme", ""),
+    ],
+)
+def test_is_fuzzy_match_rejects_different_companies(first, second):
+    assert not is_fuzzy_match(first, second, 0.88)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from search_agent.prescoring import _bucket, _flag_list, features, flag_coverage, score_candidates, vectorize
+
+
+def test_features_drop_stopwords_and_add_pairs():
+    assert features("The Series A funding of a startup") == [
+        "series", "funding", "startup", "series funding", "funding startup",
+    ]
+
+
+def test_flag_list():
+    assert _flag_list("Recently raised funding; hiring engineers\nthe") == [
+        "Recently raised funding", "hiring engineers",
+    ]
+    assert _flag_list(["remote first", 3, ""]) == ["remote first"]
+    assert _flag_list(None) == []
+
+
+def _dense_coverage(texts, flags, dimensions):
+    """The coverage computed with full (texts x dimensions) matrices, for comparison."""
+    def dense(items):
+        matrix = np.zeros((len(items), dimensions))
+        for row, item in enumerate(items):
+            for feature in features(item):
+                matrix[row, _bucket(feature, dimensions)] += 1
+        return matrix
+
+    present = (dense(texts) > 0).astype(float)
+    weights = dense(flags)
+    return present @ (weights / weights.sum(axis=1, keepdims=True)).T
+
+
+def test_flag_coverage_matches_dense_computation():
+    texts = [
+        "Fintech startup in Berlin, hiring engineers after its Series B funding",
+        "Cloud hosting company announced layoffs and a restructuring",
+        "",
+    ]
+    flags = ["series b funding", "hiring engineers", "layoffs", "berlin fintech startup"]
+    coverage = flag_coverage(texts, flags, dimensions=1024)
+    assert coverage.shape == (3, 4)
+    np.testing.assert_allclose(coverage, _dense_coverage(texts, flags, 1024), rtol=1e-6)
+    assert coverage[0, 0] == pytest.approx(1.0)
+    assert coverage[2].tolist() == [0, 0, 0, 0]
+
+
+def test_flag_coverage_empty_inputs():
+    assert flag_coverage([], ["layoffs"]).shape == (0, 1)
+    assert flag_coverage(["layoffs"], []).shape == (1, 0)
+
+
+def test_vectorize_counts_buckets():
+    counts = vectorize(["acme acme", ""], dimensions=64)
+    assert sum(counts[0].values()) == 3
+    assert not counts[1]
+
+
+def test_score_candidates_ranks_and_discards():
+    candidates = [
+        {"name": "Quiet Co", "snippets": ["A consultancy"]},
+        {"name": "Growing Co", "snippets": ["Raised Series B funding and is hiring engineers"]},
+        {"name": "Shrinking Co", "snippets": ["Raised Series B funding, then announced layoffs"]},
+    ]
+    ranked = score_candidates(candidates, ["series b funding", "hiring engineers"], ["announced layoffs"])
+
+    # Discarded candidates keep their place in the ranking; the shortlist skips them.
+    assert [candidate["name"] for candidate in ranked] == ["Growing Co", "Shrinking Co", "Quiet Co"]
+    growing, shrinking, quiet = (candidate["prescore"] for candidate in ranked)
+    assert growing == {"score": 1.0, "green": 1.0, "red": 0.0, "discarded": False, "red_flags": []}
+    assert quiet["score"] == 0.0 and not quiet["discarded"]
+    assert shrinking["discarded"] and shrinking["red_flags"] == ["announced layoffs"]
+    # The input dicts are left untouched.
+    assert "prescore" not in candidates[0]
+
+
+def test_score_candidates_without_flags_keeps_order():
+    candidates = [{"name": "A"}, {"name": "B"}]
+    ranked = score_candidates(candidates, [], [])
+    assert [candidate["name"] for candidate in ranked] == ["A", "B"]
+    assert all(candidate["prescore"]["score"] == 0.0 for candidate in ranked)
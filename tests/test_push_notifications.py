@@ -0,0 +1,172 @@
+import asyncio
+import functools
+import json
+import time
+
+import httpx
+import pytest
+from a2a.types import PushNotificationConfig, Task, TaskState, TaskStatus
+from a2a.utils.errors import ServerError
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from contextual_agent import push_notifications, push_receiver
+from contextual_agent.push_notifications import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    TOKEN_HEADER,
+    SignedPushNotifier,
+    check_callback_url,
+    sign_payload,
+    verify_signature,
+)
+
+SECRET = "shared-secret"
+CALLBACK_URL = "http://receiver.test/notifications"
+
+
+def test_sign_and_verify():
+    body = b'{"id": "t1"}'
+    timestamp = str(int(time.time()))
+    signature = sign_payload(SECRET, timestamp, body)
+    assert signature.startswith("sha256=")
+    assert verify_signature(SECRET, body, timestamp, signature)
+    assert not verify_signature("other-secret", body, timestamp, signature)
+    assert not verify_signature(SECRET, b'{"id": "t2"}', timestamp, signature)
+    assert not verify_signature(SECRET, body, str(int(timestamp) + 1), signature)
+    assert not verify_signature(SECRET, body, None, signature)
+    assert not verify_signature(SECRET, body, timestamp, None)
+    assert not verify_signature(SECRET, body, "yesterday", signature)
+
+
+def test_verify_rejects_old_notifications():
+    body = b"{}"
+    timestamp = str(int(time.time()) - 600)
+    assert not verify_signature(SECRET, body, timestamp, sign_payload(SECRET, timestamp, body))
+    assert verify_signature(SECRET, body, timestamp, sign_payload(SECRET, timestamp, body), tolerance_seconds=900)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["http://127.0.0.1:9000/notifications", "http://10.0.0.5/hook", "http://169.254.169.254/latest", "http://[::1]/"],
+)
+def test_callback_url_rejects_internal_hosts(url):
+    assert "non-public" in asyncio.run(check_callback_url(url, allow_private=False))
+    assert asyncio.run(check_callback_url(url, allow_private=True)) is None
+
+
+@pytest.mark.parametrize("url", ["ftp://example.com/hook", "http:///hook", "http://example.com:port/"])
+def test_callback_url_rejects_malformed_urls(url):
+    assert asyncio.run(check_callback_url(url, allow_private=True)) is not None
+
+
+class Receiver:
+    """The push_receiver endpoint behind an in-process transport, recording what it answered."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.responses = []
+        self.headers = []
+        self.app = Starlette(routes=[Route("/notifications", self.endpoint, methods=["POST"])])
+
+    async def endpoint(self, request):
+        self.headers.append(request.headers)
+        if self.failures:
+            self.failures -= 1
+            response = JSONResponse({"status": "error"}, status_code=503)
+        else:
+            response = await push_receiver.receive_notification(request)
+        self.responses.append((response.status_code, json.loads(await request.body())))
+        return response
+
+
+@pytest.fixture(autouse=True)
+def local_receiver(monkeypatch):
+    # The receiver runs in-process at a name that never resolves; skip the address check.
+    allow_private = functools.partial(check_callback_url, allow_private=True)
+    monkeypatch.setattr(push_notifications, "check_callback_url", allow_private)
+    monkeypatch.setattr(push_notifications, "PUSH_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(push_receiver, "PUSH_SIGNING_SECRET", SECRET)
+
+
+def _task(state=TaskState.working, timestamp="2026-01-01T00:00:00Z"):
+    return Task(id="t1", contextId="c1", status=TaskStatus(state=state, timestamp=timestamp))
+
+
+async def _push(receiver, tasks, signing_secret=SECRET, config_path=None, max_retries=3):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=receiver.app))
+    notifier = SignedPushNotifier(
+        client, signing_secret=signing_secret, max_retries=max_retries, config_path=config_path
+    )
+    await notifier.set_info("t1", PushNotificationConfig(url=CALLBACK_URL, token="client-token"))
+    for task in tasks:
+        await notifier.send_notification(task)
+    await notifier.aclose()
+
+
+def test_signed_notifications_are_accepted_by_the_receiver():
+    receiver = Receiver()
+    asyncio.run(_push(receiver, [_task()]))
+    assert [status for status, _ in receiver.responses] == [200]
+    assert receiver.responses[0][1]["id"] == "t1"
+    headers = receiver.headers[0]
+    assert headers[TOKEN_HEADER] == "client-token"
+    assert headers[SIGNATURE_HEADER].startswith("sha256=") and headers[TIMESTAMP_HEADER]
+
+
+def test_receiver_rejects_a_wrong_signature_without_retries():
+    receiver = Receiver()
+    asyncio.run(_push(receiver, [_task()], signing_secret="wrong-secret"))
+    assert [status for status, _ in receiver.responses] == [401]
+
+
+def test_server_errors_are_retried():
+    receiver = Receiver(failures=2)
+    asyncio.run(_push(receiver, [_task()]))
+    assert [status for status, _ in receiver.responses] == [503, 503, 200]
+
+
+def test_only_state_changes_are_pushed_in_order():
+    receiver = Receiver()
+    tasks = [
+        _task(),
+        _task(),
+        _task(TaskState.completed, "2026-01-01T00:01:00Z"),
+    ]
+    asyncio.run(_push(receiver, tasks))
+    assert [body["status"]["state"] for _, body in receiver.responses] == ["working", "completed"]
+
+
+def test_configs_are_shared_through_sqlite(tmp_path):
+    path = str(tmp_path / "push_configs.db")
+
+    async def run():
+        first = SignedPushNotifier(httpx.AsyncClient(), signing_secret=SECRET, config_path=path)
+        second = SignedPushNotifier(httpx.AsyncClient(), signing_secret=SECRET, config_path=path)
+        await first.set_info("t1", PushNotificationConfig(url=CALLBACK_URL, token="client-token"))
+        config = await second.get_info("t1")
+        await second.delete_info("t1")
+        deleted = await first.get_info("t1")
+        await first.aclose()
+        await second.aclose()
+        return config, deleted
+
+    config, deleted = asyncio.run(run())
+    assert config.url == CALLBACK_URL and config.token == "client-token"
+    assert deleted is None
+
+
+def test_set_info_rejects_internal_callbacks(monkeypatch):
+    public_only = functools.partial(check_callback_url, allow_private=False)
+    monkeypatch.setattr(push_notifications, "check_callback_url", public_only)
+
+    async def run():
+        notifier = SignedPushNotifier(httpx.AsyncClient(), signing_secret=SECRET)
+        try:
+            await notifier.set_info("t1", PushNotificationConfig(url="http://127.0.0.1:9000/notifications"))
+        finally:
+            await notifier.aclose()
+
+    with pytest.raises(ServerError):
+        asyncio.run(run())
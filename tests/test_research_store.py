@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from research_personal_agent.research_store import (
+    DOMAIN_MATCH,
+    EXACT_MATCH,
+    FUZZY_MATCH,
+    ResearchStore,
+    _requested_company,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResearchStore(str(tmp_path / "research.db"), fuzzy_threshold=0.88)
+
+
+def _research(name, website=None):
+    return {"company_name": name, "official_website_url": website, "primary_contact_emails": []}
+
+
+def test_resolve_by_domain_and_name(store):
+    company_id = store.save(_research("Acme Health, Inc.", "https://www.acmehealth.com"))
+    assert store.resolve(website="acmehealth.com/contact") == company_id
+    assert store.resolve(name="ACME Health") == company_id
+    assert store.resolve(name="Acme Helth", website="acmehealth.com") == company_id
+    assert store.resolve(name="Globex") is None
+
+
+def test_resolve_does_not_merge_similar_names(store):
+    store.save(_research("Acme Health", "acmehealth.com"))
+    assert store.resolve(name="Acme Wealth") is None
+    assert store.resolve(name="Acme Wealth", website="acmewealth.com") is None
+
+
+def test_fuzzy_match_needs_a_domain(store):
+    store.save(_research("Acme Health"))
+    assert store.resolve(name="Acme Helth") is None
+    assert store.resolve(name="Acme Helth", website="acmehealth.com") is not None
+
+
+def test_same_name_different_domain_is_another_company(store):
+    first = store.save(_research("Acme", "acme.com"))
+    assert store.resolve(name="Acme", website="acme.de") is None
+    second = store.save(_research("Acme", "acme.de"))
+    assert second != first
+    assert store.resolve(website="acme.de") == second
+
+
+def test_get_reports_match_and_can_refuse_fuzzy(store):
+    store.save(_research("Acme Health", "acmehealth.com"))
+    store.save(_research("Globex Industries"))
+    assert store.get(website="acmehealth.com")["match"] == DOMAIN_MATCH
+    assert store.get(name="Acme Health")["match"] == EXACT_MATCH
+    assert store.get(name="Acme Helth", website="acmehealth.com")["match"] == DOMAIN_MATCH
+    assert store.get(name="Globex Industires", website="globex.com")["match"] == FUZZY_MATCH
+    assert store.get(name="Globex Industires", website="globex.com", allow_fuzzy=False) is None
+
+
+def test_save_merges_contacts_and_aliases(store):
+    company_id = store.save(
+        {**_research("Acme Health", "acmehealth.com"), "primary_contact_emails": ["a@acmehealth.com"]},
+        aliases=["Acme Medical"],
+    )
+    store.save({**_research("Acme Health", "acmehealth.com"), "primary_contact_emails": ["b@acmehealth.com"]})
+    assert store.resolve(name="Acme Medical") == company_id
+    assert store.get(name="Acme Health")["contacts"]["emails"] == ["b@acmehealth.com", "a@acmehealth.com"]
+
+
+def _context(text, **state):
+    content = types.Content(role="user", parts=[types.Part(text=text)])
+    return SimpleNamespace(state=state, user_content=content)
+
+
+def test_requested_company_name_comes_only_from_state():
+    assert _requested_company(_context("Please research this company")) == {"name": None, "website": None}
+    assert _requested_company(_context("Research Acme Health", company_name="Acme Health")) == {
+        "name": "Acme Health",
+        "website": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "text, website",
+    [
+        ("Look at https://acmehealth.com/about please", "https://acmehealth.com/about"),
+        ("Their site is www.acmehealth.com.", "www.acmehealth.com"),
+        ("Write to sales@acmehealth.com", None),
+        ("They build on Node.js and Vue.js", None),
+        ("See acmehealth.com", None),
+    ],
+)
+def test_requested_company_website_from_message(text, website):
+    assert _requested_company(_context(text))["website"] == website
+
+
+def test_requested_company_website_prefers_state():
+    context = _context("https://other.com", company_website="acmehealth.com")
+    assert _requested_company(context)["website"] == "acmehealth.com"
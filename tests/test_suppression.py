@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from research_personal_agent.suppression import (
+    BOUNCED,
+    CONTACTED,
+    UNSUBSCRIBED,
+    BloomFilter,
+    SuppressionIndex,
+    normalize_address,
+)
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [
+        ("Someone@Example.com", "someone@example.com"),
+        ("Some One <some.one+news@example.com>", "some.one@example.com"),
+        ("mailto:Sales@Example.com", "sales@example.com"),
+        ("J.Doe+tag@googlemail.com", "jdoe@gmail.com"),
+        ("not an address", ""),
+        ("someone@localhost", ""),
+        ("+tag@example.com", ""),
+        (None, ""),
+    ],
+)
+def test_normalize_address(address, expected):
+    assert normalize_address(address) == expected
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    added = [f"user{i}@example.com" for i in range(1000)]
+    for address in added:
+        bloom.add(address)
+    assert all(address in bloom for address in added)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}@example.com")
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SuppressionIndex(str(tmp_path / "suppression.db"), expected_addresses=100, recontact_days=90)
+
+
+def test_check_suppressed_and_unknown(index):
+    assert index.add("Someone+promo@Example.com", UNSUBSCRIBED)
+    assert not index.add("not an address", UNSUBSCRIBED)
+    assert index.check("someone@example.com") == UNSUBSCRIBED
+    assert index.check("other@example.com") is None
+    assert index.check("") is None
+
+
+def test_reserve_then_release(index):
+    assert index.reserve("lead@example.com") is None
+    assert index.check("Lead@Example.com") == CONTACTED
+    assert index.reserve("lead@example.com") == CONTACTED
+    index.release("lead@example.com")
+    assert index.check("lead@example.com") is None
+    assert index.reserve("lead@example.com") is None
+
+
+def test_reserve_never_overrides_an_unsubscribe(index):
+    index.add("lead@example.com", BOUNCED)
+    assert index.reserve("lead@example.com") == BOUNCED
+    index.release("lead@example.com")
+    assert index.check("lead@example.com") == BOUNCED
+    # A later contact record does not replace the suppression either.
+    index.add("lead@example.com", CONTACTED)
+    assert index.check("lead@example.com") == BOUNCED
+
+
+def test_contact_expires_after_recontact_window(index):
+    index._conn.execute(
+        "INSERT INTO suppressed (address, reason, added_at) VALUES (?, ?, ?)",
+        ("old@example.com", CONTACTED, time.time() - 91 * 86400),
+    )
+    index._conn.commit()
+    index._rebuild_filter(100)
+    assert index.check("old@example.com") is None
+    assert index.reserve("old@example.com") is None
+
+
+def test_reservations_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "suppression.db")
+    first = SuppressionIndex(path, expected_addresses=100)
+    second = SuppressionIndex(path, expected_addresses=100)
+    assert first.reserve("lead@example.com") is None
+    assert second.reserve("lead@example.com") == CONTACTED
+    second.add("gone@example.com", UNSUBSCRIBED)
+    assert first.check("gone@example.com") == UNSUBSCRIBED
+
+
+def test_filter_grows_past_capacity(index):
+    capacity = index._bloom.capacity
+    index.add_many((f"user{i}@example.com", UNSUBSCRIBED) for i in range(capacity + 10))
+    assert index._bloom.capacity > capacity
+    assert index.check("user0@example.com") == UNSUBSCRIBED